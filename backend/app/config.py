@@ -5,6 +5,17 @@ class Settings(BaseSettings):
     supabase_url: str = ""
     supabase_key: str = ""
     supabase_service_role_key: str = ""
+    supabase_jwt_secret: str = ""
+    jwt_audience: str = "authenticated"
+    jwks_cache_ttl_seconds: int = 600
+    # Upper bound on how long a role/tenant change or user deletion made outside
+    # this process keeps serving the old identity; keep it short
+    identity_cache_ttl_seconds: int = 60
+    identity_cache_max_entries: int = 10000
+    supabase_http_timeout_seconds: float = 30.0
+    supabase_http_max_connections: int = 100
+    supabase_http_max_keepalive: int = 20
+    supabase_http_keepalive_expiry_seconds: float = 60.0
 
     google_client_id: str = ""
     google_client_secret: str = ""
@@ -13,8 +24,53 @@ class Settings(BaseSettings):
     slack_client_id: str = ""
     slack_client_secret: str = ""
     slack_redirect_uri: str = ""
+    slack_signing_secret: str = ""
 
     gemini_api_key: str = ""
+    gemini_model: str = "gemini-2.0-flash"
+    generation_section_concurrency: int = 4
+    section_context_token_budget: int = 24000
+
+    llm_cache_enabled: bool = True
+    llm_cache_ttl_seconds: int = 604800
+    llm_cache_memory_max_entries: int = 256
+    llm_cache_persistent: bool = True
+    llm_cache_max_rows: int = 5000
+    llm_cache_prune_every: int = 100
+
+    fetch_google_concurrency: int = 4
+    fetch_slack_concurrency: int = 8
+    fetch_source_timeout_seconds: float = 60.0
+    fetch_slack_timeout_seconds: float = 300.0
+    slack_max_messages_per_channel: int = 20000
+    slack_max_bytes_per_channel: int = 8_000_000
+    slack_thread_concurrency: int = 8
+    slack_rate_limit_headroom: float = 0.9
+    slack_rate_limit_max_retries: int = 3
+    slack_user_directory_ttl_seconds: int = 21600
+    slack_user_directory_persist: bool = True
+    slack_message_cache_enabled: bool = True
+    slack_message_cache_ttl_seconds: int = 86400
+    slack_message_cache_thread_refresh_seconds: int = 600
+    slack_events_enabled: bool = True
+    slack_events_max_silence_seconds: int = 3600
+    slack_channels_fresh_seconds: int = 300
+    slack_channels_max_stale_seconds: int = 86400
+    slack_channel_access_ttl_seconds: int = 300
+    slack_normalize_enabled: bool = True
+    calendar_sync_enabled: bool = True
+    calendar_event_cache_max_age_seconds: int = 34560000
+    calendar_series_digest_enabled: bool = True
+    calendar_workload_digest_enabled: bool = True
+
+    worker_concurrency: int = 2
+    job_poll_interval_seconds: float = 2.0
+    job_lease_seconds: int = 120
+    job_heartbeat_seconds: int = 30
+    job_reclaim_interval_seconds: int = 60
+    job_max_attempts: int = 3
+    job_retry_base_seconds: int = 30
+    job_retry_max_seconds: int = 600
 
     encryption_key: str = ""
 
@@ -1,24 +1,145 @@
+"""Process-wide Supabase clients.
+
+Clients are created once and share a single keep-alive HTTP connection pool,
+so requests reuse TLS connections instead of building a new client (and pool)
+per call. ``init_supabase_clients`` / ``close_supabase_clients`` are wired into
+the FastAPI lifespan; the getters also initialize lazily for scripts and workers.
+
+The async admin client backs the repository layer so database calls never
+block the event loop.
+"""
+
+import asyncio
+import threading
+
+import httpx
+
 from app.config import settings
 
+_lock = threading.Lock()
+_http_client: httpx.Client | None = None
+_client = None
+_admin_client = None
+_async_lock = asyncio.Lock()
+_async_http_client: httpx.AsyncClient | None = None
+_async_admin_client = None
+
+
+class DatabaseNotConfiguredError(RuntimeError):
+    """Raised when Supabase credentials are missing from settings."""
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.supabase_http_max_connections,
+        max_keepalive_connections=settings.supabase_http_max_keepalive,
+        keepalive_expiry=settings.supabase_http_keepalive_expiry_seconds,
+    )
+
+
+def _get_http_client() -> httpx.Client:
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.Client(
+            timeout=settings.supabase_http_timeout_seconds,
+            limits=_http_limits(),
+            follow_redirects=True,
+            http2=True,
+        )
+    return _http_client
+
+
+def _create_client(key: str):
+    from supabase import ClientOptions, create_client
+
+    options = ClientOptions(
+        httpx_client=_get_http_client(),
+        auto_refresh_token=False,
+        persist_session=False,
+    )
+    return create_client(settings.supabase_url, key, options=options)
+
 
 def get_supabase_client():
-    """Return an initialized Supabase client.
+    """Return the shared Supabase client.
 
     Requires supabase_url and supabase_key to be configured in settings.
     """
+    global _client
     if not settings.supabase_url or not settings.supabase_key:
         return None
 
-    from supabase import create_client
-
-    return create_client(settings.supabase_url, settings.supabase_key)
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = _create_client(settings.supabase_key)
+    return _client
 
 
 def get_supabase_admin_client():
-    """Return a Supabase client using the service role key for admin operations."""
+    """Return the shared Supabase client using the service role key for admin operations."""
+    global _admin_client
     if not settings.supabase_url or not settings.supabase_service_role_key:
         return None
 
-    from supabase import create_client
+    if _admin_client is None:
+        with _lock:
+            if _admin_client is None:
+                _admin_client = _create_client(settings.supabase_service_role_key)
+    return _admin_client
+
+
+async def get_async_supabase_admin_client():
+    """Return the shared async service-role client.
+
+    Raises:
+        DatabaseNotConfiguredError: If Supabase credentials are not configured.
+    """
+    global _async_http_client, _async_admin_client
+    if not settings.supabase_url or not settings.supabase_service_role_key:
+        raise DatabaseNotConfiguredError("Database not configured")
+
+    if _async_admin_client is None:
+        async with _async_lock:
+            if _async_admin_client is None:
+                from supabase import AsyncClientOptions, acreate_client
+
+                _async_http_client = httpx.AsyncClient(
+                    timeout=settings.supabase_http_timeout_seconds,
+                    limits=_http_limits(),
+                    follow_redirects=True,
+                    http2=True,
+                )
+                options = AsyncClientOptions(
+                    httpx_client=_async_http_client,
+                    auto_refresh_token=False,
+                    persist_session=False,
+                )
+                _async_admin_client = await acreate_client(
+                    settings.supabase_url, settings.supabase_service_role_key, options=options
+                )
+    return _async_admin_client
+
+
+async def init_supabase_clients() -> None:
+    """Eagerly build the shared clients at application startup."""
+    get_supabase_client()
+    get_supabase_admin_client()
+    if settings.supabase_url and settings.supabase_service_role_key:
+        await get_async_supabase_admin_client()
+
 
-    return create_client(settings.supabase_url, settings.supabase_service_role_key)
+async def close_supabase_clients() -> None:
+    """Close the shared connection pools and drop the cached clients."""
+    global _http_client, _client, _admin_client, _async_http_client, _async_admin_client
+    with _lock:
+        if _http_client is not None:
+            _http_client.close()
+        _http_client = None
+        _client = None
+        _admin_client = None
+    async with _async_lock:
+        if _async_http_client is not None:
+            await _async_http_client.aclose()
+        _async_http_client = None
+        _async_admin_client = None
@@ -1,86 +1,155 @@
-"""Database repository layer for Supabase queries."""
+"""Database repository layer for Supabase queries.
 
-from app.db.client import get_supabase_client, get_supabase_admin_client
+Every method awaits the shared async service-role client, so a slow query only
+suspends the calling coroutine instead of blocking the event loop.
+"""
+
+from app.db.client import get_async_supabase_admin_client
 
 
 class BaseRepository:
     """Base class for database repositories."""
 
-    def __init__(self):
-        self._client = get_supabase_client()
-        self._admin_client = get_supabase_admin_client()
-
-    @property
-    def client(self):
-        return self._client
+    async def db(self):
+        """Return the shared async client. Raises DatabaseNotConfiguredError if unset."""
+        return await get_async_supabase_admin_client()
 
-    @property
-    def admin_client(self):
-        return self._admin_client
+    @staticmethod
+    def _single(result) -> dict | None:
+        # maybe_single() returns None (not an empty response) when no row matches
+        return result.data if result else None
 
 
 class UserRepository(BaseRepository):
     """Repository for user-related database operations."""
 
-    async def get_by_supabase_auth_id(self, auth_id: str) -> dict | None:
-        if not self.client:
-            return None
-        result = self.client.table("users").select("*").eq("supabase_auth_id", auth_id).maybe_single().execute()
-        return result.data
+    async def get_by_supabase_auth_id(self, auth_id: str, columns: str = "*") -> dict | None:
+        db = await self.db()
+        result = await db.table("users").select(columns).eq("supabase_auth_id", str(auth_id)).maybe_single().execute()
+        return self._single(result)
 
-    async def get_by_id(self, user_id: str) -> dict | None:
-        if not self.client:
-            return None
-        result = self.client.table("users").select("*").eq("id", user_id).maybe_single().execute()
-        return result.data
+    async def get_by_id(self, user_id: str, columns: str = "*") -> dict | None:
+        db = await self.db()
+        result = await db.table("users").select(columns).eq("id", user_id).maybe_single().execute()
+        return self._single(result)
+
+    async def get_with_tenant(self, auth_id: str) -> dict | None:
+        db = await self.db()
+        result = (
+            await db.table("users")
+            .select("*, tenants(*)")
+            .eq("supabase_auth_id", str(auth_id))
+            .maybe_single()
+            .execute()
+        )
+        return self._single(result)
 
 
-class DocumentRepository(BaseRepository):
-    """Repository for document-related database operations."""
+class OAuthTokenRepository(BaseRepository):
+    """Repository for encrypted OAuth tokens."""
 
-    async def list_by_tenant(self, tenant_id: str, page: int = 1, per_page: int = 20) -> tuple[list[dict], int]:
-        if not self.client:
-            return [], 0
-        offset = (page - 1) * per_page
+    async def get(self, user_id: str, provider: str, columns: str = "*") -> dict | None:
+        db = await self.db()
         result = (
-            self.client.table("documents")
-            .select("*", count="exact")
-            .eq("tenant_id", tenant_id)
-            .order("created_at", desc=True)
-            .range(offset, offset + per_page - 1)
+            await db.table("oauth_tokens")
+            .select(columns)
+            .eq("user_id", user_id)
+            .eq("provider", provider)
+            .maybe_single()
             .execute()
         )
+        return self._single(result)
+
+    async def list_by_user(
+        self,
+        user_id: str,
+        columns: str = "*",
+        providers: list[str] | None = None,
+    ) -> list[dict]:
+        db = await self.db()
+        query = db.table("oauth_tokens").select(columns).eq("user_id", user_id)
+        if providers:
+            query = query.in_("provider", providers)
+        result = await query.execute()
+        return result.data or []
+
+
+class DocumentRepository(BaseRepository):
+    """Repository for document-related database operations."""
+
+    async def list_by_tenant(
+        self,
+        tenant_id: str,
+        page: int = 1,
+        per_page: int = 20,
+        status: str | None = None,
+        q: str | None = None,
+    ) -> tuple[list[dict], int]:
+        db = await self.db()
+        offset = (page - 1) * per_page
+        query = db.table("documents").select("*", count="exact").eq("tenant_id", tenant_id)
+        if status:
+            query = query.eq("status", status)
+        if q:
+            query = query.ilike("title", f"%{q}%")
+        result = await query.order("created_at", desc=True).range(offset, offset + per_page - 1).execute()
         return result.data or [], result.count or 0
 
     async def get_by_id(self, document_id: str) -> dict | None:
-        if not self.client:
-            return None
-        result = self.client.table("documents").select("*").eq("id", document_id).maybe_single().execute()
-        return result.data
+        db = await self.db()
+        result = await db.table("documents").select("*").eq("id", document_id).maybe_single().execute()
+        return self._single(result)
 
     async def get_by_share_token(self, token: str) -> dict | None:
-        if not self.client:
-            return None
+        db = await self.db()
         result = (
-            self.client.table("documents")
+            await db.table("documents")
             .select("*")
             .eq("share_token", token)
             .eq("share_enabled", True)
             .maybe_single()
             .execute()
         )
-        return result.data
+        return self._single(result)
+
+    async def create(self, data: dict) -> dict:
+        db = await self.db()
+        result = await db.table("documents").insert(data).execute()
+        return result.data[0]
+
+    async def update(self, document_id: str, data: dict) -> None:
+        db = await self.db()
+        await db.table("documents").update(data).eq("id", document_id).execute()
+
+    async def delete(self, document_id: str) -> None:
+        db = await self.db()
+        await db.table("documents").delete().eq("id", document_id).execute()
+
+    async def list_sections(self, document_id: str) -> list[dict]:
+        db = await self.db()
+        result = (
+            await db.table("document_sections")
+            .select("*")
+            .eq("document_id", document_id)
+            .order("section_order")
+            .execute()
+        )
+        return result.data or []
+
+    async def update_section(self, section_id: str, data: dict) -> dict | None:
+        db = await self.db()
+        result = await db.table("document_sections").update(data).eq("id", section_id).execute()
+        return result.data[0] if result.data else None
 
 
 class TemplateRepository(BaseRepository):
     """Repository for template-related database operations."""
 
     async def list_by_tenant(self, tenant_id: str, page: int = 1, per_page: int = 20) -> tuple[list[dict], int]:
-        if not self.client:
-            return [], 0
+        db = await self.db()
         offset = (page - 1) * per_page
         result = (
-            self.client.table("templates")
+            await db.table("templates")
             .select("*", count="exact")
             .eq("tenant_id", tenant_id)
             .order("created_at", desc=True)
@@ -89,18 +158,414 @@ class TemplateRepository(BaseRepository):
         )
         return result.data or [], result.count or 0
 
-    async def get_by_id(self, template_id: str) -> dict | None:
-        if not self.client:
-            return None
-        result = self.client.table("templates").select("*").eq("id", template_id).maybe_single().execute()
-        return result.data
+    async def get_by_id(self, template_id: str, columns: str = "*") -> dict | None:
+        db = await self.db()
+        result = await db.table("templates").select(columns).eq("id", template_id).maybe_single().execute()
+        return self._single(result)
+
+    async def create(self, data: dict) -> dict:
+        db = await self.db()
+        result = await db.table("templates").insert(data).execute()
+        return result.data[0]
+
+    async def update(self, template_id: str, data: dict) -> None:
+        db = await self.db()
+        await db.table("templates").update(data).eq("id", template_id).execute()
+
+    async def delete(self, template_id: str) -> None:
+        db = await self.db()
+        await db.table("templates").delete().eq("id", template_id).execute()
+
+
+class AIProposalRepository(BaseRepository):
+    """Repository for AI section-structure proposals."""
+
+    async def create(self, document_id: str, proposed_structure: list[dict]) -> dict:
+        db = await self.db()
+        result = await db.table("ai_proposals").insert({
+            "document_id": document_id,
+            "proposed_structure": proposed_structure,
+            "status": "pending",
+        }).execute()
+        return result.data[0]
+
+    async def get_latest(self, document_id: str, status: str | None = None, columns: str = "*") -> dict | None:
+        db = await self.db()
+        query = db.table("ai_proposals").select(columns).eq("document_id", document_id)
+        if status:
+            query = query.eq("status", status)
+        result = await query.order("created_at", desc=True).limit(1).execute()
+        return result.data[0] if result.data else None
+
+    async def update(self, proposal_id: str, data: dict) -> None:
+        db = await self.db()
+        await db.table("ai_proposals").update(data).eq("id", proposal_id).execute()
 
 
 class GenerationJobRepository(BaseRepository):
     """Repository for generation job operations."""
 
     async def get_by_id(self, job_id: str) -> dict | None:
-        if not self.client:
-            return None
-        result = self.client.table("generation_jobs").select("*").eq("id", job_id).maybe_single().execute()
+        db = await self.db()
+        result = await db.table("generation_jobs").select("*").eq("id", job_id).maybe_single().execute()
+        return self._single(result)
+
+    async def create(self, data: dict) -> dict:
+        db = await self.db()
+        result = await db.table("generation_jobs").insert(data).execute()
+        return result.data[0]
+
+    async def update(self, job_id: str, data: dict, locked_by: str | None = None) -> None:
+        """Update a job, optionally only while it is still leased by ``locked_by``."""
+        db = await self.db()
+        query = db.table("generation_jobs").update(data).eq("id", job_id)
+        if locked_by is not None:
+            query = query.eq("locked_by", locked_by)
+        await query.execute()
+
+    async def rpc(self, fn: str, params: dict):
+        db = await self.db()
+        result = await db.rpc(fn, params).execute()
         return result.data
+
+
+class LLMCacheRepository(BaseRepository):
+    """Repository for the persistent LLM response cache."""
+
+    async def get(self, cache_key: str) -> dict | None:
+        db = await self.db()
+        result = (
+            await db.table("llm_cache")
+            .select("response, expires_at")
+            .eq("cache_key", cache_key)
+            .maybe_single()
+            .execute()
+        )
+        return self._single(result)
+
+    async def touch(self, cache_key: str) -> None:
+        db = await self.db()
+        await db.rpc("touch_llm_cache", {"p_cache_key": cache_key}).execute()
+
+    async def upsert(self, data: dict) -> None:
+        db = await self.db()
+        await db.table("llm_cache").upsert(data, on_conflict="cache_key").execute()
+
+    async def delete(self, cache_key: str) -> None:
+        db = await self.db()
+        await db.table("llm_cache").delete().eq("cache_key", cache_key).execute()
+
+    async def prune(self, max_rows: int) -> int:
+        db = await self.db()
+        result = await db.rpc("prune_llm_cache", {"p_max_rows": max_rows}).execute()
+        return result.data or 0
+
+
+class SlackUserDirectoryRepository(BaseRepository):
+    """Repository for persisted Slack workspace user directories."""
+
+    async def get(self, team_id: str) -> dict | None:
+        db = await self.db()
+        result = (
+            await db.table("slack_user_directory")
+            .select("users, refreshed_at")
+            .eq("team_id", team_id)
+            .maybe_single()
+            .execute()
+        )
+        return self._single(result)
+
+    async def upsert(self, team_id: str, users: dict[str, str], refreshed_at: str) -> None:
+        db = await self.db()
+        await db.table("slack_user_directory").upsert(
+            {"team_id": team_id, "users": users, "user_count": len(users), "refreshed_at": refreshed_at},
+            on_conflict="team_id",
+        ).execute()
+
+
+class SlackMessageCacheRepository(BaseRepository):
+    """Repository for cached Slack messages and channel coverage."""
+
+    async def get_coverage(self, tenant_id: str, team_id: str, channel_id: str) -> list[list[float]]:
+        db = await self.db()
+        result = (
+            await db.table("slack_channel_coverage")
+            .select("intervals")
+            .eq("tenant_id", tenant_id)
+            .eq("team_id", team_id)
+            .eq("channel_id", channel_id)
+            .maybe_single()
+            .execute()
+        )
+        row = self._single(result)
+        return row["intervals"] if row else []
+
+    async def set_coverage(
+        self,
+        tenant_id: str,
+        team_id: str,
+        channel_id: str,
+        intervals: list[list[float]],
+        updated_at: str,
+    ) -> None:
+        db = await self.db()
+        await db.table("slack_channel_coverage").upsert(
+            {
+                "tenant_id": tenant_id,
+                "team_id": team_id,
+                "channel_id": channel_id,
+                "intervals": intervals,
+                "updated_at": updated_at,
+            },
+            on_conflict="tenant_id,team_id,channel_id",
+        ).execute()
+
+    async def list_messages(
+        self,
+        tenant_id: str,
+        team_id: str,
+        channel_id: str,
+        oldest: float,
+        latest: float,
+        limit: int = 1000,
+    ) -> list[dict]:
+        """Return up to ``limit`` messages with oldest <= ts <= latest, newest first."""
+        db = await self.db()
+        result = (
+            await db.table("slack_message_cache")
+            .select("ts, message, latest_reply, fetched_at")
+            .eq("tenant_id", tenant_id)
+            .eq("team_id", team_id)
+            .eq("channel_id", channel_id)
+            .gte("ts", oldest)
+            .lte("ts", latest)
+            .order("ts", desc=True)
+            .limit(limit)
+            .execute()
+        )
+        return result.data or []
+
+    async def upsert_messages(self, rows: list[dict]) -> None:
+        if not rows:
+            return
+        db = await self.db()
+        await db.table("slack_message_cache").upsert(rows, on_conflict="tenant_id,team_id,channel_id,ts").execute()
+
+    async def prune(self, max_age_seconds: int) -> int:
+        db = await self.db()
+        result = await db.rpc("prune_slack_message_cache", {"p_max_age_seconds": max_age_seconds}).execute()
+        return result.data or 0
+
+
+class SlackIngestRepository(BaseRepository):
+    """Repository for messages received through the Slack Events API."""
+
+    async def get_channel(self, team_id: str, channel_id: str) -> dict | None:
+        db = await self.db()
+        result = (
+            await db.table("slack_ingested_channels")
+            .select("ingesting_since, last_event_at")
+            .eq("team_id", team_id)
+            .eq("channel_id", channel_id)
+            .maybe_single()
+            .execute()
+        )
+        return self._single(result)
+
+    async def get_team_last_event(self, team_id: str) -> str | None:
+        """Return when the most recent event from any channel of a workspace arrived."""
+        db = await self.db()
+        result = (
+            await db.table("slack_ingested_channels")
+            .select("last_event_at")
+            .eq("team_id", team_id)
+            .order("last_event_at", desc=True)
+            .limit(1)
+            .execute()
+        )
+        return result.data[0]["last_event_at"] if result.data else None
+
+    async def register_channel(self, team_id: str, channel_id: str, since: str, now: str) -> None:
+        """Mark a channel as ingested, keeping the original start if it already is."""
+        db = await self.db()
+        await db.table("slack_ingested_channels").upsert(
+            {"team_id": team_id, "channel_id": channel_id, "ingesting_since": since, "last_event_at": now},
+            on_conflict="team_id,channel_id",
+            ignore_duplicates=True,
+        ).execute()
+        await (
+            db.table("slack_ingested_channels")
+            .update({"last_event_at": now})
+            .eq("team_id", team_id)
+            .eq("channel_id", channel_id)
+            .execute()
+        )
+
+    async def upsert_message(self, data: dict) -> None:
+        db = await self.db()
+        await db.table("slack_ingested_messages").upsert(data, on_conflict="team_id,channel_id,ts").execute()
+
+    async def update_message(self, team_id: str, channel_id: str, ts: str, data: dict) -> bool:
+        """Update a stored message. Returns False if no message has that ts."""
+        db = await self.db()
+        result = await (
+            db.table("slack_ingested_messages")
+            .update(data)
+            .eq("team_id", team_id)
+            .eq("channel_id", channel_id)
+            .eq("ts", ts)
+            .execute()
+        )
+        return bool(result.data)
+
+    async def list_messages(
+        self,
+        team_id: str,
+        channel_id: str,
+        oldest: str,
+        latest: str,
+        limit: int = 1000,
+        latest_exclusive: bool = False,
+    ) -> list[dict]:
+        """Return up to ``limit`` top-level messages with oldest <= ts <= latest, newest first."""
+        db = await self.db()
+        query = (
+            db.table("slack_ingested_messages")
+            .select("ts, thread_ts, user_id, text, subtype, bot_id")
+            .eq("team_id", team_id)
+            .eq("channel_id", channel_id)
+            .eq("deleted", False)
+            .eq("is_reply", False)
+            .gte("ts", oldest)
+        )
+        query = query.lt("ts", latest) if latest_exclusive else query.lte("ts", latest)
+        result = await query.order("ts", desc=True).limit(limit).execute()
+        return result.data or []
+
+    async def list_replies(self, team_id: str, channel_id: str, thread_ts: list[str]) -> list[dict]:
+        if not thread_ts:
+            return []
+        db = await self.db()
+        result = (
+            await db.table("slack_ingested_messages")
+            .select("ts, thread_ts, user_id, text, subtype, bot_id")
+            .eq("team_id", team_id)
+            .eq("channel_id", channel_id)
+            .eq("deleted", False)
+            .eq("is_reply", True)
+            .in_("thread_ts", thread_ts)
+            .order("ts")
+            .execute()
+        )
+        return result.data or []
+
+
+class CalendarEventCacheRepository(BaseRepository):
+    """Repository for the per-user Calendar event store and its sync state."""
+
+    async def get_state(self, user_id: str, calendar_id: str) -> dict | None:
+        db = await self.db()
+        result = (
+            await db.table("calendar_sync_state")
+            .select("sync_token, windows, synced_at")
+            .eq("user_id", user_id)
+            .eq("calendar_id", calendar_id)
+            .maybe_single()
+            .execute()
+        )
+        return self._single(result)
+
+    async def save_state(
+        self,
+        user_id: str,
+        calendar_id: str,
+        sync_token: str | None,
+        windows: list[list[float]],
+        synced_at: str,
+    ) -> None:
+        db = await self.db()
+        await db.table("calendar_sync_state").upsert(
+            {
+                "user_id": user_id,
+                "calendar_id": calendar_id,
+                "sync_token": sync_token,
+                "windows": windows,
+                "synced_at": synced_at,
+            },
+            on_conflict="user_id,calendar_id",
+        ).execute()
+
+    async def save_state_if(
+        self,
+        user_id: str,
+        calendar_id: str,
+        expected_token: str | None,
+        sync_token: str | None,
+        windows: list[list[float]],
+    ) -> bool:
+        """Save the sync state only if its token is still ``expected_token``."""
+        db = await self.db()
+        result = await db.rpc(
+            "save_calendar_sync_state",
+            {
+                "p_user_id": user_id,
+                "p_calendar_id": calendar_id,
+                "p_expected_token": expected_token,
+                "p_sync_token": sync_token,
+                "p_windows": windows,
+            },
+        ).execute()
+        return bool(result.data)
+
+    async def prune(self, max_age_seconds: int) -> int:
+        db = await self.db()
+        result = await db.rpc("prune_calendar_event_cache", {"p_max_age_seconds": max_age_seconds}).execute()
+        return result.data or 0
+
+    async def upsert_events(self, rows: list[dict]) -> None:
+        if not rows:
+            return
+        db = await self.db()
+        await db.table("calendar_event_cache").upsert(rows, on_conflict="user_id,calendar_id,event_id").execute()
+
+    async def delete_events(self, user_id: str, calendar_id: str, event_ids: list[str]) -> None:
+        if not event_ids:
+            return
+        db = await self.db()
+        await (
+            db.table("calendar_event_cache")
+            .delete()
+            .eq("user_id", user_id)
+            .eq("calendar_id", calendar_id)
+            .in_("event_id", event_ids)
+            .execute()
+        )
+
+    async def clear(self, user_id: str, calendar_id: str) -> None:
+        db = await self.db()
+        await db.table("calendar_event_cache").delete().eq("user_id", user_id).eq("calendar_id", calendar_id).execute()
+
+    async def list_events(
+        self,
+        user_id: str,
+        calendar_id: str,
+        time_min: str,
+        time_max: str,
+        limit: int = 1000,
+        offset: int = 0,
+    ) -> list[dict]:
+        """Return stored events overlapping [time_min, time_max), by start time."""
+        db = await self.db()
+        result = (
+            await db.table("calendar_event_cache")
+            .select("event")
+            .eq("user_id", user_id)
+            .eq("calendar_id", calendar_id)
+            .lt("start_at", time_max)
+            .gt("end_at", time_min)
+            .order("start_at")
+            .order("event_id")
+            .range(offset, offset + limit - 1)
+            .execute()
+        )
+        return [row["event"] for row in result.data or []]
@@ -1,20 +1,29 @@
+import asyncio
+
 from fastapi import Depends, Header, HTTPException, status
 
 from app.db.client import get_supabase_client
+from app.models.user import Identity
+from app.services.identity import identity_service
+from app.services.token_verifier import InvalidTokenError, token_verifier
 
 
-async def get_current_user(authorization: str = Header(default="")):
-    """Extract and validate the Supabase JWT from the Authorization header.
+async def authenticate_token(token: str):
+    """Validate a Supabase JWT and return the authenticated user.
 
-    Returns the authenticated user dict or raises 401.
+    Tokens are verified locally (signature, expiry, audience) whenever a signing
+    key is available; the Supabase Auth API is only called as a fallback.
     """
-    if not authorization.startswith("Bearer "):
+    try:
+        user = await token_verifier.verify(token)
+    except InvalidTokenError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Authorization header must start with 'Bearer '",
+            detail="Invalid or expired token",
         )
+    if user is not None:
+        return user
 
-    token = authorization.removeprefix("Bearer ")
     client = get_supabase_client()
     if client is None:
         raise HTTPException(
@@ -23,7 +32,7 @@ async def get_current_user(authorization: str = Header(default="")):
         )
 
     try:
-        user_response = client.auth.get_user(token)
+        user_response = await asyncio.to_thread(client.auth.get_user, token)
         if user_response is None or user_response.user is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -37,6 +46,33 @@ async def get_current_user(authorization: str = Header(default="")):
         )
 
 
+async def get_current_user(authorization: str = Header(default="")):
+    """Extract and validate the Supabase JWT from the Authorization header.
+
+    Returns the authenticated user or raises 401.
+    """
+    if not authorization.startswith("Bearer "):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authorization header must start with 'Bearer '",
+        )
+
+    token = authorization.removeprefix("Bearer ")
+    return await authenticate_token(token)
+
+
 async def get_current_user_id(user=Depends(get_current_user)) -> str:
     """Return the authenticated user's Supabase auth ID."""
     return user.id
+
+
+async def get_current_identity(user=Depends(get_current_user)) -> Identity:  # noqa: B008 - FastAPI dependency
+    """Return the user id, tenant id and role of the authenticated user.
+
+    FastAPI memoizes this dependency for the duration of a request, and the
+    identity service caches it across requests.
+    """
+    identity = await identity_service.resolve(user.id)
+    if identity is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    return identity
@@ -1,13 +1,29 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from app.config import settings
-from app.routers import auth, data_sources, documents, templates, shared
+from app.db.client import DatabaseNotConfiguredError, close_supabase_clients, init_supabase_clients
+from app.routers import auth, data_sources, documents, templates, shared, slack_events
+from app.services.llm_cache import llm_cache
+from app.services.slack_rate_limit import slack_rate_limiter
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build shared clients on startup and release their connections on shutdown."""
+    await init_supabase_clients()
+    yield
+    await close_supabase_clients()
+
 
 app = FastAPI(
     title="hikitugu API",
     description="AI-powered handover document generator API",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -18,14 +34,36 @@ app.add_middleware(
     allow_headers=["Authorization", "Content-Type"],
 )
 
+
+@app.exception_handler(DatabaseNotConfiguredError)
+async def database_not_configured_handler(request: Request, exc: DatabaseNotConfiguredError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Database not configured"},
+    )
+
+
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(data_sources.router, prefix="/api/data", tags=["data-sources"])
 app.include_router(documents.router, prefix="/api/documents", tags=["documents"])
 app.include_router(templates.router, prefix="/api/templates", tags=["templates"])
 app.include_router(shared.router, prefix="/api/shared", tags=["shared"])
+app.include_router(slack_events.router, prefix="/api/slack", tags=["slack-events"])
 
 
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint."""
     return {"status": "ok", "version": "0.1.0"}
+
+
+@app.get("/api/health/llm-cache")
+async def llm_cache_stats():
+    """Hit/miss counters of the LLM response cache in this process."""
+    return llm_cache.stats()
+
+
+@app.get("/api/health/slack-rate-limits")
+async def slack_rate_limit_metrics():
+    """Queue depth and throttle counters of the Slack request scheduler in this process."""
+    return slack_rate_limiter.metrics()
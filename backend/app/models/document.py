@@ -47,6 +47,8 @@ class GenerateRequest(BaseModel):
     data_sources: list[str] = []
     slack_channel_ids: list[str] = []
     spreadsheet_ids: list[str] = []
+    calendar_ids: list[str] = []
+    all_calendars: bool = False
 
 
 class ProposeRequest(BaseModel):
@@ -57,6 +59,8 @@ class ProposeRequest(BaseModel):
     data_sources: list[str] = []
     slack_channel_ids: list[str] = []
     spreadsheet_ids: list[str] = []
+    calendar_ids: list[str] = []
+    all_calendars: bool = False
 
 
 class ApproveProposalRequest(BaseModel):
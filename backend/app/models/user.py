@@ -17,6 +17,21 @@ class UserResponse(BaseModel):
     tenant: TenantInfo | None = None
 
 
+class AuthenticatedUser(BaseModel):
+    """Identity carried by a verified Supabase access token."""
+    id: str
+    email: str | None = None
+    role: str | None = None
+
+
+class Identity(BaseModel):
+    """Application identity resolved from a Supabase auth ID."""
+    auth_id: str
+    user_id: str
+    tenant_id: str
+    role: str = "member"
+
+
 class AuthStatus(BaseModel):
     google: dict = {}
     slack: dict = {}
@@ -0,0 +1,81 @@
+"""Replay recorded Slack Events API payloads.
+
+Run with ``python -m app.replay_slack_events events.jsonl``. Each line is one
+payload as Slack sent it. Payloads are signed with ``SLACK_SIGNING_SECRET``
+and posted to the events endpoint, or with ``--direct`` stored without going
+through HTTP, which is useful for backfilling or testing ingestion locally.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import time
+
+import httpx
+
+from app.config import settings
+from app.db.client import close_supabase_clients
+from app.services.slack_events import slack_event_service
+
+logger = logging.getLogger(__name__)
+
+
+def _sign(body: bytes, timestamp: str) -> str:
+    basestring = b"v0:" + timestamp.encode() + b":" + body
+    return "v0=" + hmac.new(settings.slack_signing_secret.encode(), basestring, hashlib.sha256).hexdigest()
+
+
+async def _replay(payloads: list[dict], url: str, direct: bool) -> None:
+    sent = failed = 0
+    try:
+        async with httpx.AsyncClient(timeout=10) as client:
+            for payload in payloads:
+                if direct:
+                    await slack_event_service.ingest(payload)
+                    sent += 1
+                    continue
+
+                # Signed with the current time so the endpoint's replay window accepts it
+                body = json.dumps(payload, ensure_ascii=False).encode()
+                timestamp = str(int(time.time()))
+                resp = await client.post(
+                    url,
+                    content=body,
+                    headers={
+                        "Content-Type": "application/json",
+                        "X-Slack-Request-Timestamp": timestamp,
+                        "X-Slack-Signature": _sign(body, timestamp),
+                    },
+                )
+                if resp.is_success:
+                    sent += 1
+                else:
+                    failed += 1
+                    logger.warning("Event %s rejected: %s %s", payload.get("event_id"), resp.status_code, resp.text)
+    finally:
+        await close_supabase_clients()
+    logger.info("Replayed %d events (%d failed)", sent, failed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded Slack Events API payloads")
+    parser.add_argument("path", help="JSON Lines file with one event payload per line")
+    parser.add_argument("--url", default="http://localhost:8000/api/slack/events", help="Events endpoint")
+    parser.add_argument("--direct", action="store_true", help="Store events directly instead of posting them")
+    args = parser.parse_args()
+
+    if not args.direct and not settings.slack_signing_secret:
+        parser.error("SLACK_SIGNING_SECRET is required to sign replayed events")
+
+    with open(args.path, encoding="utf-8") as f:
+        payloads = [json.loads(line) for line in f if line.strip()]
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(_replay(payloads, args.url, args.direct))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,17 +5,20 @@ from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from fastapi.responses import RedirectResponse
 
 from app.config import settings
-from app.db.client import get_supabase_client, get_supabase_admin_client
-from app.dependencies import get_current_user
+from app.db.repositories import OAuthTokenRepository, UserRepository
+from app.dependencies import authenticate_token, get_current_user
 from app.models.user import AuthStatus, UserResponse, TenantInfo
 from app.services.auth import AuthService
+from app.services.identity import identity_service
 
 router = APIRouter()
 
 _auth_service = AuthService()
+_user_repo = UserRepository()
+_token_repo = OAuthTokenRepository()
 
 
-def _get_user_from_token(request: Request, token: str | None = Query(default=None)):
+async def _get_user_from_token(request: Request, token: str | None = Query(default=None)):
     """Try Authorization header first, then fall back to query param token."""
     auth_header = request.headers.get("authorization", "")
     if auth_header.startswith("Bearer "):
@@ -27,18 +30,7 @@ def _get_user_from_token(request: Request, token: str | None = Query(default=Non
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Authorization required",
         )
-    client = get_supabase_client()
-    if client is None:
-        raise HTTPException(status_code=503, detail="Supabase not configured")
-    try:
-        resp = client.auth.get_user(jwt)
-        if resp is None or resp.user is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return resp.user
-    except HTTPException:
-        raise
-    except Exception:
-        raise HTTPException(status_code=401, detail="Invalid token")
+    return await authenticate_token(jwt)
 
 
 @router.get("/google")
@@ -90,18 +82,12 @@ async def google_callback(request: Request, code: str = "", state: str = ""):
 @router.get("/slack")
 async def slack_login(request: Request, token: str | None = Query(default=None)):
     """Start Slack OAuth 2.0 flow. Requires authenticated user."""
-    user = _get_user_from_token(request, token)
-
-    # Get user_id from users table
-    admin = get_supabase_admin_client()
-    user_row = (
-        admin.table("users")
-        .select("id")
-        .eq("supabase_auth_id", str(user.id))
-        .single()
-        .execute()
-    )
-    user_id = user_row.data["id"]
+    user = await _get_user_from_token(request, token)
+
+    identity = await identity_service.resolve(user.id)
+    if identity is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    user_id = identity.user_id
 
     state = secrets.token_urlsafe(32)
 
@@ -151,19 +137,11 @@ async def slack_callback(request: Request, code: str = "", state: str = ""):
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(user=Depends(get_current_user)):
     """Get the currently authenticated user's information."""
-    admin = get_supabase_admin_client()
-    result = (
-        admin.table("users")
-        .select("*, tenants(*)")
-        .eq("supabase_auth_id", str(user.id))
-        .maybe_single()
-        .execute()
-    )
+    data = await _user_repo.get_with_tenant(user.id)
 
-    if not result.data:
+    if not data:
         raise HTTPException(status_code=404, detail="User not found")
 
-    data = result.data
     tenant_data = data.get("tenants")
     tenant = None
     if tenant_data:
@@ -195,37 +173,21 @@ async def logout(user=Depends(get_current_user)):
 @router.get("/status", response_model=AuthStatus)
 async def auth_status(user=Depends(get_current_user)):
     """Check connection status for each external service."""
-    admin = get_supabase_admin_client()
-
-    # Get user_id
-    user_row = (
-        admin.table("users")
-        .select("id")
-        .eq("supabase_auth_id", str(user.id))
-        .maybe_single()
-        .execute()
-    )
+    identity = await identity_service.resolve(user.id)
 
-    if not user_row.data:
+    if identity is None:
         return AuthStatus(
             google={"connected": False},
             slack={"connected": False},
         )
 
-    user_id = user_row.data["id"]
-
     # Query oauth_tokens
-    tokens = (
-        admin.table("oauth_tokens")
-        .select("provider, scopes, metadata, token_expires_at")
-        .eq("user_id", user_id)
-        .execute()
-    )
+    tokens = await _token_repo.list_by_user(identity.user_id, columns="provider, scopes, metadata, token_expires_at")
 
     google_status: dict = {"connected": False}
     slack_status: dict = {"connected": False}
 
-    for t in tokens.data or []:
+    for t in tokens:
         if t["provider"] == "google":
             google_status = {
                 "connected": True,
@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel
 
-from app.db.client import get_supabase_admin_client
-from app.dependencies import get_current_user
+from app.db.repositories import OAuthTokenRepository
+from app.dependencies import get_current_identity
 from app.models.common import ApiResponse
+from app.models.user import Identity
 from app.services.calendar import CalendarService
 from app.services.data_aggregator import DataAggregatorService
+from app.services.data_fetcher import DataFetchService
 from app.services.encryption import EncryptionService
 from app.services.slack import SlackService
 from app.services.spreadsheet import SheetsService
@@ -17,34 +19,28 @@ slack_service = SlackService()
 sheets_service = SheetsService()
 encryption_service = EncryptionService()
 aggregator_service = DataAggregatorService()
+fetch_service = DataFetchService(calendar_service, slack_service, sheets_service)
+token_repo = OAuthTokenRepository()
 
 
-async def _get_decrypted_token(user, provider: str) -> str:
+async def _get_decrypted_token(identity: Identity, provider: str) -> str:
     """Retrieve and decrypt an OAuth token for the given provider."""
-    admin = get_supabase_admin_client()
-    if not admin:
-        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database not configured")
-
-    auth_id = user.id
-    user_row = admin.table("users").select("id").eq("supabase_auth_id", auth_id).maybe_single().execute()
-    if not user_row.data:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-
-    token_row = (
-        admin.table("oauth_tokens")
-        .select("encrypted_access_token")
-        .eq("user_id", user_row.data["id"])
-        .eq("provider", provider)
-        .maybe_single()
-        .execute()
-    )
-    if not token_row.data:
+    token_row = await token_repo.get(identity.user_id, provider, columns="encrypted_access_token")
+    if not token_row:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"{provider} is not connected. Please connect via settings.",
         )
 
-    return encryption_service.decrypt(token_row.data["encrypted_access_token"])
+    return encryption_service.decrypt(token_row["encrypted_access_token"])
+
+
+@router.get("/calendar/calendars")
+async def list_calendars(identity: Identity = Depends(get_current_identity)):  # noqa: B008 - FastAPI dependency
+    """List the calendars in the user's Google calendar list."""
+    token = await _get_decrypted_token(identity, "google")
+    calendars = await calendar_service.list_calendars(token)
+    return {"calendars": calendars}
 
 
 @router.get("/calendar/events")
@@ -52,19 +48,33 @@ async def get_calendar_events(
     date_from: str = Query(..., description="Start date (YYYY-MM-DD)"),
     date_to: str = Query(..., description="End date (YYYY-MM-DD)"),
     target_email: str | None = None,
-    user=Depends(get_current_user),
+    calendar_ids: list[str] = Query([], description="Calendars to read; defaults to the primary calendar"),  # noqa: B008 - FastAPI query parameter
+    all_calendars: bool = Query(False, description="Also read every calendar in the user's calendar list"),
+    identity: Identity = Depends(get_current_identity),
 ):
     """Fetch Google Calendar events for the given date range."""
-    token = await _get_decrypted_token(user, "google")
-    events = await calendar_service.get_events(token, date_from, date_to, target_email)
+    token = await _get_decrypted_token(identity, "google")
+    events = await calendar_service.get_events(
+        token,
+        date_from,
+        date_to,
+        target_email,
+        user_id=identity.user_id,
+        calendar_ids=calendar_ids or None,
+        all_calendars=all_calendars,
+    )
     return {"events": events, "total_count": len(events)}
 
 
 @router.get("/slack/channels")
-async def get_slack_channels(user=Depends(get_current_user)):
+async def get_slack_channels(
+    include_private: bool = Query(False, description="Include private channels the user is a member of"),
+    refresh: bool = Query(False, description="Bypass the cached channel list"),
+    identity: Identity = Depends(get_current_identity),
+):
     """List Slack channels the user has access to."""
-    token = await _get_decrypted_token(user, "slack")
-    channels = await slack_service.get_channels(token)
+    token = await _get_decrypted_token(identity, "slack")
+    channels = await slack_service.get_channels(token, include_private=include_private, refresh=refresh)
     return {"channels": channels}
 
 
@@ -73,18 +83,20 @@ async def get_slack_messages(
     channel_id: str = Query(..., description="Slack channel ID"),
     date_from: str = Query(..., description="Start date (YYYY-MM-DD)"),
     date_to: str = Query(..., description="End date (YYYY-MM-DD)"),
-    user=Depends(get_current_user),
+    identity: Identity = Depends(get_current_identity),
 ):
     """Fetch Slack messages from a channel for the given date range."""
-    token = await _get_decrypted_token(user, "slack")
-    messages = await slack_service.get_messages(token, channel_id, date_from, date_to)
+    token = await _get_decrypted_token(identity, "slack")
+    messages = await slack_service.get_messages(
+        token, channel_id, date_from, date_to, tenant_id=identity.tenant_id
+    )
     return {"messages": messages, "total_count": len(messages)}
 
 
 @router.get("/spreadsheets")
-async def list_spreadsheets(user=Depends(get_current_user)):
+async def list_spreadsheets(identity: Identity = Depends(get_current_identity)):
     """List Google Spreadsheets accessible by the user."""
-    token = await _get_decrypted_token(user, "google")
+    token = await _get_decrypted_token(identity, "google")
     spreadsheets = await sheets_service.list_spreadsheets(token)
     return {"spreadsheets": spreadsheets}
 
@@ -93,10 +105,10 @@ async def list_spreadsheets(user=Depends(get_current_user)):
 async def get_spreadsheet(
     spreadsheet_id: str,
     sheet_name: str | None = None,
-    user=Depends(get_current_user),
+    identity: Identity = Depends(get_current_identity),
 ):
     """Get a specific spreadsheet's data."""
-    token = await _get_decrypted_token(user, "google")
+    token = await _get_decrypted_token(identity, "google")
     data = await sheets_service.get_spreadsheet(token, spreadsheet_id, sheet_name)
     return data
 
@@ -108,34 +120,43 @@ class DataPreviewRequest(BaseModel):
     data_sources: list[str] = []
     slack_channel_ids: list[str] = []
     spreadsheet_ids: list[str] = []
+    calendar_ids: list[str] = []
+    all_calendars: bool = False
 
 
 @router.post("/preview")
 async def preview_aggregated_data(
     body: DataPreviewRequest,
-    user=Depends(get_current_user),
+    identity: Identity = Depends(get_current_identity),
 ):
     """Preview aggregated data from all selected sources before generation."""
-    calendar_events: list[dict] = []
-    slack_messages: list[dict] = []
-    spreadsheet_data: list[dict] = []
-
-    if "calendar" in body.data_sources:
-        token = await _get_decrypted_token(user, "google")
-        calendar_events = await calendar_service.get_events(
-            token, body.date_from, body.date_to, body.target_email
-        )
-
+    google_token = None
+    slack_token = None
+    if "calendar" in body.data_sources or "spreadsheet" in body.data_sources:
+        google_token = await _get_decrypted_token(identity, "google")
     if "slack" in body.data_sources:
-        token = await _get_decrypted_token(user, "slack")
-        for ch_id in body.slack_channel_ids:
-            msgs = await slack_service.get_messages(token, ch_id, body.date_from, body.date_to)
-            slack_messages.extend(msgs)
-
-    if "spreadsheet" in body.data_sources:
-        token = await _get_decrypted_token(user, "google")
-        for ss_id in body.spreadsheet_ids:
-            ss = await sheets_service.get_spreadsheet(token, ss_id)
-            spreadsheet_data.append(ss)
-
-    return await aggregator_service.aggregate(calendar_events, slack_messages, spreadsheet_data)
+        slack_token = await _get_decrypted_token(identity, "slack")
+
+    fetched = await fetch_service.fetch_all(
+        date_from=body.date_from,
+        date_to=body.date_to,
+        target_email=body.target_email,
+        google_token=google_token,
+        slack_token=slack_token,
+        include_calendar="calendar" in body.data_sources,
+        calendar_ids=body.calendar_ids or None,
+        all_calendars=body.all_calendars,
+        slack_channel_ids=body.slack_channel_ids,
+        spreadsheet_ids=body.spreadsheet_ids if "spreadsheet" in body.data_sources else [],
+        tenant_id=identity.tenant_id,
+        user_id=identity.user_id,
+    )
+
+    return await aggregator_service.aggregate(
+        fetched["calendar_events"],
+        fetched["slack_messages"],
+        fetched["spreadsheet_data"],
+        fetched["errors"],
+        owner_email=body.target_email,
+        slack_user_names=fetched["slack_user_names"],
+    )
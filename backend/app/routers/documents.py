@@ -4,8 +4,12 @@ import secrets
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.responses import StreamingResponse
 
-from app.db.client import get_supabase_admin_client
-from app.dependencies import get_current_user
+from app.db.repositories import (
+    AIProposalRepository,
+    DocumentRepository,
+    GenerationJobRepository,
+)
+from app.dependencies import get_current_identity, get_current_user
 from app.models.document import (
     ApproveProposalRequest,
     DocumentResponse,
@@ -18,51 +22,31 @@ from app.models.document import (
     SectionUpdateRequest,
 )
 from app.models.job import JobStatusResponse
+from app.models.user import Identity
 from app.models.common import PaginatedResponse
 from app.services.file_generator import FileGeneratorService
 from app.services.generation import GenerationService
+from app.services.job_queue import JobQueueService
 
 router = APIRouter()
 
 file_generator = FileGeneratorService()
 generation_service = GenerationService()
-
-
-async def _get_tenant_id(user) -> str:
-    """Get the tenant_id for the current user."""
-    admin = get_supabase_admin_client()
-    if not admin:
-        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database not configured")
-    row = admin.table("users").select("tenant_id").eq("supabase_auth_id", user.id).maybe_single().execute()
-    if not row.data:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    return row.data["tenant_id"]
-
-
-async def _get_user_id(user) -> str:
-    """Get the internal user id from the supabase auth id."""
-    admin = get_supabase_admin_client()
-    if not admin:
-        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database not configured")
-    row = admin.table("users").select("id").eq("supabase_auth_id", user.id).maybe_single().execute()
-    if not row.data:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    return row.data["id"]
+job_queue = JobQueueService()
+document_repo = DocumentRepository()
+proposal_repo = AIProposalRepository()
+job_repo = GenerationJobRepository()
 
 
 # --- Generation endpoints ---
 
 
 @router.post("/generate", response_model=GenerationResponse, status_code=status.HTTP_202_ACCEPTED)
-async def generate_document(body: GenerateRequest, user=Depends(get_current_user)):
+async def generate_document(body: GenerateRequest, identity: Identity = Depends(get_current_identity)):
     """Start asynchronous document generation using a template."""
-    admin = get_supabase_admin_client()
-    tenant_id = await _get_tenant_id(user)
-    user_id = await _get_user_id(user)
-
-    doc = admin.table("documents").insert({
-        "tenant_id": tenant_id,
-        "created_by": user_id,
+    doc = await document_repo.create({
+        "tenant_id": identity.tenant_id,
+        "created_by": identity.user_id,
         "title": body.title,
         "target_user_email": body.target_user_email,
         "generation_mode": "template",
@@ -74,19 +58,13 @@ async def generate_document(body: GenerateRequest, user=Depends(get_current_user
         "metadata": {
             "slack_channel_ids": body.slack_channel_ids,
             "spreadsheet_ids": body.spreadsheet_ids,
+            "calendar_ids": body.calendar_ids,
+            "all_calendars": body.all_calendars,
         },
-    }).execute()
-    document_id = doc.data[0]["id"]
-
-    job = admin.table("generation_jobs").insert({
-        "document_id": document_id,
-        "tenant_id": tenant_id,
-        "status": "pending",
-        "progress": 0,
-    }).execute()
-    job_id = job.data[0]["id"]
+    })
+    document_id = doc["id"]
 
-    asyncio.create_task(generation_service.start_generation(document_id, job_id))
+    job_id = await job_queue.enqueue(document_id, identity.tenant_id)
 
     return GenerationResponse(
         document_id=document_id,
@@ -97,15 +75,11 @@ async def generate_document(body: GenerateRequest, user=Depends(get_current_user
 
 
 @router.post("/propose", response_model=ProposalResponse)
-async def propose_document(body: ProposeRequest, user=Depends(get_current_user)):
+async def propose_document(body: ProposeRequest, identity: Identity = Depends(get_current_identity)):
     """Generate an AI-proposed section structure for review."""
-    admin = get_supabase_admin_client()
-    tenant_id = await _get_tenant_id(user)
-    user_id = await _get_user_id(user)
-
-    doc = admin.table("documents").insert({
-        "tenant_id": tenant_id,
-        "created_by": user_id,
+    doc = await document_repo.create({
+        "tenant_id": identity.tenant_id,
+        "created_by": identity.user_id,
         "title": body.title,
         "target_user_email": body.target_user_email,
         "generation_mode": "ai_proposal",
@@ -116,9 +90,11 @@ async def propose_document(body: ProposeRequest, user=Depends(get_current_user))
         "metadata": {
             "slack_channel_ids": body.slack_channel_ids,
             "spreadsheet_ids": body.spreadsheet_ids,
+            "calendar_ids": body.calendar_ids,
+            "all_calendars": body.all_calendars,
         },
-    }).execute()
-    document_id = doc.data[0]["id"]
+    })
+    document_id = doc["id"]
 
     data_summary = {
         "title": body.title,
@@ -127,15 +103,12 @@ async def propose_document(body: ProposeRequest, user=Depends(get_current_user))
         "data_sources": body.data_sources,
     }
 
-    proposed = await generation_service.generate_proposal(document_id, data_summary)
-
-    proposal = admin.table("ai_proposals").select("id").eq("document_id", document_id).order("created_at", desc=True).limit(1).execute()
-    proposal_id = proposal.data[0]["id"] if proposal.data else ""
+    proposal = await generation_service.generate_proposal(document_id, data_summary)
 
     return ProposalResponse(
         document_id=document_id,
-        proposal_id=proposal_id,
-        proposed_structure=proposed,
+        proposal_id=proposal["id"],
+        proposed_structure=proposal.get("proposed_structure", []),
     )
 
 
@@ -143,34 +116,21 @@ async def propose_document(body: ProposeRequest, user=Depends(get_current_user))
 async def approve_proposal(
     document_id: str,
     body: ApproveProposalRequest,
-    user=Depends(get_current_user),
+    identity: Identity = Depends(get_current_identity),
 ):
     """Approve a proposal and start full document generation."""
-    admin = get_supabase_admin_client()
-    tenant_id = await _get_tenant_id(user)
-
-    admin.table("ai_proposals").update({
+    proposal_update: dict = {
         "status": "approved",
         "user_feedback": body.feedback,
         "approved_at": "now()",
-    }).eq("id", body.proposal_id).execute()
-
+    }
     if body.approved_structure:
-        admin.table("ai_proposals").update({
-            "proposed_structure": body.approved_structure,
-        }).eq("id", body.proposal_id).execute()
+        proposal_update["proposed_structure"] = body.approved_structure
+    await proposal_repo.update(body.proposal_id, proposal_update)
 
-    admin.table("documents").update({"status": "generating"}).eq("id", document_id).execute()
+    await document_repo.update(document_id, {"status": "generating"})
 
-    job = admin.table("generation_jobs").insert({
-        "document_id": document_id,
-        "tenant_id": tenant_id,
-        "status": "pending",
-        "progress": 0,
-    }).execute()
-    job_id = job.data[0]["id"]
-
-    asyncio.create_task(generation_service.start_generation(document_id, job_id))
+    job_id = await job_queue.enqueue(document_id, identity.tenant_id)
 
     return GenerationResponse(
         document_id=document_id,
@@ -183,11 +143,9 @@ async def approve_proposal(
 @router.get("/jobs/{job_id}", response_model=JobStatusResponse)
 async def get_job_status(job_id: str, user=Depends(get_current_user)):
     """Poll the status of an async generation job."""
-    admin = get_supabase_admin_client()
-    row = admin.table("generation_jobs").select("*").eq("id", job_id).maybe_single().execute()
-    if not row.data:
+    j = await job_repo.get_by_id(job_id)
+    if not j:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
-    j = row.data
     return JobStatusResponse(
         id=j["id"],
         document_id=j.get("document_id"),
@@ -209,24 +167,15 @@ async def list_documents(
     per_page: int = Query(20, ge=1, le=100),
     document_status: str | None = Query(None, alias="status"),
     q: str | None = None,
-    user=Depends(get_current_user),
+    identity: Identity = Depends(get_current_identity),
 ):
     """List all documents in the current tenant."""
-    admin = get_supabase_admin_client()
-    tenant_id = await _get_tenant_id(user)
-
-    offset = (page - 1) * per_page
-    query = admin.table("documents").select("*", count="exact").eq("tenant_id", tenant_id)
-
-    if document_status:
-        query = query.eq("status", document_status)
-    if q:
-        query = query.ilike("title", f"%{q}%")
-
-    result = query.order("created_at", desc=True).range(offset, offset + per_page - 1).execute()
+    items, total_count = await document_repo.list_by_tenant(
+        identity.tenant_id, page=page, per_page=per_page, status=document_status, q=q
+    )
     return PaginatedResponse(
-        items=result.data or [],
-        total_count=result.count or 0,
+        items=items,
+        total_count=total_count,
         page=page,
         per_page=per_page,
     )
@@ -235,19 +184,13 @@ async def list_documents(
 @router.get("/{document_id}", response_model=DocumentResponse)
 async def get_document(document_id: str, user=Depends(get_current_user)):
     """Get a document with its sections."""
-    admin = get_supabase_admin_client()
-    doc_row = admin.table("documents").select("*").eq("id", document_id).maybe_single().execute()
-    if not doc_row.data:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
-    d = doc_row.data
-
-    sections_result = (
-        admin.table("document_sections")
-        .select("*")
-        .eq("document_id", document_id)
-        .order("section_order")
-        .execute()
+    d, section_rows = await asyncio.gather(
+        document_repo.get_by_id(document_id),
+        document_repo.list_sections(document_id),
     )
+    if not d:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+
     sections = [
         DocumentSectionResponse(
             id=s["id"],
@@ -258,7 +201,7 @@ async def get_document(document_id: str, user=Depends(get_current_user)):
             source_references=s.get("source_references", []),
             is_ai_generated=s.get("is_ai_generated", True),
         )
-        for s in (sections_result.data or [])
+        for s in section_rows
     ]
 
     return DocumentResponse(
@@ -287,13 +230,12 @@ async def update_document(
     user=Depends(get_current_user),
 ):
     """Update document metadata (title, etc.)."""
-    admin = get_supabase_admin_client()
     update_data = {}
     if body.title is not None:
         update_data["title"] = body.title
 
     if update_data:
-        admin.table("documents").update(update_data).eq("id", document_id).execute()
+        await document_repo.update(document_id, update_data)
 
     return await get_document(document_id, user)
 
@@ -301,8 +243,7 @@ async def update_document(
 @router.delete("/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_document(document_id: str, user=Depends(get_current_user)):
     """Delete a document and all related data."""
-    admin = get_supabase_admin_client()
-    admin.table("documents").delete().eq("id", document_id).execute()
+    await document_repo.delete(document_id)
     return None
 
 
@@ -314,29 +255,26 @@ async def update_section(
     user=Depends(get_current_user),
 ):
     """Update a single section's content. Sets is_ai_generated to false."""
-    admin = get_supabase_admin_client()
     update_data: dict = {"is_ai_generated": False}
     if body.title is not None:
         update_data["title"] = body.title
     if body.content is not None:
         update_data["content"] = body.content
 
-    result = admin.table("document_sections").update(update_data).eq("id", section_id).execute()
-    if not result.data:
+    s = await document_repo.update_section(section_id, update_data)
+    if not s:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Section not found")
-    s = result.data[0]
     return {"id": s["id"], "title": s["title"], "content": s.get("content")}
 
 
 @router.post("/{document_id}/share")
 async def create_share_link(document_id: str, user=Depends(get_current_user)):
     """Generate a shareable link for a document."""
-    admin = get_supabase_admin_client()
     token = secrets.token_urlsafe(32)
-    admin.table("documents").update({
+    await document_repo.update(document_id, {
         "share_token": token,
         "share_enabled": True,
-    }).eq("id", document_id).execute()
+    })
 
     from app.config import settings
     base_url = settings.frontend_url
@@ -346,11 +284,10 @@ async def create_share_link(document_id: str, user=Depends(get_current_user)):
 @router.delete("/{document_id}/share")
 async def revoke_share_link(document_id: str, user=Depends(get_current_user)):
     """Revoke a document's shareable link."""
-    admin = get_supabase_admin_client()
-    admin.table("documents").update({
+    await document_repo.update(document_id, {
         "share_enabled": False,
         "share_token": None,
-    }).eq("id", document_id).execute()
+    })
     return {"message": "共有リンクを無効化しました"}
 
 
@@ -361,21 +298,12 @@ async def download_document(
     user=Depends(get_current_user),
 ):
     """Download a document as PDF or Word."""
-    admin = get_supabase_admin_client()
-    doc_row = admin.table("documents").select("*").eq("id", document_id).maybe_single().execute()
-    if not doc_row.data:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
-
-    sections_result = (
-        admin.table("document_sections")
-        .select("*")
-        .eq("document_id", document_id)
-        .order("section_order")
-        .execute()
+    document, sections = await asyncio.gather(
+        document_repo.get_by_id(document_id),
+        document_repo.list_sections(document_id),
     )
-
-    document = doc_row.data
-    sections = sections_result.data or []
+    if not document:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
 
     if format == "pdf":
         content = await file_generator.generate_pdf(document, sections)
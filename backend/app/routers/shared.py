@@ -1,45 +1,25 @@
 from fastapi import APIRouter, HTTPException, status
 
-from app.db.client import get_supabase_admin_client
+from app.db.repositories import DocumentRepository
 from app.models.document import DocumentResponse, DocumentSectionResponse
 
 router = APIRouter()
 
+document_repo = DocumentRepository()
+
 
 @router.get("/{token}", response_model=DocumentResponse)
 async def get_shared_document(token: str):
     """Access a shared document via its public token. No authentication required."""
-    admin = get_supabase_admin_client()
-    if not admin:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Database not configured",
-        )
+    d = await document_repo.get_by_share_token(token)
 
-    doc_row = (
-        admin.table("documents")
-        .select("*")
-        .eq("share_token", token)
-        .eq("share_enabled", True)
-        .maybe_single()
-        .execute()
-    )
-
-    if not doc_row.data:
+    if not d:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="共有リンクが見つからないか、無効化されています",
         )
 
-    d = doc_row.data
-
-    sections_result = (
-        admin.table("document_sections")
-        .select("*")
-        .eq("document_id", d["id"])
-        .order("section_order")
-        .execute()
-    )
+    section_rows = await document_repo.list_sections(d["id"])
     sections = [
         DocumentSectionResponse(
             id=s["id"],
@@ -50,7 +30,7 @@ async def get_shared_document(token: str):
             source_references=s.get("source_references", []),
             is_ai_generated=s.get("is_ai_generated", True),
         )
-        for s in (sections_result.data or [])
+        for s in section_rows
     ]
 
     return DocumentResponse(
@@ -0,0 +1,42 @@
+import json
+
+from fastapi import APIRouter, HTTPException, Request, status
+
+from app.config import settings
+from app.services.slack_events import SlackSignatureError, slack_event_service
+
+router = APIRouter()
+
+
+@router.post("/events")
+async def receive_event(request: Request):
+    """Slack Events API endpoint. Requests are authenticated by Slack's signature, not by user session."""
+    if not settings.slack_signing_secret:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Slack Events API is not configured",
+        )
+
+    body = await request.body()
+    try:
+        slack_event_service.verify_signature(
+            body,
+            request.headers.get("X-Slack-Request-Timestamp", ""),
+            request.headers.get("X-Slack-Signature", ""),
+        )
+    except SlackSignatureError as e:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid JSON body")
+
+    if payload.get("type") == "url_verification":
+        return {"challenge": payload.get("challenge", "")}
+
+    if payload.get("type") == "event_callback":
+        # A failure propagates as a 5xx so Slack redelivers the event; storing it is idempotent
+        await slack_event_service.ingest(payload)
+
+    return {"ok": True}
@@ -5,33 +5,56 @@ import json
 import google.generativeai as genai
 
 from app.config import settings
+from app.services.llm_cache import llm_cache
 
 
 class AIService:
-    """Interfaces with Google Gemini API for content generation."""
+    """Interfaces with Google Gemini API for content generation.
+
+    Responses are served from the LLM cache when the same prompt was already
+    sent to the same model, so generating a document again from unchanged
+    data and template reuses the earlier sections.
+    """
 
     def __init__(self):
         if settings.gemini_api_key:
             genai.configure(api_key=settings.gemini_api_key)
-        self._model = genai.GenerativeModel("gemini-2.0-flash")
+        self._model_name = settings.gemini_model
+        self._model = genai.GenerativeModel(self._model_name)
+        self._generation_config: dict = {}
+
+    async def _generate(self, prompt: str) -> str:
+        async def call() -> str:
+            response = await self._model.generate_content_async(
+                prompt, generation_config=self._generation_config or None
+            )
+            return response.text or ""
+
+        return await llm_cache.get_or_generate(
+            self._model_name,
+            prompt,
+            call,
+            params=self._generation_config,
+        )
 
     async def generate_section_content(
         self,
         section_title: str,
         section_description: str,
-        source_data: list[dict],
+        source_text: str,
+        omission_note: str = "",
     ) -> str:
         """Generate content for a single document section.
 
         Args:
             section_title: The section heading.
             section_description: Description of what the section should contain.
-            source_data: Relevant data from Calendar/Slack/Sheets.
+            source_text: Relevant Calendar/Slack/Sheets data, rendered by ContextBuilder.
+            omission_note: Note describing data left out to fit the token budget.
 
         Returns:
             Generated Markdown content.
         """
-        source_text = json.dumps(source_data, ensure_ascii=False, default=str)
         prompt = f"""あなたは引き継ぎ資料を作成するアシスタントです。
 以下のセクションの内容を日本語のMarkdown形式で生成してください。
 
@@ -41,6 +64,7 @@ class AIService:
 
 ## 参照データ
 {source_text}
+{omission_note}
 
 ## 指示
 - 提供されたデータに基づいて、正確かつ簡潔な内容を生成してください
@@ -48,8 +72,7 @@ class AIService:
 - 不明な情報は推測せず、「情報なし」と記載してください
 - Markdown形式で出力してください
 """
-        response = await self._model.generate_content_async(prompt)
-        return response.text or ""
+        return await self._generate(prompt)
 
     async def propose_structure(
         self,
@@ -85,8 +108,7 @@ class AIService:
 - 利用可能なデータソースに基づいて適切なセクションを提案してください
 - 5〜10セクション程度が適切です
 """
-        response = await self._model.generate_content_async(prompt)
-        text = response.text or "[]"
+        text = await self._generate(prompt) or "[]"
         # Extract JSON from response
         start = text.find("[")
         end = text.rfind("]") + 1
@@ -8,6 +8,7 @@ import httpx
 from app.config import settings
 from app.db.client import get_supabase_admin_client
 from app.services.encryption import EncryptionService
+from app.services.identity import identity_service
 
 
 class AuthService:
@@ -27,7 +28,7 @@ class AuthService:
 
     SLACK_AUTH_URL = "https://slack.com/oauth/v2/authorize"
     SLACK_TOKEN_URL = "https://slack.com/api/oauth.v2.access"
-    SLACK_SCOPES = ["channels:read", "channels:history", "users:read"]
+    SLACK_SCOPES = ["channels:read", "channels:history", "groups:read", "groups:history", "users:read"]
 
     def __init__(self):
         self._http = httpx.AsyncClient(timeout=30)
@@ -149,6 +150,7 @@ class AuthService:
                     "avatar_url": avatar_url,
                 }
             ).eq("supabase_auth_id", str(auth_id)).execute()
+        identity_service.invalidate(auth_id)
 
         # 5. Get user_id for oauth_tokens
         user_row = (
@@ -266,6 +268,7 @@ class AuthService:
 
         slack_access_token = data.get("access_token", "")
         team_name = data.get("team", {}).get("name", "")
+        team_id = data.get("team", {}).get("id", "")
 
         # Encrypt and store Slack tokens
         encrypted_access = self._encryption.encrypt(slack_access_token)
@@ -285,7 +288,7 @@ class AuthService:
             "encrypted_access_token": encrypted_access,
             "encrypted_refresh_token": None,
             "scopes": self.SLACK_SCOPES,
-            "metadata": {"workspace_name": team_name},
+            "metadata": {"workspace_name": team_name, "team_id": team_id},
         }
 
         if existing_token.data:
@@ -1,21 +1,46 @@
 """Google Calendar integration service."""
 
 import asyncio
-from datetime import datetime
+import logging
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime
 
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+
+from app.config import settings
+from app.services.calendar_store import (
+    CalendarEventStore,
+    calendar_event_store,
+    to_rfc3339,
+)
+from app.services.google_api import google_services
+
+logger = logging.getLogger(__name__)
+
+# events.list accepts up to 2500 results per page
+_EVENTS_PAGE_SIZE = 2500
+# Only the event fields _format_event maps, plus what incremental sync needs
+_EVENT_FIELDS = (
+    "nextPageToken,nextSyncToken,"
+    "items(id,iCalUID,recurringEventId,status,summary,start,end,description,attendees/email,location,htmlLink)"
+)
 
 
 class CalendarService:
     """Fetches events from Google Calendar API."""
 
+    def __init__(self, store: CalendarEventStore | None = None):
+        self._store = store or calendar_event_store
+
     async def get_events(
         self,
         access_token: str,
         date_from: str,
         date_to: str,
         target_email: str | None = None,
+        user_id: str | None = None,
+        calendar_ids: list[str] | None = None,
+        all_calendars: bool = False,
     ) -> list[dict]:
         """Fetch calendar events for the given date range.
 
@@ -24,55 +49,339 @@ class CalendarService:
             date_from: Start date (YYYY-MM-DD).
             date_to: End date (YYYY-MM-DD).
             target_email: Optional email to filter events by attendee.
+            user_id: User whose event store is used; None bypasses it.
+            calendar_ids: Calendars to read. Defaults to the primary calendar.
+            all_calendars: Also read every calendar shown in the user's calendar list.
 
         Returns:
             List of calendar event dicts.
         """
-        credentials = Credentials(token=access_token)
-        service = build("calendar", "v3", credentials=credentials)
-
-        time_min = datetime.strptime(date_from, "%Y-%m-%d").isoformat() + "Z"
-        time_max = datetime.strptime(date_to, "%Y-%m-%d").replace(
-            hour=23, minute=59, second=59
-        ).isoformat() + "Z"
-
-        events_result = await asyncio.to_thread(
-            lambda: service.events()
-            .list(
-                calendarId="primary",
-                timeMin=time_min,
-                timeMax=time_max,
+        results: list[dict] = []
+        async for page in self.iter_events(
+            access_token,
+            date_from,
+            date_to,
+            target_email,
+            user_id=user_id,
+            calendar_ids=calendar_ids,
+            all_calendars=all_calendars,
+        ):
+            results.extend(page)
+        return results
+
+    async def iter_events(
+        self,
+        access_token: str,
+        date_from: str,
+        date_to: str,
+        target_email: str | None = None,
+        user_id: str | None = None,
+        calendar_ids: list[str] | None = None,
+        all_calendars: bool = False,
+    ) -> AsyncIterator[list[dict]]:
+        """Stream calendar events page by page.
+
+        With a ``user_id`` the user's local event store is first brought up to
+        date with Calendar's incremental sync, and the range is read from it;
+        only parts of the range never synced before are listed from the API.
+        Without one, the range is listed directly, following nextPageToken.
+        Only the fields that are mapped are requested.
+
+        Several calendars are listed together in batch requests (or synced
+        concurrently when the event store is used) and merged; an event that
+        appears in more than one calendar is returned once.
+
+        Args:
+            access_token: Decrypted Google OAuth access token.
+            date_from: Start date (YYYY-MM-DD).
+            date_to: End date (YYYY-MM-DD).
+            target_email: Optional email to filter events by attendee.
+            user_id: User whose event store is used; None bypasses it.
+            calendar_ids: Calendars to read. Defaults to the primary calendar.
+            all_calendars: Also read every calendar shown in the user's calendar list.
+
+        Yields:
+            Lists of calendar event dicts in start time order.
+        """
+        service = google_services.service("calendar", "v3", access_token)
+
+        time_min = datetime.strptime(date_from, "%Y-%m-%d").replace(tzinfo=UTC).timestamp()
+        time_max = (
+            datetime.strptime(date_to, "%Y-%m-%d")
+            .replace(hour=23, minute=59, second=59, tzinfo=UTC)
+            .timestamp()
+        )
+
+        calendar_ids = list(dict.fromkeys(calendar_ids or ["primary"]))
+        if all_calendars:
+            listed = await self._list_calendar_ids(service)
+            calendar_ids += [cid for cid in listed if cid not in calendar_ids]
+
+        if len(calendar_ids) == 1:
+            pages = self._iter_calendar(service, calendar_ids[0], time_min, time_max, user_id)
+        else:
+            pages = self._iter_merged(service, calendar_ids, time_min, time_max, user_id)
+
+        async for events in pages:
+            page = [self._format_event(event) for event in events]
+            if target_email:
+                page = [event for event in page if target_email in event["attendees"]]
+            if page:
+                yield page
+
+    async def list_calendars(self, access_token: str) -> list[dict]:
+        """List the calendars in the user's calendar list.
+
+        Args:
+            access_token: Decrypted Google OAuth access token.
+
+        Returns:
+            List of calendar dicts.
+        """
+        service = google_services.service("calendar", "v3", access_token)
+        return [
+            {
+                "id": item["id"],
+                "name": item.get("summaryOverride") or item.get("summary", ""),
+                "primary": item.get("primary", False),
+                "selected": item.get("selected", False),
+                "access_role": item.get("accessRole", ""),
+            }
+            for item in await self._calendar_list(service)
+        ]
+
+    async def _calendar_list(self, service) -> list[dict]:
+        items: list[dict] = []
+        page_token = None
+        while True:
+            result = await google_services.execute(
+                service.calendarList().list(
+                    minAccessRole="reader",
+                    fields="nextPageToken,items(id,summary,summaryOverride,primary,selected,accessRole)",
+                    pageToken=page_token,
+                )
+            )
+            items.extend(result.get("items", []))
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                return items
+
+    async def _list_calendar_ids(self, service) -> list[str]:
+        # Calendars the user has switched on in Google Calendar; the primary one is read as "primary"
+        items = await self._calendar_list(service)
+        return [item["id"] for item in items if item.get("selected") and not item.get("primary")]
+
+    async def _iter_calendar(
+        self,
+        service,
+        calendar_id: str,
+        time_min: float,
+        time_max: float,
+        user_id: str | None,
+    ) -> AsyncIterator[list[dict]]:
+        """Raw events of one calendar, from the event store when possible."""
+        if user_id and settings.calendar_sync_enabled:
+            try:
+                await self._sync(service, user_id, calendar_id, time_min, time_max)
+            except Exception as e:  # noqa: BLE001 - fall back to listing events directly
+                logger.warning("Calendar sync failed for %s, listing events directly: %s", calendar_id, e)
+            else:
+                async for events in self._store.iter_events(user_id, calendar_id, time_min, time_max):
+                    yield events
+                return
+        async for events in self._iter_listed(service, calendar_id, time_min, time_max):
+            yield events
+
+    async def _iter_merged(
+        self,
+        service,
+        calendar_ids: list[str],
+        time_min: float,
+        time_max: float,
+        user_id: str | None,
+    ) -> AsyncIterator[list[dict]]:
+        """Raw events of several calendars, deduplicated by iCalUID and start, in start order."""
+        if user_id and settings.calendar_sync_enabled:
+
+            async def collect(calendar_id: str) -> list[dict]:
+                events: list[dict] = []
+                try:
+                    async for page in self._iter_calendar(service, calendar_id, time_min, time_max, user_id):
+                        events.extend(page)
+                except Exception as e:  # noqa: BLE001 - one unreadable calendar must not fail the others
+                    logger.warning("Failed to fetch calendar %s: %s", calendar_id, e)
+                return events
+
+            per_calendar = await asyncio.gather(*(collect(cid) for cid in calendar_ids))
+        else:
+            per_calendar = await self._list_batched(service, calendar_ids, time_min, time_max)
+
+        merged: dict[tuple[str, str], dict] = {}
+        for events in per_calendar:
+            for event in events:
+                start = event.get("start") or {}
+                key = (event.get("iCalUID") or event.get("id", ""), start.get("dateTime") or start.get("date", ""))
+                merged.setdefault(key, event)
+
+        ordered = sorted(merged.values(), key=_start_epoch)
+        for i in range(0, len(ordered), _EVENTS_PAGE_SIZE):
+            yield ordered[i:i + _EVENTS_PAGE_SIZE]
+
+    async def _list_batched(
+        self,
+        service,
+        calendar_ids: list[str],
+        time_min: float,
+        time_max: float,
+    ) -> list[list[dict]]:
+        """List a range from several calendars, one batch request per round of pages."""
+        events: list[list[dict]] = [[] for _ in calendar_ids]
+        page_tokens: dict[int, str | None] = dict.fromkeys(range(len(calendar_ids)))
+        while page_tokens:
+            requests = {
+                str(i): service.events().list(
+                    calendarId=calendar_ids[i],
+                    timeMin=to_rfc3339(time_min),
+                    timeMax=to_rfc3339(time_max),
+                    singleEvents=True,
+                    maxResults=_EVENTS_PAGE_SIZE,
+                    fields=_EVENT_FIELDS,
+                    pageToken=token,
+                )
+                for i, token in page_tokens.items()
+            }
+            responses = await google_services.execute_batch(service, requests)
+            page_tokens = {}
+            for request_id, response in responses.items():
+                i = int(request_id)
+                if isinstance(response, Exception):
+                    logger.warning("Failed to fetch calendar %s: %s", calendar_ids[i], response)
+                    continue
+                events[i].extend(response.get("items", []))
+                if response.get("nextPageToken"):
+                    page_tokens[i] = response["nextPageToken"]
+        return events
+
+    async def _sync(self, service, user_id: str, calendar_id: str, time_min: float, time_max: float) -> None:
+        """Apply changes since the last sync, then list the parts of the range not yet stored."""
+        async with self._store.lock(user_id, calendar_id):
+            sync_token, windows = await self._store.get_state(user_id, calendar_id)
+            base_token = sync_token
+            if sync_token:
+                try:
+                    sync_token = await self._apply_changes(service, user_id, calendar_id, sync_token)
+                except HttpError as e:
+                    if e.resp.status != 410:
+                        raise
+                    # The token expired; start over with a full sync
+                    logger.info("Calendar sync token expired for user %s", user_id)
+                    await self._store.reset(user_id, calendar_id)
+                    base_token = sync_token = None
+                    windows = []
+
+            gaps = self._store.gaps(windows, time_min, time_max)
+            for lo, hi in gaps:
+                token = None
+                async for events, token in self._iter_window(service, calendar_id, lo, hi):
+                    await self._store.apply(user_id, calendar_id, events)
+                if token:
+                    # A later token also covers every change the earlier ones did
+                    sync_token = token
+                    windows.append([lo, hi])
+            if sync_token and (gaps or windows):
+                await self._store.save_state(user_id, calendar_id, base_token, sync_token, windows)
+
+    async def _apply_changes(self, service, user_id: str, calendar_id: str, sync_token: str) -> str:
+        """Store every event changed since ``sync_token`` and return the next token."""
+        page_token = None
+        while True:
+            request = service.events().list(
+                calendarId=calendar_id,
+                syncToken=sync_token,
                 singleEvents=True,
-                orderBy="startTime",
+                maxResults=_EVENTS_PAGE_SIZE,
+                fields=_EVENT_FIELDS,
+                pageToken=page_token,
             )
-            .execute()
-        )
+            result = await google_services.execute(request)
+            await self._store.apply(user_id, calendar_id, result.get("items", []))
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                return result.get("nextSyncToken") or sync_token
 
-        items = events_result.get("items", [])
-        results = []
-
-        for event in items:
-            attendees_list = [
-                a.get("email", "") for a in event.get("attendees", [])
-            ]
-            if target_email and target_email not in attendees_list:
-                continue
-
-            results.append(
-                {
-                    "id": event.get("id", ""),
-                    "title": event.get("summary", ""),
-                    "start": event.get("start", {}).get(
-                        "dateTime", event.get("start", {}).get("date", "")
-                    ),
-                    "end": event.get("end", {}).get(
-                        "dateTime", event.get("end", {}).get("date", "")
-                    ),
-                    "description": event.get("description"),
-                    "attendees": attendees_list,
-                    "location": event.get("location"),
-                    "url": event.get("htmlLink", ""),
-                }
+    async def _iter_window(
+        self,
+        service,
+        calendar_id: str,
+        time_min: float,
+        time_max: float,
+    ) -> AsyncIterator[tuple[list[dict], str | None]]:
+        """Full sync of one window: yields each page with the sync token sent on the last page."""
+        page_token = None
+        while True:
+            request = service.events().list(
+                calendarId=calendar_id,
+                timeMin=to_rfc3339(time_min),
+                timeMax=to_rfc3339(time_max),
+                singleEvents=True,
+                maxResults=_EVENTS_PAGE_SIZE,
+                fields=_EVENT_FIELDS,
+                pageToken=page_token,
             )
+            result = await google_services.execute(request)
+            yield result.get("items", []), result.get("nextSyncToken")
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                return
 
-        return results
+    async def _iter_listed(
+        self,
+        service,
+        calendar_id: str,
+        time_min: float,
+        time_max: float,
+    ) -> AsyncIterator[list[dict]]:
+        """List a range directly from the API in start time order."""
+        page_token = None
+        while True:
+            request = service.events().list(
+                calendarId=calendar_id,
+                timeMin=to_rfc3339(time_min),
+                timeMax=to_rfc3339(time_max),
+                singleEvents=True,
+                orderBy="startTime",
+                maxResults=_EVENTS_PAGE_SIZE,
+                fields=_EVENT_FIELDS,
+                pageToken=page_token,
+            )
+            result = await google_services.execute(request)
+            if result.get("items"):
+                yield result["items"]
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                return
+
+    @staticmethod
+    def _format_event(event: dict) -> dict:
+        return {
+            "id": event.get("id", ""),
+            "title": event.get("summary", ""),
+            "start": event.get("start", {}).get(
+                "dateTime", event.get("start", {}).get("date", "")
+            ),
+            "end": event.get("end", {}).get(
+                "dateTime", event.get("end", {}).get("date", "")
+            ),
+            "description": event.get("description"),
+            "attendees": [a.get("email", "") for a in event.get("attendees", [])],
+            "location": event.get("location"),
+            "url": event.get("htmlLink", ""),
+            "recurring_event_id": event.get("recurringEventId"),
+        }
+
+
+def _start_epoch(event: dict) -> float:
+    start = event.get("start") or {}
+    if start.get("dateTime"):
+        return datetime.fromisoformat(start["dateTime"]).timestamp()
+    return datetime.strptime(start.get("date", "1970-01-01"), "%Y-%m-%d").replace(tzinfo=UTC).timestamp()
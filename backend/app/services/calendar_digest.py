@@ -0,0 +1,148 @@
+"""Compaction of recurring calendar events into series digests."""
+
+from collections import Counter
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from itertools import pairwise
+
+_WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+# Show at most this many deviating occurrences per series
+_MAX_EXCEPTIONS = 10
+
+
+@dataclass
+class DigestStats:
+    """How much calendar data the digest removed."""
+
+    events_in: int = 0
+    records_out: int = 0
+    series: int = 0
+    instances_collapsed: int = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+class CalendarDigest:
+    """Collapses the instances of each recurring event into one series record.
+
+    Calendar events are fetched with ``singleEvents=True``, so a daily standup
+    shows up once per day. Instances sharing a ``recurring_event_id`` are
+    replaced by one record with the cadence, usual time, first and last
+    occurrence, count and attendees, plus the occurrences that deviate from
+    the usual title, time or duration. Standalone events are kept as they are.
+    """
+
+    def compact(self, events: list[dict]) -> tuple[list[dict], DigestStats]:
+        """Replace recurring instances with series records.
+
+        Args:
+            events: Formatted events as returned by CalendarService, in start order.
+
+        Returns:
+            Events and series records in start order, and what was collapsed.
+        """
+        stats = DigestStats(events_in=len(events))
+        groups: dict[str, list[dict]] = {}
+        for event in events:
+            if event.get("recurring_event_id"):
+                groups.setdefault(event["recurring_event_id"], []).append(event)
+
+        result = []
+        emitted: set[str] = set()
+        for event in events:
+            series_id = event.get("recurring_event_id")
+            if not series_id or len(groups[series_id]) < 2:
+                result.append(_standalone(event))
+            elif series_id not in emitted:
+                # The series takes the place of its first occurrence
+                emitted.add(series_id)
+                result.append(self._series(series_id, groups[series_id]))
+                stats.series += 1
+                stats.instances_collapsed += len(groups[series_id])
+
+        stats.records_out = len(result)
+        return result, stats
+
+    def _series(self, series_id: str, instances: list[dict]) -> dict:
+        starts = [_parse(e["start"]) for e in instances]
+        slots = [_slot(e) for e in instances]
+        usual_slot = Counter(slots).most_common(1)[0][0]
+        usual_title = Counter(e.get("title", "") for e in instances).most_common(1)[0][0]
+
+        exceptions = []
+        for event, slot in zip(instances, slots, strict=True):
+            changes = {}
+            if slot != usual_slot:
+                changes["time"] = slot
+            if event.get("title", "") != usual_title:
+                changes["title"] = event.get("title", "")
+            if changes:
+                exceptions.append({"start": event["start"], **changes})
+
+        attendees = Counter(a for e in instances for a in e.get("attendees", []))
+        record = {
+            "id": series_id,
+            "title": usual_title,
+            "recurring": True,
+            "cadence": _cadence(starts),
+            "time": usual_slot,
+            "start": instances[0]["start"],
+            "end": instances[-1].get("end", ""),
+            "count": len(instances),
+            # Regular attendees of the series, most frequent first
+            "attendees": [a for a, n in attendees.most_common() if n * 2 >= len(instances)],
+            "description": next((e["description"] for e in instances if e.get("description")), None),
+            "location": Counter(e.get("location") for e in instances).most_common(1)[0][0],
+            "url": instances[0].get("url", ""),
+        }
+        if exceptions:
+            record["exceptions"] = exceptions[:_MAX_EXCEPTIONS]
+            if len(exceptions) > _MAX_EXCEPTIONS:
+                record["more_exceptions"] = len(exceptions) - _MAX_EXCEPTIONS
+        return record
+
+
+def _standalone(event: dict) -> dict:
+    return {k: v for k, v in event.items() if k != "recurring_event_id"}
+
+
+def _parse(value: str) -> datetime | None:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _slot(event: dict) -> str:
+    """Local time and length of an occurrence, e.g. "10:00+60m", or "all-day"."""
+    start, end = _parse(event.get("start", "")), _parse(event.get("end", ""))
+    if start is None or "T" not in event.get("start", ""):
+        return "all-day"
+    minutes = int((end - start).total_seconds() // 60) if end else 0
+    return f"{start:%H:%M}+{minutes}m"
+
+
+def _cadence(starts: list[datetime | None]) -> str:
+    days = sorted({s.date() for s in starts if s is not None})
+    if len(days) < 2:
+        return "once"
+    gaps = Counter((b - a).days for a, b in pairwise(days))
+    gap = gaps.most_common(1)[0][0]
+    weekdays = sorted({d.weekday() for d in days})
+    names = ",".join(_WEEKDAYS[w] for w in weekdays)
+
+    if gap == 1:
+        return "weekdays" if weekdays == [0, 1, 2, 3, 4] else "daily"
+    if gap == 7 or (gap < 7 and len(weekdays) > 1):
+        return f"weekly on {names}"
+    if gap == 14:
+        return f"every 2 weeks on {names}"
+    if 28 <= gap <= 31:
+        return "monthly"
+    return f"every {gap} days"
+
+
+calendar_digest = CalendarDigest()
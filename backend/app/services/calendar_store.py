@@ -0,0 +1,172 @@
+"""Per-user local store of Google Calendar events."""
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime
+
+from app.config import settings
+from app.db.repositories import CalendarEventCacheRepository
+
+logger = logging.getLogger(__name__)
+
+_PAGE_SIZE = 1000
+# Saved sync states between prunes of old events and abandoned calendars
+_PRUNE_EVERY = 50
+
+
+def to_rfc3339(epoch: float) -> str:
+    """Format an epoch timestamp the way the Calendar API expects timeMin/timeMax."""
+    return datetime.fromtimestamp(epoch, UTC).isoformat().replace("+00:00", "Z")
+
+
+class CalendarSyncConflict(Exception):
+    """Raised when another process synced the same calendar concurrently."""
+
+
+class CalendarEventStore:
+    """Keeps a copy of each user's calendar and which time windows it fully covers.
+
+    The sync token of the last incremental sync is stored with the covered
+    windows. Applying the changes listed since that token brings every stored
+    event up to date, so a date range inside the windows can be answered
+    without listing it again.
+
+    Syncs of one calendar are serialized per process by ``lock``; across
+    processes, ``save_state`` only succeeds if the token is still the one the
+    sync started from. Events that ended more than
+    ``CALENDAR_EVENT_CACHE_MAX_AGE_SECONDS`` ago, and calendars not synced
+    within that time, are pruned.
+    """
+
+    def __init__(self, repository: CalendarEventCacheRepository | None = None):
+        self._repo = repository or CalendarEventCacheRepository()
+        self._locks: dict[tuple[str, str], asyncio.Lock] = {}
+        self._saves_since_prune = 0
+
+    def lock(self, user_id: str, calendar_id: str) -> asyncio.Lock:
+        """Serializes syncs of one calendar within this process."""
+        return self._locks.setdefault((user_id, calendar_id), asyncio.Lock())
+
+    async def get_state(self, user_id: str, calendar_id: str) -> tuple[str | None, list[list[float]]]:
+        """Return the stored sync token and covered windows."""
+        row = await self._repo.get_state(user_id, calendar_id)
+        if not row:
+            return None, []
+        return row.get("sync_token"), [list(w) for w in row.get("windows") or []]
+
+    async def save_state(
+        self,
+        user_id: str,
+        calendar_id: str,
+        expected_token: str | None,
+        sync_token: str | None,
+        windows: list[list[float]],
+    ) -> None:
+        """Record a finished sync that started from ``expected_token``.
+
+        Windows are trimmed to the retention period, since older events are
+        pruned.
+
+        Raises:
+            CalendarSyncConflict: Another process saved a sync in between. Its
+                event writes may have interleaved with this one's, so the
+                calendar is reset and listed again by the next sync.
+        """
+        cutoff = time.time() - settings.calendar_event_cache_max_age_seconds
+        windows = [[max(lo, cutoff), hi] for lo, hi in self._merge(windows) if hi > cutoff]
+        if not await self._repo.save_state_if(user_id, calendar_id, expected_token, sync_token, windows):
+            await self.reset(user_id, calendar_id)
+            raise CalendarSyncConflict(f"calendar {calendar_id} was synced concurrently")
+
+        self._saves_since_prune += 1
+        if self._saves_since_prune >= _PRUNE_EVERY:
+            self._saves_since_prune = 0
+            try:
+                await self._repo.prune(settings.calendar_event_cache_max_age_seconds)
+            except Exception as e:  # noqa: BLE001 - retried after the next saves
+                logger.warning("Calendar event cache prune failed: %s", e)
+
+    async def reset(self, user_id: str, calendar_id: str) -> None:
+        """Forget a calendar whose sync token is no longer valid."""
+        await self._repo.clear(user_id, calendar_id)
+        await self._repo.save_state(user_id, calendar_id, None, [], datetime.now(UTC).isoformat())
+
+    async def apply(self, user_id: str, calendar_id: str, events: list[dict]) -> None:
+        """Store changed events and delete cancelled ones."""
+        now = datetime.now(UTC).isoformat()
+        cancelled = [e["id"] for e in events if e.get("status") == "cancelled"]
+        rows = [
+            {
+                "user_id": user_id,
+                "calendar_id": calendar_id,
+                "event_id": e["id"],
+                "start_at": _event_time(e.get("start") or {}),
+                "end_at": _event_time(e.get("end") or e.get("start") or {}),
+                "event": e,
+                "updated_at": now,
+            }
+            for e in events
+            if e.get("status") != "cancelled" and e.get("start")
+        ]
+        await self._repo.delete_events(user_id, calendar_id, cancelled)
+        await self._repo.upsert_events(rows)
+
+    async def iter_events(
+        self,
+        user_id: str,
+        calendar_id: str,
+        time_min: float,
+        time_max: float,
+    ) -> AsyncIterator[list[dict]]:
+        """Yield stored events overlapping a range, in start time order."""
+        offset = 0
+        while True:
+            events = await self._repo.list_events(
+                user_id, calendar_id, to_rfc3339(time_min), to_rfc3339(time_max), limit=_PAGE_SIZE, offset=offset
+            )
+            if events:
+                yield events
+            if len(events) < _PAGE_SIZE:
+                return
+            offset += _PAGE_SIZE
+
+    @staticmethod
+    def gaps(windows: list[list[float]], time_min: float, time_max: float) -> list[tuple[float, float]]:
+        """Parts of ``[time_min, time_max]`` not covered by ``windows``.
+
+        Gaps of a second or less, such as between a range ending at 23:59:59
+        and the next one starting at midnight, are ignored.
+        """
+        gaps = []
+        cursor = time_min
+        for lo, hi in sorted(windows):
+            if hi <= cursor:
+                continue
+            if lo >= time_max:
+                break
+            if lo > cursor + 1:
+                gaps.append((cursor, lo))
+            cursor = hi
+        if cursor < time_max:
+            gaps.append((cursor, time_max))
+        return gaps
+
+    @staticmethod
+    def _merge(windows: list[list[float]]) -> list[list[float]]:
+        merged: list[list[float]] = []
+        for lo, hi in sorted(windows):
+            if merged and lo <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], hi)
+            else:
+                merged.append([lo, hi])
+        return merged
+
+
+def _event_time(value: dict) -> str:
+    # All-day events only have a date
+    return value.get("dateTime") or f"{value.get('date', '1970-01-01')}T00:00:00Z"
+
+
+calendar_event_store = CalendarEventStore()
@@ -0,0 +1,168 @@
+"""Vectorized summary of how a person's calendar time is spent."""
+
+import re
+from datetime import UTC, datetime, timedelta
+
+import numpy as np
+
+_WEEK_SECONDS = 7 * 86400
+# 1970-01-01 was a Thursday; shift so week buckets start on Monday
+_MONDAY_OFFSET = 3 * 86400
+_WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+# Dates, times, counters and bracketed prefixes that vary between occurrences of the same topic.
+# Numbers are only removed when they stand alone, so "1on1", "Q3レビュー" or "v2" stay intact.
+_TOPIC_NOISE_RE = re.compile(
+    r"(?<![^\W\d_])\d+[/:.\-]\d+(?:[/:.\-]\d+)?(?![^\W\d_])"
+    r"|(?<!\w)#?\d+(?!\w)"
+    r"|第\d+回"
+    r"|[【\[(（].*?[】\])）]"
+)
+# The most frequent attendee is taken to be the calendar owner when present in this share of meetings
+_OWNER_SHARE = 0.8
+
+
+class CalendarWorkloadAnalyzer:
+    """Summarizes calendar events into a compact workload digest.
+
+    Event times, durations and attendee lists are turned into NumPy arrays
+    once, and every statistic is a vectorized reduction over them: hours per
+    recurring meeting, hours shared with each counterpart, hours per week and
+    weekday, and the busiest topics. The digest is a few hundred tokens no
+    matter how many events the range contains, so sections that only need an
+    overview of the person's time can use it instead of the raw events.
+    """
+
+    def __init__(self, top: int = 8):
+        self._top = top
+
+    def analyze(self, events: list[dict], owner_email: str | None = None) -> dict | None:
+        """Compute the workload digest of formatted calendar events.
+
+        Args:
+            events: Events as returned by CalendarService (before series compaction).
+            owner_email: The person whose calendar this is; excluded from counterparts.
+                Inferred from the attendee lists when not given.
+
+        Returns:
+            The digest dict, or None when there are no timed events.
+        """
+        starts, ends, timed = _times(events)
+        if not timed.any():
+            return None
+
+        idx = np.flatnonzero(timed)
+        starts, hours = starts[idx], (ends[idx] - starts[idx]) / 3600
+        hours = np.clip(hours, 0, 24)
+        timed_events = [events[i] for i in idx]
+        total = float(hours.sum())
+
+        weeks = ((starts + _MONDAY_OFFSET) // _WEEK_SECONDS).astype(np.int64)
+        week_index = weeks - weeks.min()
+        week_hours = np.bincount(week_index, weights=hours)
+        weekday_hours = np.bincount(((starts + _MONDAY_OFFSET) // 86400 % 7).astype(np.int64), weights=hours, minlength=7)
+
+        return {
+            "period": [_date(starts.min()), _date(starts.max())],
+            "events": len(timed_events),
+            "all_day_events": len(events) - len(timed_events),
+            "total_hours": round(total, 1),
+            "avg_hours_per_week": round(total / len(week_hours), 1),
+            # [week starting (Mon), hours]
+            "weekly_hours": [
+                [_date((weeks.min() + w) * _WEEK_SECONDS - _MONDAY_OFFSET), round(float(h), 1)]
+                for w, h in enumerate(week_hours)
+            ],
+            "weekday_hours": {_WEEKDAYS[d]: round(float(h), 1) for d, h in enumerate(weekday_hours) if h},
+            "recurring_meetings": self._recurring(timed_events, hours),
+            "counterparts": self._counterparts(timed_events, hours, owner_email),
+            "topics": self._topics(timed_events, hours),
+        }
+
+    def _recurring(self, events: list[dict], hours: np.ndarray) -> list[dict]:
+        series = np.array([e.get("recurring_event_id") or "" for e in events])
+        mask = series != ""
+        if not mask.any():
+            return []
+        ids, inverse, counts = np.unique(series[mask], return_inverse=True, return_counts=True)
+        totals = np.bincount(inverse, weights=hours[mask])
+        titles: dict[str, str] = {}
+        for e in events:
+            if e.get("recurring_event_id"):
+                titles.setdefault(e["recurring_event_id"], e.get("title", ""))
+        order = np.argsort(-totals)[:self._top]
+        return [
+            {"title": titles[ids[i]], "occurrences": int(counts[i]), "hours": round(float(totals[i]), 1)}
+            for i in order
+        ]
+
+    def _counterparts(self, events: list[dict], hours: np.ndarray, owner_email: str | None) -> list[dict]:
+        # One (event, attendee) pair per attendance, so shared hours are a single bincount
+        pairs = [(i, a.lower()) for i, e in enumerate(events) for a in dict.fromkeys(e.get("attendees", [])) if a]
+        if not pairs:
+            return []
+        event_idx = np.fromiter((i for i, _ in pairs), dtype=np.int64, count=len(pairs))
+        people, person_idx = np.unique([a for _, a in pairs], return_inverse=True)
+        shared_hours = np.bincount(person_idx, weights=hours[event_idx])
+        meetings = np.bincount(person_idx)
+
+        exclude = np.zeros(len(people), dtype=bool)
+        if owner_email:
+            exclude |= people == owner_email.lower()
+        else:
+            # Only the most frequent attendee can be the owner
+            owner = int(np.argmax(meetings))
+            exclude[owner] = meetings[owner] >= _OWNER_SHARE * len(np.unique(event_idx))
+        exclude |= np.char.startswith(people.astype(str), "resource.") | np.char.endswith(
+            people.astype(str), "resource.calendar.google.com"
+        )
+
+        shared_hours[exclude] = -1
+        order = np.argsort(-shared_hours)[:self._top]
+        return [
+            {"email": str(people[i]), "meetings": int(meetings[i]), "hours": round(float(shared_hours[i]), 1)}
+            for i in order
+            if shared_hours[i] > 0
+        ]
+
+    def _topics(self, events: list[dict], hours: np.ndarray) -> list[dict]:
+        topics = np.array([_topic(e.get("title", "")) for e in events])
+        mask = topics != ""
+        if not mask.any():
+            return []
+        names, inverse = np.unique(topics[mask], return_inverse=True)
+        totals = np.bincount(inverse, weights=hours[mask])
+        counts = np.bincount(inverse)
+        order = np.argsort(-totals)[:self._top]
+        return [{"topic": str(names[i]), "events": int(counts[i]), "hours": round(float(totals[i]), 1)} for i in order]
+
+
+def _times(events: list[dict]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Start and end epochs of each event and a mask of events with a clock time."""
+    starts = np.zeros(len(events))
+    ends = np.zeros(len(events))
+    timed = np.zeros(len(events), dtype=bool)
+    for i, e in enumerate(events):
+        if "T" not in (e.get("start") or "") or "T" not in (e.get("end") or ""):
+            continue
+        try:
+            start = datetime.fromisoformat(e["start"])
+            end = datetime.fromisoformat(e["end"])
+        except ValueError:
+            continue
+        # Shift to local wall time so weekday and week buckets follow the event's own timezone
+        offset = start.utcoffset() or timedelta(0)
+        starts[i] = start.timestamp() + offset.total_seconds()
+        ends[i] = end.timestamp() + offset.total_seconds()
+        timed[i] = True
+    return starts, ends, timed
+
+
+def _topic(title: str) -> str:
+    return " ".join(_TOPIC_NOISE_RE.sub(" ", title).split()).lower()
+
+
+def _date(epoch: float) -> str:
+    return datetime.fromtimestamp(float(epoch), UTC).strftime("%Y-%m-%d")
+
+
+calendar_workload = CalendarWorkloadAnalyzer()
@@ -0,0 +1,321 @@
+"""Token-budgeted prompt context for section generation."""
+
+import json
+import math
+import re
+import threading
+from dataclasses import dataclass, field
+
+from app.config import settings
+
+# Hiragana, katakana, CJK ideographs and full-width forms
+_CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]")
+_CJK_RUN_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9_\-]+")
+
+# Records are only truncated when at least this much budget is left for them
+_MIN_TRUNCATE_TOKENS = 120
+
+SOURCE_KEYS = {
+    "calendar": "calendar_events",
+    "slack": "slack_messages",
+    "spreadsheet": "spreadsheet_data",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the model token count of ``text``.
+
+    Japanese characters cost roughly one token each, while Latin text and JSON
+    punctuation average about four characters per token.
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def query_terms(text: str) -> set[str]:
+    """Split a query into lowercase words and Japanese character bigrams."""
+    text = text.lower()
+    terms = set(_WORD_RE.findall(text))
+    for run in _CJK_RUN_RE.findall(text):
+        if len(run) == 1:
+            terms.add(run)
+        terms.update(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+def _encode(value) -> str:
+    return json.dumps(value, ensure_ascii=False, default=str, separators=(",", ":"))
+
+
+def _searchable(value) -> str:
+    if isinstance(value, dict):
+        return " ".join(_searchable(v) for v in value.values())
+    if isinstance(value, list):
+        return " ".join(_searchable(v) for v in value)
+    return str(value) if value is not None else ""
+
+
+def _shrink(value, ratio: float):
+    """Proportionally shorten long strings and lists inside a record."""
+    if isinstance(value, str):
+        if len(value) <= 40:
+            return value
+        return value[:max(40, int(len(value) * ratio))] + "…"
+    if isinstance(value, list):
+        keep = value if len(value) <= 1 else value[:max(1, int(len(value) * ratio))]
+        return [_shrink(v, ratio) for v in keep]
+    if isinstance(value, dict):
+        return {k: _shrink(v, ratio) for k, v in value.items()}
+    return value
+
+
+@dataclass(frozen=True, slots=True)
+class SourceRecord:
+    """One calendar event, Slack message or spreadsheet row, encoded once."""
+
+    source: str
+    position: int
+    payload: object
+    encoded: str
+    text: str
+    tokens: int
+    group: str | None = None
+    group_tokens: int = 0
+
+
+class SourceSnapshot:
+    """Immutable, pre-serialized view of a job's aggregated source data.
+
+    Each source type is encoded to compact JSON the first time a section asks
+    for it and the result is shared by reference with every later section, so
+    large exports are serialized once per job instead of once per section.
+    Safe to use from several threads.
+    """
+
+    def __init__(self, aggregated: dict):
+        self._aggregated = aggregated
+        self._records: dict[str, tuple[SourceRecord, ...]] = {}
+        self._workload: str | None = None
+        self._lock = threading.Lock()
+
+    def records(self, source: str) -> tuple[SourceRecord, ...]:
+        """Return the encoded records of one source type."""
+        cached = self._records.get(source)
+        if cached is not None:
+            return cached
+        with self._lock:
+            if source not in self._records:
+                self._records[source] = tuple(self._encode_source(source))
+            return self._records[source]
+
+    def workload(self) -> str | None:
+        """Return the encoded calendar workload digest, or None if there is none."""
+        if self._workload is None and self._aggregated.get("calendar_workload"):
+            with self._lock:
+                if self._workload is None:
+                    self._workload = _encode(self._aggregated["calendar_workload"])
+        return self._workload
+
+    def _encode_source(self, source: str) -> list[SourceRecord]:
+        items = self._aggregated.get(SOURCE_KEYS[source], [])
+        if source != "spreadsheet":
+            return [_record(source, i, item) for i, item in enumerate(items)]
+
+        records: list[SourceRecord] = []
+        for spreadsheet in items:
+            for sheet in spreadsheet.get("sheets", []):
+                group = _encode({
+                    "spreadsheet": spreadsheet.get("title", ""),
+                    "sheet": sheet.get("name", ""),
+                    "headers": sheet.get("headers", []),
+                })
+                header_text = _searchable(sheet.get("headers", []))
+                for row in sheet.get("rows", []):
+                    records.append(_record(source, len(records), row, group, header_text))
+        return records
+
+
+def _record(source: str, position: int, payload, group: str | None = None, extra_text: str = "") -> SourceRecord:
+    encoded = _encode(payload)
+    return SourceRecord(
+        source=source,
+        position=position,
+        payload=payload,
+        encoded=encoded,
+        text=f"{extra_text} {_searchable(payload)}".lower(),
+        tokens=estimate_tokens(encoded) + 1,
+        group=group,
+        group_tokens=estimate_tokens(group) if group else 0,
+    )
+
+
+@dataclass
+class SectionContext:
+    """Reference data selected for one section prompt."""
+
+    text: str
+    tokens: int
+    budget: int
+    included: dict[str, int] = field(default_factory=dict)
+    omitted: dict[str, int] = field(default_factory=dict)
+    truncated: int = 0
+
+    def omission_note(self) -> str:
+        """Japanese note telling the model which data was left out, or ''."""
+        parts = [f"{source} {count}件" for source, count in self.omitted.items() if count]
+        if not parts:
+            return ""
+        return f"データ量の上限により、関連度の低いデータを省略しています（{'、'.join(parts)}）。"
+
+
+class ContextBuilder:
+    """Ranks source records by relevance to a section and packs them into a token budget.
+
+    Every calendar event, Slack message and spreadsheet row is scored against
+    the section title and description. Half of the budget is shared evenly so
+    each requested source keeps its most relevant records, and the rest goes
+    to the best-scoring records overall. A record that no longer fits is
+    shortened rather than dropped when enough budget remains. Overview
+    sections get the calendar workload digest in place of individual events.
+    """
+
+    def __init__(self, token_budget: int | None = None):
+        self._budget = token_budget or settings.section_context_token_budget
+
+    def build(
+        self,
+        snapshot: SourceSnapshot,
+        sources: list[str],
+        section_title: str,
+        section_description: str,
+        overview: bool = False,
+    ) -> SectionContext:
+        """Select and render the reference data for one section.
+
+        Args:
+            snapshot: The job's pre-serialized source data.
+            sources: Source types to include (calendar, slack, spreadsheet).
+            section_title: The section heading.
+            section_description: Description of what the section should contain.
+            overview: Use the calendar workload digest instead of calendar
+                events, when the snapshot has one.
+
+        Returns:
+            The rendered JSON context and what was included or omitted.
+        """
+        workload = snapshot.workload() if overview and "calendar" in sources else None
+        ranked_sources = [s for s in sources if not (workload and s == "calendar")]
+        budget = self._budget - estimate_tokens(workload) if workload else self._budget
+
+        by_source = {source: snapshot.records(source) for source in ranked_sources}
+        records = [r for source in ranked_sources for r in by_source[source]]
+        scores = self._score(records, query_terms(f"{section_title} {section_description}"))
+        selected, truncated = self._pack(records, scores, ranked_sources, max(0, budget))
+
+        text = self._render(selected, sources, workload)
+        included = {source: len(selected[source]) for source in ranked_sources}
+        if workload:
+            included["calendar_workload"] = 1
+        return SectionContext(
+            text=text,
+            tokens=estimate_tokens(text),
+            budget=self._budget,
+            included=included,
+            omitted={source: len(by_source[source]) - included[source] for source in ranked_sources},
+            truncated=truncated,
+        )
+
+    @staticmethod
+    def _score(records: list[SourceRecord], terms: set[str]) -> list[float]:
+        if not terms or not records:
+            return [0.0] * len(records)
+        df = {t: sum(1 for r in records if t in r.text) for t in terms}
+        idf = {t: math.log(1 + len(records) / (1 + n)) for t, n in df.items() if n}
+        return [sum(w for t, w in idf.items() if t in r.text) for r in records]
+
+    def _pack(
+        self,
+        records: list[SourceRecord],
+        scores: list[float],
+        sources: list[str],
+        budget: int,
+    ) -> tuple[dict[str, dict[int, SourceRecord]], int]:
+        ranked = sorted(range(len(records)), key=lambda i: -scores[i])
+        selected: dict[str, dict[int, SourceRecord]] = {source: {} for source in sources}
+        groups: set[str] = set()
+        used = 0
+        truncated = 0
+
+        def cost(r: SourceRecord) -> int:
+            return r.tokens + (r.group_tokens if r.group and r.group not in groups else 0)
+
+        def take(r: SourceRecord) -> None:
+            nonlocal used
+            used += cost(r)
+            if r.group:
+                groups.add(r.group)
+            selected[r.source][r.position] = r
+
+        # Pass 1: an even share of half the budget for each source
+        floor = budget // 2 // max(1, len(sources))
+        for source in sources:
+            source_used = 0
+            for i in ranked:
+                r = records[i]
+                if r.source != source:
+                    continue
+                c = cost(r)
+                if source_used + c > floor:
+                    continue
+                source_used += c
+                take(r)
+
+        # Pass 2: the remaining budget by overall relevance
+        for i in ranked:
+            r = records[i]
+            if r.position in selected[r.source]:
+                continue
+            remaining = budget - used
+            if cost(r) <= remaining:
+                take(r)
+            elif remaining >= _MIN_TRUNCATE_TOKENS:
+                shortened = self._truncate(r, remaining - (cost(r) - r.tokens))
+                if shortened is not None:
+                    take(shortened)
+                    truncated += 1
+
+        return selected, truncated
+
+    @staticmethod
+    def _truncate(r: SourceRecord, max_tokens: int) -> SourceRecord | None:
+        ratio = max_tokens / max(1, r.tokens)
+        for _ in range(4):
+            payload = _shrink(r.payload, ratio)
+            encoded = _encode(payload)
+            tokens = estimate_tokens(encoded) + 1
+            if tokens <= max_tokens:
+                return SourceRecord(r.source, r.position, payload, encoded, r.text, tokens, r.group, r.group_tokens)
+            ratio *= 0.7
+        return None
+
+    @staticmethod
+    def _render(selected: dict[str, dict[int, SourceRecord]], sources: list[str], workload: str | None = None) -> str:
+        parts = []
+        for source in sources:
+            if workload and source == "calendar":
+                parts.append(f"{{\"type\":\"calendar_workload\",\"data\":{workload}}}")
+                continue
+            records = [selected[source][p] for p in sorted(selected[source])]
+            if source == "spreadsheet":
+                grouped: dict[str, list[str]] = {}
+                for r in records:
+                    grouped.setdefault(r.group, []).append(r.encoded)
+                # Each group is an encoded object; append the selected rows to it
+                data = ",".join(f"{group[:-1]},\"rows\":[{','.join(rows)}]}}" for group, rows in grouped.items())
+            else:
+                data = ",".join(r.encoded for r in records)
+            parts.append(f"{{\"type\":\"{source}\",\"data\":[{data}]}}")
+        return f"[{','.join(parts)}]"
@@ -1,14 +1,36 @@
 """Cross-source data aggregation service."""
 
+import logging
+
+from app.config import settings
+from app.services.calendar_digest import CalendarDigest, calendar_digest
+from app.services.calendar_workload import CalendarWorkloadAnalyzer, calendar_workload
+from app.services.slack_normalizer import SlackNormalizer, slack_normalizer
+
+logger = logging.getLogger(__name__)
+
 
 class DataAggregatorService:
     """Aggregates data from Calendar, Slack, and Sheets into a unified preview."""
 
+    def __init__(
+        self,
+        normalizer: SlackNormalizer | None = None,
+        digest: CalendarDigest | None = None,
+        workload: CalendarWorkloadAnalyzer | None = None,
+    ):
+        self._normalizer = normalizer or slack_normalizer
+        self._digest = digest or calendar_digest
+        self._workload = workload or calendar_workload
+
     async def aggregate(
         self,
         calendar_events: list[dict],
         slack_messages: list[dict],
         spreadsheet_data: list[dict],
+        fetch_errors: list[dict] | None = None,
+        owner_email: str | None = None,
+        slack_user_names: dict[str, str] | None = None,
     ) -> dict:
         """Merge and normalize data from all sources.
 
@@ -16,17 +38,50 @@ class DataAggregatorService:
             calendar_events: Events from Google Calendar.
             slack_messages: Messages from Slack.
             spreadsheet_data: Rows from Google Sheets.
+            fetch_errors: Sources that failed or timed out and were skipped.
+            owner_email: Whose calendar the events are from, left out of the
+                workload digest's counterparts.
+            slack_user_names: Display names for user IDs mentioned in Slack messages.
 
         Returns:
             Aggregated data dict with summary counts and source-tagged items.
+            Slack messages are filtered and compacted unless SLACK_NORMALIZE_ENABLED
+            is off; ``summary.slack_normalization`` reports what was removed.
+            Recurring calendar events are collapsed into series records unless
+            CALENDAR_SERIES_DIGEST_ENABLED is off; see ``summary.calendar_digest``.
+            ``calendar_workload`` holds statistics over all events (hours per
+            recurring meeting, counterpart and week) unless
+            CALENDAR_WORKLOAD_DIGEST_ENABLED is off.
         """
+        summary = {
+            "calendar_events_count": len(calendar_events),
+            "slack_messages_count": len(slack_messages),
+            "spreadsheet_rows_count": len(spreadsheet_data),
+        }
+        workload = None
+        if settings.calendar_workload_digest_enabled and calendar_events:
+            # Computed on the individual occurrences, before series are collapsed
+            workload = self._workload.analyze(calendar_events, owner_email)
+        if settings.calendar_series_digest_enabled and calendar_events:
+            calendar_events, digest_stats = self._digest.compact(calendar_events)
+            summary["calendar_digest"] = digest_stats.as_dict()
+        if settings.slack_normalize_enabled and slack_messages:
+            slack_messages, stats = self._normalizer.normalize(slack_messages, slack_user_names)
+            summary["slack_messages_count"] = len(slack_messages)
+            summary["slack_normalization"] = stats.as_dict()
+            logger.info(
+                "Slack normalization kept %d/%d messages, saved %d bytes (~%d tokens)",
+                stats.messages_out,
+                stats.messages_in,
+                stats.bytes_saved,
+                stats.tokens_saved,
+            )
+
         return {
-            "summary": {
-                "calendar_events_count": len(calendar_events),
-                "slack_messages_count": len(slack_messages),
-                "spreadsheet_rows_count": len(spreadsheet_data),
-            },
+            "summary": summary,
             "calendar_events": calendar_events,
+            "calendar_workload": workload,
             "slack_messages": slack_messages,
             "spreadsheet_data": spreadsheet_data,
+            "fetch_errors": fetch_errors or [],
         }
@@ -0,0 +1,202 @@
+"""Concurrent fan-out of Calendar, Slack and Sheets fetches."""
+
+import asyncio
+import logging
+import uuid
+from collections.abc import Awaitable, Callable
+
+from app.config import settings
+from app.services.calendar import CalendarService
+from app.services.slack import SlackService
+from app.services.slack_rate_limit import current_flow
+from app.services.spreadsheet import SheetsService
+
+logger = logging.getLogger(__name__)
+
+
+class DataFetchService:
+    """Runs all source fetches at once with per-provider caps and per-source timeouts.
+
+    A source that fails or times out is reported in ``errors`` and contributes no
+    data; the remaining sources are still returned.
+    """
+
+    def __init__(
+        self,
+        calendar: CalendarService | None = None,
+        slack: SlackService | None = None,
+        sheets: SheetsService | None = None,
+    ):
+        self._calendar = calendar or CalendarService()
+        self._slack = slack or SlackService()
+        self._sheets = sheets or SheetsService()
+
+    async def fetch_all(
+        self,
+        date_from: str,
+        date_to: str,
+        target_email: str | None = None,
+        google_token: str | None = None,
+        slack_token: str | None = None,
+        include_calendar: bool = False,
+        calendar_ids: list[str] | None = None,
+        all_calendars: bool = False,
+        slack_channel_ids: list[str] | None = None,
+        spreadsheet_ids: list[str] | None = None,
+        flow: str | None = None,
+        tenant_id: str | None = None,
+        user_id: str | None = None,
+    ) -> dict:
+        """Fetch every requested source concurrently.
+
+        Args:
+            date_from: Start date (YYYY-MM-DD).
+            date_to: End date (YYYY-MM-DD).
+            target_email: Optional attendee filter for calendar events.
+            google_token: Decrypted Google token, required for calendar and sheets.
+            slack_token: Decrypted Slack token, required for channels.
+            include_calendar: Whether to fetch calendar events.
+            calendar_ids: Calendars to read events from. Defaults to the primary calendar.
+            all_calendars: Also read every calendar in the user's calendar list.
+            slack_channel_ids: Slack channels to fetch messages from.
+            spreadsheet_ids: Spreadsheets to fetch.
+            flow: Fairness key for the Slack rate limiter, e.g. the job id.
+                Each call gets its own flow by default.
+            tenant_id: Tenant whose Slack message store is used; None bypasses it.
+            user_id: User whose Calendar event store is used; None bypasses it.
+
+        Returns:
+            Dict with calendar_events, slack_messages, slack_user_names (display
+            names of users mentioned in the messages), spreadsheet_data and errors.
+        """
+        flow_token = current_flow.set(flow or uuid.uuid4().hex)
+        try:
+            return await self._fetch_all(
+                date_from,
+                date_to,
+                target_email,
+                google_token,
+                slack_token,
+                include_calendar,
+                calendar_ids,
+                all_calendars,
+                slack_channel_ids,
+                spreadsheet_ids,
+                tenant_id,
+                user_id,
+            )
+        finally:
+            current_flow.reset(flow_token)
+
+    async def _fetch_all(
+        self,
+        date_from: str,
+        date_to: str,
+        target_email: str | None,
+        google_token: str | None,
+        slack_token: str | None,
+        include_calendar: bool,
+        calendar_ids: list[str] | None,
+        all_calendars: bool,
+        slack_channel_ids: list[str] | None,
+        spreadsheet_ids: list[str] | None,
+        tenant_id: str | None,
+        user_id: str | None,
+    ) -> dict:
+        limits = {
+            "google": asyncio.Semaphore(max(1, settings.fetch_google_concurrency)),
+            "slack": asyncio.Semaphore(max(1, settings.fetch_slack_concurrency)),
+        }
+        errors: list[dict] = []
+
+        timeouts = {
+            "google": settings.fetch_source_timeout_seconds,
+            # Slack calls are paced to the rate-limit tiers, so channels need longer
+            "slack": settings.fetch_slack_timeout_seconds,
+        }
+
+        async def run(provider: str, source: str, source_id: str, fetch: Callable[[], Awaitable]):
+            async with limits[provider]:
+                try:
+                    return await asyncio.wait_for(fetch(), timeout=timeouts[provider])
+                except TimeoutError:
+                    logger.warning("Fetch timed out: %s %s", source, source_id)
+                    errors.append({"source": source, "id": source_id, "error": "timeout"})
+                except Exception as e:  # noqa: BLE001 - reported in errors; other sources continue
+                    logger.warning("Fetch failed: %s %s: %s", source, source_id, e)
+                    errors.append({"source": source, "id": source_id, "error": str(e)})
+                return None
+
+        calendar_task = None
+        slack_tasks = []
+        sheet_tasks = []
+
+        # Calendar and Slack pages are collected as they stream in, so a fetch
+        # that times out still contributes what arrived before the deadline.
+        calendar_events: list[dict] = []
+
+        async def stream_calendar() -> None:
+            async for page in self._calendar.iter_events(
+                google_token,
+                date_from,
+                date_to,
+                target_email,
+                user_id=user_id,
+                calendar_ids=calendar_ids,
+                all_calendars=all_calendars,
+            ):
+                calendar_events.extend(page)
+
+        if include_calendar and google_token and date_from and date_to:
+            calendar_task = run("google", "calendar", ",".join(calendar_ids or ["primary"]), stream_calendar)
+
+        slack_pages: dict[str, list[dict]] = {}
+
+        async def stream_channel(ch_id: str) -> None:
+            messages = slack_pages.setdefault(ch_id, [])
+            async for page in self._slack.iter_messages(
+                slack_token, ch_id, date_from, date_to, tenant_id=tenant_id
+            ):
+                messages.extend(page)
+
+        if slack_token and date_from and date_to:
+            slack_tasks = [
+                run("slack", "slack", ch_id, lambda ch_id=ch_id: stream_channel(ch_id))
+                for ch_id in slack_channel_ids or []
+            ]
+
+        if google_token:
+            sheet_tasks = [
+                run(
+                    "google",
+                    "spreadsheet",
+                    ss_id,
+                    lambda ss_id=ss_id: self._sheets.get_spreadsheet(google_token, ss_id),
+                )
+                for ss_id in spreadsheet_ids or []
+            ]
+
+        _, _, sheet_results = await asyncio.gather(
+            calendar_task if calendar_task else asyncio.sleep(0, result=None),
+            asyncio.gather(*slack_tasks),
+            asyncio.gather(*sheet_tasks),
+        )
+
+        slack_messages: list[dict] = []
+        for ch_id in slack_channel_ids or []:
+            slack_messages.extend(slack_pages.get(ch_id, []))
+
+        slack_user_names: dict[str, str] = {}
+        if slack_messages:
+            try:
+                slack_user_names = await self._slack.resolve_mentions(slack_token, slack_messages)
+            except Exception as e:  # noqa: BLE001 - best effort; mentions then stay as user ids
+                logger.warning("Failed to resolve Slack mentions: %s", e)
+
+        return {
+            "calendar_events": calendar_events,
+            "slack_messages": slack_messages,
+            "slack_user_names": slack_user_names,
+            "spreadsheet_data": [ss for ss in sheet_results if ss is not None],
+            "errors": errors,
+        }
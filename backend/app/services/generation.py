@@ -1,14 +1,26 @@
 """Document generation orchestration service."""
 
-import traceback
-
-from app.db.client import get_supabase_admin_client
+import asyncio
+import logging
+
+from app.config import settings
+from app.db.repositories import (
+    AIProposalRepository,
+    DocumentRepository,
+    GenerationJobRepository,
+    OAuthTokenRepository,
+    TemplateRepository,
+)
 from app.services.ai import AIService
-from app.services.calendar import CalendarService
+from app.services.context_builder import ContextBuilder, SourceSnapshot
 from app.services.data_aggregator import DataAggregatorService
+from app.services.data_fetcher import DataFetchService
 from app.services.encryption import EncryptionService
-from app.services.slack import SlackService
-from app.services.spreadsheet import SheetsService
+
+logger = logging.getLogger(__name__)
+
+# Section headings that summarize the whole period rather than individual meetings
+_OVERVIEW_KEYWORDS = ("概要", "サマリー", "まとめ", "全体", "overview", "summary")
 
 
 class GenerationService:
@@ -16,210 +28,216 @@ class GenerationService:
 
     def __init__(self):
         self._ai = AIService()
-        self._calendar = CalendarService()
-        self._slack = SlackService()
-        self._sheets = SheetsService()
+        self._fetcher = DataFetchService()
         self._aggregator = DataAggregatorService()
+        self._context = ContextBuilder()
         self._encryption = EncryptionService()
+        self._documents = DocumentRepository()
+        self._templates = TemplateRepository()
+        self._proposals = AIProposalRepository()
+        self._jobs = GenerationJobRepository()
+        self._tokens = OAuthTokenRepository()
 
     async def start_generation(
         self,
         document_id: str,
         job_id: str,
-    ) -> None:
-        """Run the full document generation pipeline.
+    ) -> list[dict]:
+        """Run the full document generation pipeline for a leased job.
+
+        Job status transitions (claim, retry, completion, failure) are owned by
+        JobQueueService; this method raises on error so the worker can retry.
+        The generated sections are returned rather than stored, so they are
+        only published by JobQueueService.complete while the lease is held.
 
         Args:
             document_id: The document to generate content for.
             job_id: The generation job tracking ID.
-        """
-        admin = get_supabase_admin_client()
-        try:
-            # 1. Update job status
-            admin.table("generation_jobs").update({
-                "status": "processing",
-                "current_step": "データ取得中",
-                "started_at": "now()",
-            }).eq("id", job_id).execute()
-
-            # 2. Get document
-            doc_row = admin.table("documents").select("*").eq("id", document_id).maybe_single().execute()
-            if not doc_row.data:
-                raise ValueError("Document not found")
-            doc = doc_row.data
-
-            # 3. Determine sections from template or proposal
-            sections_to_generate = []
-            if doc.get("generation_mode") == "template" and doc.get("template_id"):
-                tmpl_row = admin.table("templates").select("parsed_structure").eq("id", doc["template_id"]).maybe_single().execute()
-                if tmpl_row.data and tmpl_row.data.get("parsed_structure"):
-                    sections_to_generate = tmpl_row.data["parsed_structure"].get("sections", [])
-            else:
-                proposal_row = (
-                    admin.table("ai_proposals")
-                    .select("proposed_structure")
-                    .eq("document_id", document_id)
-                    .eq("status", "approved")
-                    .order("created_at", desc=True)
-                    .limit(1)
-                    .execute()
-                )
-                if proposal_row.data:
-                    proposed = proposal_row.data[0].get("proposed_structure", [])
-                    for i, sec in enumerate(proposed):
-                        sections_to_generate.append({
-                            "order": i + 1,
-                            "title": sec.get("title", ""),
-                            "level": 1,
-                            "description": sec.get("description", ""),
-                            "estimated_sources": sec.get("estimated_sources", []),
-                        })
-
-            if not sections_to_generate:
-                sections_to_generate = [
-                    {"order": 1, "title": "概要", "level": 1, "description": "引き継ぎの概要"},
-                    {"order": 2, "title": "担当業務", "level": 1, "description": "担当業務の一覧"},
-                    {"order": 3, "title": "引き継ぎ事項", "level": 1, "description": "引き継ぎが必要な事項"},
-                ]
-
-            total_steps = len(sections_to_generate) + 1
-
-            # 4. Fetch source data
-            admin.table("generation_jobs").update({
-                "current_step": "データソースからデータを取得中",
-                "progress": int(100 / total_steps),
-            }).eq("id", job_id).execute()
-
-            calendar_events: list[dict] = []
-            slack_messages: list[dict] = []
-            spreadsheet_data: list[dict] = []
-
-            user_row = admin.table("users").select("id").eq("id", doc.get("created_by")).maybe_single().execute()
-            user_id = user_row.data["id"] if user_row.data else None
 
-            data_sources = doc.get("data_sources", [])
-            metadata = doc.get("metadata", {})
+        Returns:
+            Section rows ordered by section_order.
+        """
+        # 1. Update job step
+        await self._jobs.update(job_id, {"current_step": "データ取得中"})
+
+        # 2. Get document
+        doc = await self._documents.get_by_id(document_id)
+        if not doc:
+            raise ValueError("Document not found")
+
+        # 3. Determine sections from template or proposal
+        sections_to_generate = []
+        if doc.get("generation_mode") == "template" and doc.get("template_id"):
+            template = await self._templates.get_by_id(doc["template_id"], columns="parsed_structure")
+            if template and template.get("parsed_structure"):
+                sections_to_generate = template["parsed_structure"].get("sections", [])
+        else:
+            proposal = await self._proposals.get_latest(document_id, status="approved", columns="proposed_structure")
+            if proposal:
+                proposed = proposal.get("proposed_structure", [])
+                for i, sec in enumerate(proposed):
+                    sections_to_generate.append({
+                        "order": i + 1,
+                        "title": sec.get("title", ""),
+                        "level": 1,
+                        "description": sec.get("description", ""),
+                        "estimated_sources": sec.get("estimated_sources", []),
+                    })
+
+        if not sections_to_generate:
+            sections_to_generate = [
+                {"order": 1, "title": "概要", "level": 1, "description": "引き継ぎの概要"},
+                {"order": 2, "title": "担当業務", "level": 1, "description": "担当業務の一覧"},
+                {"order": 3, "title": "引き継ぎ事項", "level": 1, "description": "引き継ぎが必要な事項"},
+            ]
+
+        total_steps = len(sections_to_generate) + 1
+
+        # 4. Fetch source data
+        await self._jobs.update(job_id, {
+            "current_step": "データソースからデータを取得中",
+            "progress": int(100 / total_steps),
+        })
+
+        user_id = doc.get("created_by")
+
+        data_sources = doc.get("data_sources", [])
+        metadata = doc.get("metadata", {})
+
+        tokens: dict[str, str] = {}
+        if user_id and data_sources:
+            token_rows = await self._tokens.list_by_user(
+                user_id,
+                columns="provider, encrypted_access_token",
+                providers=["google", "slack"],
+            )
+            for row in token_rows:
+                tokens[row["provider"]] = self._encryption.decrypt(row["encrypted_access_token"])
+
+        fetched = await self._fetcher.fetch_all(
+            date_from=doc.get("date_range_start", ""),
+            date_to=doc.get("date_range_end", ""),
+            target_email=doc.get("target_user_email"),
+            google_token=tokens.get("google"),
+            slack_token=tokens.get("slack") if "slack" in data_sources else None,
+            include_calendar="calendar" in data_sources,
+            slack_channel_ids=metadata.get("slack_channel_ids", []),
+            calendar_ids=metadata.get("calendar_ids") or None,
+            all_calendars=metadata.get("all_calendars", False),
+            spreadsheet_ids=metadata.get("spreadsheet_ids", []) if "spreadsheet" in data_sources else [],
+            flow=job_id,
+            tenant_id=doc.get("tenant_id"),
+            user_id=user_id,
+        )
+
+        aggregated = await self._aggregator.aggregate(
+            fetched["calendar_events"],
+            fetched["slack_messages"],
+            fetched["spreadsheet_data"],
+            fetched["errors"],
+            owner_email=doc.get("target_user_email"),
+            slack_user_names=fetched["slack_user_names"],
+        )
+
+        # 5. Generate sections concurrently, bounded by the configured limit.
+        # Source data is encoded once here and shared by every section prompt.
+        return await self._generate_sections(
+            job_id,
+            document_id,
+            sections_to_generate,
+            SourceSnapshot(aggregated),
+            data_sources,
+            total_steps,
+        )
+
+    async def _generate_sections(
+        self,
+        job_id: str,
+        document_id: str,
+        sections_to_generate: list[dict],
+        snapshot: SourceSnapshot,
+        data_sources: list[str],
+        total_steps: int,
+    ) -> list[dict]:
+        """Generate all sections in parallel and return rows ordered by section_order.
 
-            if user_id and "calendar" in data_sources:
-                token_row = (
-                    admin.table("oauth_tokens")
-                    .select("encrypted_access_token")
-                    .eq("user_id", user_id)
-                    .eq("provider", "google")
-                    .maybe_single()
-                    .execute()
-                )
-                if token_row.data:
-                    google_token = self._encryption.decrypt(token_row.data["encrypted_access_token"])
-                    date_from = doc.get("date_range_start", "")
-                    date_to = doc.get("date_range_end", "")
-                    if date_from and date_to:
-                        calendar_events = await self._calendar.get_events(
-                            google_token, date_from, date_to, doc.get("target_user_email")
-                        )
-
-            if user_id and "slack" in data_sources:
-                token_row = (
-                    admin.table("oauth_tokens")
-                    .select("encrypted_access_token")
-                    .eq("user_id", user_id)
-                    .eq("provider", "slack")
-                    .maybe_single()
-                    .execute()
-                )
-                if token_row.data:
-                    slack_token = self._encryption.decrypt(token_row.data["encrypted_access_token"])
-                    date_from = doc.get("date_range_start", "")
-                    date_to = doc.get("date_range_end", "")
-                    for ch_id in metadata.get("slack_channel_ids", []):
-                        if date_from and date_to:
-                            msgs = await self._slack.get_messages(slack_token, ch_id, date_from, date_to)
-                            slack_messages.extend(msgs)
-
-            if user_id and "spreadsheet" in data_sources:
-                token_row = (
-                    admin.table("oauth_tokens")
-                    .select("encrypted_access_token")
-                    .eq("user_id", user_id)
-                    .eq("provider", "google")
-                    .maybe_single()
-                    .execute()
+        Progress is advanced as each section finishes, so it stays accurate even
+        when sections complete out of order.
+        """
+        semaphore = asyncio.Semaphore(max(1, settings.generation_section_concurrency))
+        progress_lock = asyncio.Lock()
+        completed = 0
+        section_count = len(sections_to_generate)
+
+        async def generate_one(i: int, section_def: dict) -> dict:
+            nonlocal completed
+
+            est_sources = section_def.get("estimated_sources", [])
+            sources = [s for s in ("calendar", "slack", "spreadsheet") if not est_sources or s in est_sources]
+            # Ranking thousands of records is CPU-bound; keep heartbeats responsive
+            context = await asyncio.to_thread(
+                self._context.build,
+                snapshot,
+                sources,
+                section_def.get("title", ""),
+                section_def.get("description", ""),
+                _is_overview(section_def),
+            )
+            if any(context.omitted.values()):
+                logger.info(
+                    "Section %r context: %d/%d tokens, included %s, omitted %s, truncated %d",
+                    section_def.get("title", ""),
+                    context.tokens,
+                    context.budget,
+                    context.included,
+                    context.omitted,
+                    context.truncated,
                 )
-                if token_row.data:
-                    google_token = self._encryption.decrypt(token_row.data["encrypted_access_token"])
-                    for ss_id in metadata.get("spreadsheet_ids", []):
-                        ss = await self._sheets.get_spreadsheet(google_token, ss_id)
-                        spreadsheet_data.append(ss)
-
-            aggregated = await self._aggregator.aggregate(calendar_events, slack_messages, spreadsheet_data)
-
-            # 5. Generate each section
-            for i, section_def in enumerate(sections_to_generate):
-                step_num = i + 2
-                progress = int((step_num / total_steps) * 100)
-
-                admin.table("generation_jobs").update({
-                    "current_step": f"セクション生成中: {section_def.get('title', '')}",
-                    "progress": progress,
-                }).eq("id", job_id).execute()
-
-                source_data = []
-                est_sources = section_def.get("estimated_sources", [])
-                if not est_sources:
-                    source_data = [
-                        {"type": "calendar", "data": aggregated.get("calendar_events", [])},
-                        {"type": "slack", "data": aggregated.get("slack_messages", [])},
-                        {"type": "spreadsheet", "data": aggregated.get("spreadsheet_data", [])},
-                    ]
-                else:
-                    if "calendar" in est_sources:
-                        source_data.append({"type": "calendar", "data": aggregated.get("calendar_events", [])})
-                    if "slack" in est_sources:
-                        source_data.append({"type": "slack", "data": aggregated.get("slack_messages", [])})
-                    if "spreadsheet" in est_sources:
-                        source_data.append({"type": "spreadsheet", "data": aggregated.get("spreadsheet_data", [])})
 
+            async with semaphore:
                 content = await self._ai.generate_section_content(
                     section_title=section_def.get("title", ""),
                     section_description=section_def.get("description", ""),
-                    source_data=source_data,
+                    source_text=context.text,
+                    omission_note=context.omission_note(),
                 )
 
-                source_tags = est_sources if est_sources else data_sources
-
-                admin.table("document_sections").insert({
-                    "document_id": document_id,
-                    "section_order": section_def.get("order", i + 1),
-                    "title": section_def.get("title", ""),
-                    "content": content,
-                    "source_tags": source_tags,
-                    "source_references": [],
-                    "is_ai_generated": True,
-                }).execute()
-
-            # 6. Complete
-            admin.table("documents").update({"status": "completed"}).eq("id", document_id).execute()
-            admin.table("generation_jobs").update({
-                "status": "completed",
-                "progress": 100,
-                "current_step": "完了",
-                "completed_at": "now()",
-            }).eq("id", job_id).execute()
-
-        except Exception as e:
-            admin.table("generation_jobs").update({
-                "status": "failed",
-                "error_message": str(e),
-                "completed_at": "now()",
-            }).eq("id", job_id).execute()
-            admin.table("documents").update({"status": "error"}).eq("id", document_id).execute()
-            traceback.print_exc()
+            async with progress_lock:
+                completed += 1
+                progress = int(((completed + 1) / total_steps) * 100)
+                await self._jobs.update(job_id, {
+                    "current_step": f"セクション生成中 ({completed}/{section_count}): {section_def.get('title', '')}",
+                    "progress": min(progress, 99),
+                })
+
+            return {
+                "document_id": document_id,
+                "section_order": section_def.get("order", i + 1),
+                "title": section_def.get("title", ""),
+                "content": content,
+                "source_tags": est_sources if est_sources else data_sources,
+                "source_references": [],
+                "is_ai_generated": True,
+            }
+
+        # A TaskGroup cancels the remaining sections as soon as one fails, so a
+        # failed attempt stops calling Gemini and writing progress to the job
+        try:
+            async with asyncio.TaskGroup() as group:
+                tasks = [
+                    group.create_task(generate_one(i, section_def))
+                    for i, section_def in enumerate(sections_to_generate)
+                ]
+        except* Exception as eg:  # noqa: BLE001 - re-raised below
+            # Surface the first failure as before, so the worker's retry handling is unchanged
+            raise eg.exceptions[0] from None
+        return sorted((t.result() for t in tasks), key=lambda r: r["section_order"])
 
     async def generate_proposal(
         self,
         document_id: str,
         data_summary: dict,
-    ) -> list[dict]:
+    ) -> dict:
         """Use Gemini AI to propose a section structure.
 
         Args:
@@ -227,15 +245,15 @@ class GenerationService:
             data_summary: Aggregated data summary for context.
 
         Returns:
-            List of proposed section dicts.
+            The stored ai_proposals row, including id and proposed_structure.
         """
-        admin = get_supabase_admin_client()
         proposed = await self._ai.propose_structure(data_summary)
+        return await self._proposals.create(document_id, proposed)
 
-        admin.table("ai_proposals").insert({
-            "document_id": document_id,
-            "proposed_structure": proposed,
-            "status": "pending",
-        }).execute()
 
-        return proposed
+def _is_overview(section_def: dict) -> bool:
+    """Whether a section summarizes the period and can use the calendar workload digest."""
+    if section_def.get("context") == "overview":
+        return True
+    heading = f"{section_def.get('title', '')} {section_def.get('description', '')}".lower()
+    return any(keyword in heading for keyword in _OVERVIEW_KEYWORDS)
@@ -0,0 +1,114 @@
+"""Shared construction and execution of Google API clients."""
+
+import asyncio
+import hashlib
+import json
+import threading
+
+import google_auth_httplib2
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.http import HttpRequest, build_http
+
+from app.utils.cache import TTLCache
+
+# Google access tokens live for an hour; a built service is reused until then
+_SERVICE_TTL_SECONDS = 3000
+# Google batch endpoints accept at most 50 requests per batch
+_MAX_BATCH_SIZE = 50
+
+
+class GoogleServiceFactory:
+    """Builds Google API service objects without re-reading discovery documents.
+
+    ``googleapiclient.discovery.build`` loads and parses the bundled discovery
+    document and opens a new HTTP transport on every call. Here each document
+    is parsed once per process, and the service built from it is cached per
+    API and access token. Requests run through ``execute``, which sends them
+    on a per-thread HTTP connection (httplib2 connections are not
+    thread-safe) that is reused by every later request on that thread.
+    """
+
+    def __init__(self):
+        self._documents: dict[tuple[str, str], dict] = {}
+        self._services = TTLCache(maxsize=512, ttl=_SERVICE_TTL_SECONDS)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def service(self, name: str, version: str, access_token: str):
+        """Return a service object for an API authorized with ``access_token``.
+
+        Args:
+            name: API name, e.g. "calendar".
+            version: API version, e.g. "v3".
+            access_token: Decrypted Google OAuth access token.
+
+        Returns:
+            A googleapiclient Resource. Execute its requests with ``execute``.
+        """
+        key = (name, version, hashlib.sha256(access_token.encode()).hexdigest())
+        service = self._services.get(key)
+        if service is None:
+            service = build_from_document(
+                self._document(name, version),
+                credentials=Credentials(token=access_token),
+            )
+            self._services.set(key, service)
+        return service
+
+    async def execute(self, request: HttpRequest) -> dict:
+        """Run a request in a worker thread on that thread's pooled connection."""
+        return await asyncio.to_thread(self._execute, request)
+
+    async def execute_batch(self, service, requests: dict[str, HttpRequest]) -> dict[str, dict | Exception]:
+        """Send several requests of one service as batch HTTP requests.
+
+        Args:
+            service: Service object the requests were created from.
+            requests: Requests keyed by an id unique within the call.
+
+        Returns:
+            Each id mapped to its response, or to the exception it failed with.
+        """
+        return await asyncio.to_thread(self._execute_batch, service, requests)
+
+    def _execute(self, request: HttpRequest) -> dict:
+        return request.execute(http=self._http(request.http.credentials))
+
+    def _execute_batch(self, service, requests: dict[str, HttpRequest]) -> dict[str, dict | Exception]:
+        results: dict[str, dict | Exception] = {}
+
+        def collect(request_id: str, response: dict, exception: Exception | None) -> None:
+            results[request_id] = exception if exception is not None else response
+
+        items = list(requests.items())
+        for i in range(0, len(items), _MAX_BATCH_SIZE):
+            batch = service.new_batch_http_request(callback=collect)
+            for request_id, request in items[i:i + _MAX_BATCH_SIZE]:
+                batch.add(request, request_id=request_id)
+            # Each request authorizes itself; the outer batch call only needs the token
+            batch.execute(http=self._http(items[0][1].http.credentials))
+        return results
+
+    def _http(self, credentials) -> google_auth_httplib2.AuthorizedHttp:
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = build_http()
+            self._local.http = http
+        # Only the credentials come from the service; the connection is this thread's
+        return google_auth_httplib2.AuthorizedHttp(credentials, http=http)
+
+    def _document(self, name: str, version: str) -> dict:
+        key = (name, version)
+        document = self._documents.get(key)
+        if document is None:
+            with self._lock:
+                document = self._documents.get(key)
+                if document is None:
+                    document = json.loads(get_static_doc(name, version))
+                    self._documents[key] = document
+        return document
+
+
+google_services = GoogleServiceFactory()
@@ -0,0 +1,52 @@
+"""Resolution of Supabase auth IDs to application identities."""
+
+from app.config import settings
+from app.db.repositories import UserRepository
+from app.models.user import Identity
+from app.utils.cache import TTLCache
+
+
+class IdentityService:
+    """Maps a Supabase auth ID to user id, tenant id and role in one query.
+
+    Results are held in a bounded TTL cache shared across requests. Call
+    ``invalidate`` whenever a user row changes. The cache is per process and
+    user rows can also change outside the app (dashboard, SQL), so other
+    processes keep serving a changed or deleted user for up to
+    ``IDENTITY_CACHE_TTL_SECONDS``; that TTL is the staleness bound.
+    """
+
+    def __init__(self):
+        self._users = UserRepository()
+        self._cache = TTLCache(
+            maxsize=settings.identity_cache_max_entries,
+            ttl=settings.identity_cache_ttl_seconds,
+        )
+
+    async def resolve(self, auth_id: str) -> Identity | None:
+        """Return the identity for an auth ID, or None if no user row exists."""
+        key = str(auth_id)
+        identity = self._cache.get(key)
+        if identity is not None:
+            return identity
+
+        row = await self._users.get_by_supabase_auth_id(key, columns="id, tenant_id, role")
+        if not row:
+            # Misses are not cached so a freshly created user resolves immediately
+            return None
+
+        identity = Identity(
+            auth_id=key,
+            user_id=row["id"],
+            tenant_id=row["tenant_id"],
+            role=row.get("role", "member"),
+        )
+        self._cache.set(key, identity)
+        return identity
+
+    def invalidate(self, auth_id: str) -> None:
+        """Drop a cached identity after the user's row was modified."""
+        self._cache.invalidate(str(auth_id))
+
+
+identity_service = IdentityService()
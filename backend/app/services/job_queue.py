@@ -0,0 +1,88 @@
+"""Durable generation job queue backed by the generation_jobs table."""
+
+from app.config import settings
+from app.db.repositories import GenerationJobRepository
+
+
+class JobQueueService:
+    """Enqueues, leases and settles generation jobs.
+
+    Workers claim jobs through the ``claim_generation_job`` database function,
+    which uses ``FOR UPDATE SKIP LOCKED`` so any number of workers on any number
+    of hosts can poll the same table safely.
+    """
+
+    def __init__(self):
+        self._jobs = GenerationJobRepository()
+
+    async def enqueue(self, document_id: str, tenant_id: str) -> str:
+        """Insert a pending job and return its ID."""
+        job = await self._jobs.create({
+            "document_id": document_id,
+            "tenant_id": tenant_id,
+            "status": "pending",
+            "progress": 0,
+            "max_attempts": settings.job_max_attempts,
+        })
+        return job["id"]
+
+    async def claim(self, worker_id: str) -> dict | None:
+        """Lease the next runnable job for this worker, if any."""
+        rows = await self._jobs.rpc("claim_generation_job", {
+            "p_worker_id": worker_id,
+            "p_lease_seconds": settings.job_lease_seconds,
+        })
+        return rows[0] if rows else None
+
+    async def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Extend the lease. Returns False if the job was reclaimed by someone else."""
+        owned = await self._jobs.rpc("heartbeat_generation_job", {
+            "p_job_id": job_id,
+            "p_worker_id": worker_id,
+            "p_lease_seconds": settings.job_lease_seconds,
+        })
+        return bool(owned)
+
+    async def reclaim_expired(self) -> int:
+        """Requeue (or fail) jobs whose worker stopped heartbeating."""
+        return await self._jobs.rpc("reclaim_generation_jobs", {}) or 0
+
+    async def complete(self, job: dict, worker_id: str, sections: list[dict]) -> bool:
+        """Publish the generated sections and mark the job and its document completed.
+
+        Sections are replaced (including any left by an earlier attempt) only
+        while ``worker_id`` still holds the lease of this attempt.
+
+        Returns:
+            False if the lease was lost and nothing was changed.
+        """
+        completed = await self._jobs.rpc("complete_generation_job", {
+            "p_job_id": job["id"],
+            "p_worker_id": worker_id,
+            "p_attempts": job.get("attempts", 1),
+            "p_sections": sections,
+        })
+        return bool(completed)
+
+    async def fail(self, job: dict, worker_id: str, error: str) -> bool:
+        """Schedule a retry with exponential backoff, or fail the job permanently.
+
+        The job and its document are only updated while ``worker_id`` still
+        holds the lease of this attempt.
+
+        Returns:
+            False if the lease was lost and nothing was changed.
+        """
+        attempts = job.get("attempts", 1)
+        delay = min(
+            settings.job_retry_base_seconds * (2 ** (attempts - 1)),
+            settings.job_retry_max_seconds,
+        )
+        settled = await self._jobs.rpc("fail_generation_job", {
+            "p_job_id": job["id"],
+            "p_worker_id": worker_id,
+            "p_attempts": attempts,
+            "p_error": error,
+            "p_retry_delay_seconds": int(delay),
+        })
+        return bool(settled)
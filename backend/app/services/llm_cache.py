@@ -0,0 +1,157 @@
+"""Content-addressed cache for LLM responses."""
+
+import hashlib
+import json
+import logging
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime, timedelta
+
+from app.config import settings
+from app.db.repositories import LLMCacheRepository
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCacheService:
+    """Two-tier cache for model responses keyed by model, prompt and parameters.
+
+    Lookups check a bounded in-memory LRU first and then the ``llm_cache``
+    table, so identical prompts are answered without another model call even
+    across processes and restarts. Entries expire after ``LLM_CACHE_TTL_SECONDS``;
+    the table is pruned to ``LLM_CACHE_MAX_ROWS`` least-recently-used rows.
+    Persistent tier failures are logged and treated as misses.
+    """
+
+    def __init__(self, repository: LLMCacheRepository | None = None):
+        self._repo = repository or LLMCacheRepository()
+        self._memory = TTLCache(
+            maxsize=settings.llm_cache_memory_max_entries,
+            ttl=settings.llm_cache_ttl_seconds,
+        )
+        self._counters: Counter[str] = Counter()
+        self._writes_since_prune = 0
+
+    @staticmethod
+    def make_key(model: str, prompt: str, params: dict | None = None) -> str:
+        """Return a stable SHA-256 key for a model call."""
+        payload = json.dumps(
+            {"model": model, "prompt": prompt, "params": params or {}},
+            ensure_ascii=False,
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get_or_generate(
+        self,
+        model: str,
+        prompt: str,
+        generate: Callable[[], Awaitable[str]],
+        params: dict | None = None,
+    ) -> str:
+        """Return a cached response, or call ``generate`` and cache its result.
+
+        Args:
+            model: Model name, part of the cache key.
+            prompt: Full prompt text, part of the cache key.
+            generate: Coroutine factory that performs the actual model call.
+            params: Generation parameters, part of the cache key.
+
+        Returns:
+            The response text.
+        """
+        if not settings.llm_cache_enabled:
+            return await generate()
+
+        key = self.make_key(model, prompt, params)
+        cached = await self.get(key)
+        if cached is not None:
+            return cached
+
+        response = await generate()
+        if response:
+            await self.set(key, model, response)
+        return response
+
+    async def get(self, key: str) -> str | None:
+        """Look up a response by cache key."""
+        cached = self._memory.get(key)
+        if cached is not None:
+            self._counters["memory_hits"] += 1
+            return cached
+
+        if settings.llm_cache_persistent:
+            try:
+                row = await self._repo.get(key)
+                if row:
+                    remaining = (
+                        datetime.fromisoformat(row["expires_at"]) - datetime.now(UTC)
+                    ).total_seconds()
+                    if remaining > 0:
+                        await self._repo.touch(key)
+                        self._memory.set(key, row["response"], ttl=remaining)
+                        self._counters["persistent_hits"] += 1
+                        return row["response"]
+            except Exception as e:  # noqa: BLE001 - a cache miss is always safe
+                self._counters["errors"] += 1
+                logger.warning("LLM cache lookup failed: %s", e)
+
+        self._counters["misses"] += 1
+        return None
+
+    async def set(self, key: str, model: str, response: str) -> None:
+        """Store a response in both tiers."""
+        self._memory.set(key, response)
+        self._counters["writes"] += 1
+        if not settings.llm_cache_persistent:
+            return
+
+        now = datetime.now(UTC)
+        try:
+            await self._repo.upsert({
+                "cache_key": key,
+                "model": model,
+                "response": response,
+                "size_bytes": len(response.encode("utf-8")),
+                "hit_count": 0,
+                "created_at": now.isoformat(),
+                "last_accessed_at": now.isoformat(),
+                "expires_at": (now + timedelta(seconds=settings.llm_cache_ttl_seconds)).isoformat(),
+            })
+            self._writes_since_prune += 1
+            if self._writes_since_prune >= settings.llm_cache_prune_every:
+                self._writes_since_prune = 0
+                removed = await self._repo.prune(settings.llm_cache_max_rows)
+                if removed:
+                    logger.info("Pruned %d LLM cache entries", removed)
+        except Exception as e:  # noqa: BLE001 - the response is already computed
+            self._counters["errors"] += 1
+            logger.warning("LLM cache write failed: %s", e)
+
+    async def invalidate(self, key: str) -> None:
+        """Remove an entry from both tiers."""
+        self._memory.invalidate(key)
+        if settings.llm_cache_persistent:
+            try:
+                await self._repo.delete(key)
+            except Exception as e:  # noqa: BLE001 - entry expires on its own
+                logger.warning("LLM cache invalidation failed: %s", e)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters for this process."""
+        hits = self._counters["memory_hits"] + self._counters["persistent_hits"]
+        lookups = hits + self._counters["misses"]
+        return {
+            "memory_hits": self._counters["memory_hits"],
+            "persistent_hits": self._counters["persistent_hits"],
+            "misses": self._counters["misses"],
+            "writes": self._counters["writes"],
+            "errors": self._counters["errors"],
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+
+llm_cache = LLMCacheService()
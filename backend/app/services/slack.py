@@ -1,35 +1,93 @@
 """Slack integration service."""
 
+import asyncio
+import logging
+import re
+import time
+from collections.abc import AsyncIterator
 from datetime import datetime, timezone
 
 from slack_sdk.web.async_client import AsyncWebClient
 
+from app.config import settings
+from app.services.slack_channels import SlackChannelCatalog, slack_channel_catalog
+from app.services.slack_directory import SlackUserDirectory, slack_user_directory
+from app.services.slack_events import SlackEventService, slack_event_service
+from app.services.slack_rate_limit import RateLimitedAsyncWebClient
+from app.services.slack_store import SlackMessageStore, slack_message_store
+
+logger = logging.getLogger(__name__)
+
+# conversations.history returns at most 200 messages per page (999 hard limit)
+_HISTORY_PAGE_SIZE = 200
+# Smallest gap between two ts values (Slack ts has microsecond precision)
+_EPSILON = 0.000001
+# User mentions in message text: <@U123> or <@U123|label>
+_MENTION_RE = re.compile(r"<@([UW][A-Z0-9]+)")
+
+
+class _Budget:
+    """Message-count and text-byte caps shared by every segment of one fetch."""
+
+    def __init__(self, max_messages: int, max_bytes: int):
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.count = 0
+        self.size = 0
+
+    @property
+    def messages_left(self) -> int:
+        return max(0, self.max_messages - self.count)
+
+    @property
+    def exhausted(self) -> bool:
+        return self.count >= self.max_messages or self.size >= self.max_bytes
+
+    def take(self, page: list[dict]) -> list[dict]:
+        accepted = []
+        for msg in page:
+            if self.exhausted:
+                break
+            accepted.append(msg)
+            self.count += 1
+            self.size += len(msg.get("text", "").encode("utf-8"))
+            self.size += sum(len(r.get("text", "").encode("utf-8")) for r in msg.get("thread_replies", []))
+        return accepted
+
 
 class SlackService:
     """Fetches channels and messages from Slack API."""
 
-    async def get_channels(self, access_token: str) -> list[dict]:
+    def __init__(
+        self,
+        directory: SlackUserDirectory | None = None,
+        store: SlackMessageStore | None = None,
+        events: SlackEventService | None = None,
+        channels: SlackChannelCatalog | None = None,
+    ):
+        self._directory = directory or slack_user_directory
+        self._store = store or slack_message_store
+        self._events = events or slack_event_service
+        self._channels = channels or slack_channel_catalog
+
+    async def get_channels(
+        self,
+        access_token: str,
+        include_private: bool = False,
+        refresh: bool = False,
+    ) -> list[dict]:
         """List channels in the connected workspace.
 
         Args:
             access_token: Decrypted Slack OAuth access token.
+            include_private: Also list private channels the user is a member of.
+            refresh: Bypass the cached listing.
 
         Returns:
             List of channel dicts.
         """
-        client = AsyncWebClient(token=access_token)
-        response = await client.conversations_list(types="public_channel")
-        channels = response.get("channels", [])
-
-        return [
-            {
-                "id": ch["id"],
-                "name": ch["name"],
-                "is_private": ch.get("is_private", False),
-                "member_count": ch.get("num_members", 0),
-            }
-            for ch in channels
-        ]
+        client = RateLimitedAsyncWebClient(token=access_token)
+        return await self._channels.get_channels(client, include_private=include_private, refresh=refresh)
 
     async def get_messages(
         self,
@@ -37,6 +95,9 @@ class SlackService:
         channel_id: str,
         date_from: str,
         date_to: str,
+        max_messages: int | None = None,
+        max_bytes: int | None = None,
+        tenant_id: str | None = None,
     ) -> list[dict]:
         """Fetch messages from a channel for the given date range.
 
@@ -45,73 +106,306 @@ class SlackService:
             channel_id: Slack channel ID.
             date_from: Start date (YYYY-MM-DD).
             date_to: End date (YYYY-MM-DD).
+            max_messages: Stop after this many messages. Defaults to SLACK_MAX_MESSAGES_PER_CHANNEL.
+            max_bytes: Stop once message text reaches this many bytes. Defaults to SLACK_MAX_BYTES_PER_CHANNEL.
+            tenant_id: Tenant to cache messages for; without it the message store is bypassed.
 
         Returns:
             List of message dicts including thread replies.
         """
-        client = AsyncWebClient(token=access_token)
+        results: list[dict] = []
+        async for page in self.iter_messages(
+            access_token,
+            channel_id,
+            date_from,
+            date_to,
+            max_messages=max_messages,
+            max_bytes=max_bytes,
+            tenant_id=tenant_id,
+        ):
+            results.extend(page)
+        return results
+
+    async def iter_messages(
+        self,
+        access_token: str,
+        channel_id: str,
+        date_from: str,
+        date_to: str,
+        max_messages: int | None = None,
+        max_bytes: int | None = None,
+        tenant_id: str | None = None,
+    ) -> AsyncIterator[list[dict]]:
+        """Stream a channel's history page by page, following pagination cursors.
+
+        Each yielded page is a list of message dicts including thread replies,
+        so callers can process history without holding all of it in memory.
+        Messages received through the Events API are read from the database
+        without calling Slack. With a ``tenant_id``, ranges already in the
+        message store are served from it and only the missing gaps are
+        requested from Slack. Stored messages are only served after checking
+        that the token's user can read the channel.
+
+        Args:
+            access_token: Decrypted Slack OAuth access token.
+            channel_id: Slack channel ID.
+            date_from: Start date (YYYY-MM-DD).
+            date_to: End date (YYYY-MM-DD).
+            max_messages: Stop after this many messages. Defaults to SLACK_MAX_MESSAGES_PER_CHANNEL.
+            max_bytes: Stop once message text reaches this many bytes. Defaults to SLACK_MAX_BYTES_PER_CHANNEL.
+            tenant_id: Tenant to cache messages for; without it the message store is bypassed.
+
+        Yields:
+            Lists of message dicts, newest first.
+        """
+        client = RateLimitedAsyncWebClient(token=access_token)
+        budget = _Budget(
+            max_messages or settings.slack_max_messages_per_channel,
+            max_bytes or settings.slack_max_bytes_per_channel,
+        )
+        limit = asyncio.Semaphore(max(1, settings.slack_thread_concurrency))
 
-        oldest = str(
+        oldest = (
             datetime.strptime(date_from, "%Y-%m-%d")
             .replace(tzinfo=timezone.utc)
             .timestamp()
         )
-        latest = str(
+        latest = (
             datetime.strptime(date_to, "%Y-%m-%d")
             .replace(hour=23, minute=59, second=59, tzinfo=timezone.utc)
             .timestamp()
         )
 
-        history = await client.conversations_history(
-            channel=channel_id, oldest=oldest, latest=latest
-        )
-        messages = history.get("messages", [])
-
-        user_cache: dict[str, str] = {}
-
-        async def resolve_user(user_id: str) -> str:
-            if user_id in user_cache:
-                return user_cache[user_id]
-            try:
-                info = await client.users_info(user=user_id)
-                name = info["user"].get("real_name") or info["user"].get("name", user_id)
-            except Exception:
-                name = user_id
-            user_cache[user_id] = name
-            return name
-
-        results = []
-        for msg in messages:
-            user_id = msg.get("user", "")
-            user_name = await resolve_user(user_id)
-
-            thread_replies = []
-            if msg.get("thread_ts") and msg.get("reply_count", 0) > 0:
-                replies_resp = await client.conversations_replies(
-                    channel=channel_id, ts=msg["thread_ts"]
+        use_events = settings.slack_events_enabled
+        use_store = bool(tenant_id and settings.slack_message_cache_enabled)
+        if (use_events or use_store) and not await self._channels.can_read(client, channel_id):
+            # Stored messages are shared by the tenant; never serve them to a non-member
+            use_events = use_store = False
+
+        sources: list[AsyncIterator[list[dict]]] = []
+        if use_events:
+            team_id = await self._directory.team_id(client)
+            covered = await self._events.ingested_range(team_id, channel_id)
+            if covered and covered[0] <= latest:
+                since, until = covered
+                if until < latest:
+                    # Events stopped arriving; anything after the last one comes from Slack
+                    sources.append(
+                        self._iter_history(client, channel_id, max(oldest, until), latest, limit, budget, None)
+                    )
+                if until >= oldest:
+                    # Everything in between arrived as events; only older history needs Slack
+                    sources.append(
+                        self._iter_ingested(client, team_id, channel_id, max(oldest, since), min(latest, until))
+                    )
+                latest = since - _EPSILON
+
+        store_key = None
+        segments = [(oldest, latest, False)] if latest >= oldest else []
+        if segments and use_store:
+            store_key = (tenant_id, await self._directory.team_id(client), channel_id)
+            segments = await self._store.plan(*store_key, oldest, latest)
+
+        for seg_oldest, seg_latest, cached in segments:
+            if cached:
+                sources.append(self._iter_cached(client, store_key, seg_oldest, seg_latest, limit))
+            else:
+                sources.append(
+                    self._iter_history(client, channel_id, seg_oldest, seg_latest, limit, budget, store_key)
                 )
-                for reply in replies_resp.get("messages", [])[1:]:
-                    reply_user = await resolve_user(reply.get("user", ""))
-                    thread_replies.append(
-                        {
-                            "id": reply.get("ts", ""),
-                            "user_name": reply_user,
-                            "text": reply.get("text", ""),
-                            "timestamp": reply.get("ts", ""),
-                        }
+
+        for pages in sources:
+            async for page in pages:
+                page = budget.take(page)
+                if page:
+                    yield page
+                if budget.exhausted:
+                    logger.info(
+                        "Slack history for %s capped at %d messages / %d bytes",
+                        channel_id,
+                        budget.count,
+                        budget.size,
                     )
+                    return
+
+    async def resolve_mentions(self, access_token: str, messages: list[dict]) -> dict[str, str]:
+        """Return display names of the users mentioned in formatted messages.
+
+        Args:
+            access_token: Decrypted Slack OAuth access token.
+            messages: Messages as returned by ``iter_messages``, with their replies.
 
-            ts = msg.get("ts", "")
-            results.append(
-                {
-                    "id": ts,
-                    "user": user_id,
-                    "user_name": user_name,
-                    "text": msg.get("text", ""),
-                    "timestamp": ts,
-                    "thread_replies": thread_replies,
-                    "url": f"https://slack.com/archives/{channel_id}/p{ts.replace('.', '')}",
-                }
+        Returns:
+            Dict of user ID to display name for the mentions that could be resolved.
+        """
+        user_ids = {
+            user_id
+            for msg in messages
+            for text in [msg.get("text", "")] + [r.get("text", "") for r in msg.get("thread_replies", [])]
+            for user_id in _MENTION_RE.findall(text or "")
+        }
+        if not user_ids:
+            return {}
+        client = RateLimitedAsyncWebClient(token=access_token)
+        names = await self._directory.resolve(client, user_ids)
+        return {user_id: name for user_id, name in names.items() if name != user_id}
+
+    async def _iter_ingested(
+        self,
+        client: AsyncWebClient,
+        team_id: str,
+        channel_id: str,
+        oldest: float,
+        latest: float,
+    ) -> AsyncIterator[list[dict]]:
+        """Serve a range from messages received through the Events API."""
+        async for messages in self._events.iter_messages(team_id, channel_id, oldest, latest):
+            names = await self._directory.resolve(
+                client,
+                {msg["user"] for msg in messages} | {reply["user"] for msg in messages for reply in msg["replies"]},
             )
+            yield [self._format_message(channel_id, msg, msg["replies"], names) for msg in messages]
 
-        return results
+    async def _iter_history(
+        self,
+        client: AsyncWebClient,
+        channel_id: str,
+        oldest: float,
+        latest: float,
+        limit: asyncio.Semaphore,
+        budget: _Budget,
+        store_key: tuple[str, str, str] | None,
+    ) -> AsyncIterator[list[dict]]:
+        """Fetch a range from conversations.history, storing pages and coverage when cached."""
+        fetched_at = time.time()
+        cursor = None
+        while True:
+            history = await client.conversations_history(
+                channel=channel_id,
+                oldest=f"{oldest:.6f}",
+                latest=f"{latest:.6f}",
+                inclusive=True,
+                limit=_HISTORY_PAGE_SIZE,
+                cursor=cursor,
+            )
+            # Skip thread expansion for messages beyond the cap
+            messages = history.get("messages", [])[:budget.messages_left]
+            page = await self._format_messages(client, channel_id, messages, limit)
+            if store_key:
+                await self._store.save(
+                    *store_key, [(m, raw.get("latest_reply")) for m, raw in zip(page, messages, strict=True)]
+                )
+            yield page
+
+            cursor = (history.get("response_metadata") or {}).get("next_cursor")
+            if not cursor or not history.get("has_more", True):
+                break
+
+        if store_key:
+            await self._store.add_coverage(*store_key, oldest, latest, fetched_at)
+
+    async def _iter_cached(
+        self,
+        client: AsyncWebClient,
+        store_key: tuple[str, str, str],
+        oldest: float,
+        latest: float,
+        limit: asyncio.Semaphore,
+    ) -> AsyncIterator[list[dict]]:
+        """Serve a covered range from the store, re-expanding threads that may have new replies."""
+        channel_id = store_key[2]
+        async for rows in self._store.iter_cached(*store_key, oldest, latest):
+            stale = [row for row in rows if self._store.needs_thread_refresh(row)]
+            if stale:
+                threads = await asyncio.gather(
+                    *(self._fetch_thread(client, channel_id, row["message"]["timestamp"], limit) for row in stale)
+                )
+                names = await self._directory.resolve(
+                    client, {reply.get("user", "") for replies in threads for reply in replies}, limit=limit
+                )
+                refreshed = []
+                for row, replies in zip(stale, threads, strict=True):
+                    row["message"]["thread_replies"] = self._format_replies(replies, names)
+                    latest_reply = max((r.get("ts", "") for r in replies), default=row["latest_reply"])
+                    refreshed.append((row["message"], latest_reply))
+                await self._store.save(*store_key, refreshed)
+            yield [row["message"] for row in rows]
+
+    async def _format_messages(
+        self,
+        client: AsyncWebClient,
+        channel_id: str,
+        messages: list[dict],
+        limit: asyncio.Semaphore,
+    ) -> list[dict]:
+        """Expand threads and resolve user names for one page of raw history."""
+
+        async def expand(msg: dict) -> list[dict]:
+            if not (msg.get("thread_ts") and msg.get("reply_count", 0) > 0):
+                return []
+            return await self._fetch_thread(client, channel_id, msg["thread_ts"], limit)
+
+        # Expand threads concurrently; gather keeps them in message order
+        threads = await asyncio.gather(*(expand(msg) for msg in messages))
+        names = await self._directory.resolve(
+            client,
+            {msg.get("user", "") for msg in messages}
+            | {reply.get("user", "") for replies in threads for reply in replies},
+            limit=limit,
+        )
+
+        return [
+            self._format_message(channel_id, msg, replies, names)
+            for msg, replies in zip(messages, threads, strict=True)
+        ]
+
+    @classmethod
+    def _format_message(cls, channel_id: str, msg: dict, replies: list[dict], names: dict[str, str]) -> dict:
+        user_id = msg.get("user", "")
+        ts = msg.get("ts", "")
+        return {
+            "id": ts,
+            "user": user_id,
+            "user_name": names.get(user_id, user_id),
+            "text": msg.get("text", ""),
+            "timestamp": ts,
+            "subtype": msg.get("subtype"),
+            "is_bot": bool(msg.get("bot_id")),
+            "thread_replies": cls._format_replies(replies, names),
+            "url": f"https://slack.com/archives/{channel_id}/p{ts.replace('.', '')}",
+        }
+
+    @staticmethod
+    def _format_replies(replies: list[dict], names: dict[str, str]) -> list[dict]:
+        return [
+            {
+                "id": reply.get("ts", ""),
+                "user_name": names.get(reply.get("user", ""), reply.get("user", "")),
+                "text": reply.get("text", ""),
+                "timestamp": reply.get("ts", ""),
+                "subtype": reply.get("subtype"),
+                "is_bot": bool(reply.get("bot_id")),
+            }
+            for reply in replies
+        ]
+
+    async def _fetch_thread(
+        self,
+        client: AsyncWebClient,
+        channel_id: str,
+        thread_ts: str,
+        limit: asyncio.Semaphore,
+    ) -> list[dict]:
+        """Fetch every reply in a thread, following pagination cursors."""
+        async with limit:
+            replies: list[dict] = []
+            cursor = None
+            while True:
+                resp = await client.conversations_replies(
+                    channel=channel_id, ts=thread_ts, limit=_HISTORY_PAGE_SIZE, cursor=cursor
+                )
+                # The parent message is returned first on every page
+                replies.extend(m for m in resp.get("messages", []) if m.get("ts") != thread_ts)
+                cursor = (resp.get("response_metadata") or {}).get("next_cursor")
+                if not cursor or not resp.get("has_more", True):
+                    return replies
@@ -0,0 +1,150 @@
+"""Cached, paginated Slack channel listing."""
+
+import asyncio
+import hashlib
+import logging
+import time
+
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.async_client import AsyncWebClient
+
+from app.config import settings
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# conversations.list accepts up to 1000 channels per page
+_CHANNELS_PAGE_SIZE = 1000
+
+
+class SlackChannelCatalog:
+    """Lists a workspace's channels and serves repeat requests from memory.
+
+    Listings are cached per token, since which private channels are visible
+    depends on the user the token belongs to. A listing younger than
+    ``SLACK_CHANNELS_FRESH_SECONDS`` is returned as is; an older one is still
+    returned immediately while a single background refresh replaces it
+    (stale-while-revalidate). Only listings older than
+    ``SLACK_CHANNELS_MAX_STALE_SECONDS`` make the caller wait for Slack.
+    """
+
+    def __init__(self):
+        # (token fingerprint, include_private) -> (fetched_at, channels)
+        self._listings = TTLCache(maxsize=1024, ttl=settings.slack_channels_max_stale_seconds)
+        self._refreshes: dict[tuple[str, bool], asyncio.Task] = {}
+        # (token fingerprint, channel id) -> whether the token's user can read the channel
+        self._access = TTLCache(maxsize=4096, ttl=settings.slack_channel_access_ttl_seconds)
+
+    async def get_channels(
+        self,
+        client: AsyncWebClient,
+        include_private: bool = False,
+        refresh: bool = False,
+    ) -> list[dict]:
+        """Return the channels visible to the client's token.
+
+        Args:
+            client: Slack client for the workspace.
+            include_private: Also list private channels the token's user is a member of.
+            refresh: Ignore the cached listing and wait for a fresh one.
+
+        Returns:
+            List of channel dicts sorted by name.
+        """
+        key = (hashlib.sha256((client.token or "").encode()).hexdigest(), include_private)
+        cached = None if refresh else self._listings.get(key)
+        if cached is None:
+            # Shielded so a cancelled caller does not cancel the listing other callers share
+            return await asyncio.shield(self._refresh(key, client))
+
+        fetched_at, channels = cached
+        if time.time() - fetched_at > settings.slack_channels_fresh_seconds and key not in self._refreshes:
+            self._refresh(key, client).add_done_callback(_log_failure)
+        return channels
+
+    async def can_read(self, client: AsyncWebClient, channel_id: str) -> bool:
+        """Whether the token's user may read a channel's history.
+
+        Stored messages are shared by everyone in a tenant, so they may only
+        be served to users Slack itself would show the channel to: anyone in
+        the workspace for public channels, members only for private channels,
+        group DMs and DMs. Answers are cached for
+        ``SLACK_CHANNEL_ACCESS_TTL_SECONDS``.
+        """
+        key = (hashlib.sha256((client.token or "").encode()).hexdigest(), channel_id)
+        allowed = self._access.get(key)
+        if allowed is not None:
+            return allowed
+        try:
+            resp = await client.conversations_info(channel=channel_id)
+        except SlackApiError as e:
+            # channel_not_found is how Slack answers for conversations the user cannot see
+            logger.info("Slack channel %s not readable with this token: %s", channel_id, e.response.get("error"))
+            self._access.set(key, False)
+            return False
+        channel = resp.get("channel") or {}
+        # conversations.info only returns a DM to its own participants
+        allowed = bool(
+            channel.get("is_im")
+            or channel.get("is_member")
+            or not (channel.get("is_private") or channel.get("is_mpim"))
+        )
+        self._access.set(key, allowed)
+        return allowed
+
+    def _refresh(self, key: tuple[str, bool], client: AsyncWebClient) -> asyncio.Task:
+        # Concurrent callers share one listing per token
+        task = self._refreshes.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(key, client))
+            self._refreshes[key] = task
+            task.add_done_callback(lambda _: self._refreshes.pop(key, None))
+        return task
+
+    async def _fetch(self, key: tuple[str, bool], client: AsyncWebClient) -> list[dict]:
+        include_private = key[1]
+        types = "public_channel,private_channel" if include_private else "public_channel"
+        try:
+            channels = await self._fetch_all(client, types)
+        except SlackApiError as e:
+            # Tokens granted before groups:read was requested cannot list private channels
+            if not include_private or e.response.get("error") != "missing_scope":
+                raise
+            logger.info("Slack token lacks groups:read; listing public channels only")
+            channels = await self._fetch_all(client, "public_channel")
+
+        channels.sort(key=lambda ch: ch["name"])
+        self._listings.set(key, (time.time(), channels))
+        return channels
+
+    @staticmethod
+    async def _fetch_all(client: AsyncWebClient, types: str) -> list[dict]:
+        channels: list[dict] = []
+        cursor = None
+        while True:
+            resp = await client.conversations_list(
+                types=types,
+                exclude_archived=True,
+                limit=_CHANNELS_PAGE_SIZE,
+                cursor=cursor,
+            )
+            channels.extend(
+                {
+                    "id": ch["id"],
+                    "name": ch["name"],
+                    "is_private": ch.get("is_private", False),
+                    "member_count": ch.get("num_members", 0),
+                }
+                for ch in resp.get("channels", [])
+            )
+            cursor = (resp.get("response_metadata") or {}).get("next_cursor")
+            if not cursor:
+                return channels
+
+
+def _log_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Background Slack channel refresh failed: %s", task.exception())
+
+
+slack_channel_catalog = SlackChannelCatalog()
@@ -0,0 +1,177 @@
+"""Workspace-wide Slack user directory."""
+
+import asyncio
+import hashlib
+import logging
+from datetime import UTC, datetime
+
+from slack_sdk.web.async_client import AsyncWebClient
+
+from app.config import settings
+from app.db.repositories import SlackUserDirectoryRepository
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+_USERS_PAGE_SIZE = 200
+# How long to wait before retrying a failed users.list
+_RETRY_SECONDS = 300
+
+
+class SlackUserDirectory:
+    """Maps Slack user IDs to display names, one shared directory per workspace.
+
+    The directory is loaded in bulk with paginated ``users.list`` and kept for
+    ``SLACK_USER_DIRECTORY_TTL_SECONDS``, so resolving a name is a dict lookup
+    for every channel, request and job in the process. When persistence is
+    enabled the directory is also stored in ``slack_user_directory`` so other
+    processes and restarts can reuse it. Users that joined after the last
+    refresh are looked up individually and added to the directory.
+    """
+
+    def __init__(self, repository: SlackUserDirectoryRepository | None = None):
+        self._repo = repository or SlackUserDirectoryRepository()
+        self._directories = TTLCache(maxsize=256, ttl=settings.slack_user_directory_ttl_seconds)
+        # Token fingerprint -> workspace id, so auth.test runs once per token
+        self._teams = TTLCache(maxsize=1024, ttl=settings.slack_user_directory_ttl_seconds)
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._lookups: dict[tuple[str, str], asyncio.Task] = {}
+
+    async def resolve(
+        self,
+        client: AsyncWebClient,
+        user_ids: set[str],
+        limit: asyncio.Semaphore | None = None,
+    ) -> dict[str, str]:
+        """Return display names for ``user_ids``.
+
+        Args:
+            client: Slack client for the workspace.
+            user_ids: User IDs to resolve; empty IDs are ignored.
+            limit: Optional semaphore bounding lookups of users missing from the directory.
+
+        Returns:
+            Dict of user ID to display name. IDs that cannot be resolved map to themselves.
+        """
+        user_ids = {u for u in user_ids if u}
+        if not user_ids:
+            return {}
+        team_id = await self.team_id(client)
+        directory = await self.get_directory(client)
+        limit = limit or asyncio.Semaphore(4)
+
+        async def lookup(user_id: str) -> None:
+            async with limit:
+                try:
+                    info = await client.users_info(user=user_id)
+                    directory[user_id] = _display_name(info["user"])
+                except Exception:  # noqa: BLE001 - unknown users keep their id
+                    directory[user_id] = user_id
+
+        def pending(user_id: str) -> asyncio.Task:
+            # Concurrent channel fetches share a single lookup per unknown user
+            key = (team_id, user_id)
+            task = self._lookups.get(key)
+            if task is None:
+                task = asyncio.ensure_future(lookup(user_id))
+                self._lookups[key] = task
+                task.add_done_callback(lambda _: self._lookups.pop(key, None))
+            return task
+
+        missing = [u for u in user_ids if u not in directory]
+        if missing:
+            await asyncio.gather(*(pending(u) for u in missing))
+        return {u: directory.get(u, u) for u in user_ids}
+
+    async def get_directory(self, client: AsyncWebClient) -> dict[str, str]:
+        """Return the shared directory for the client's workspace, loading it if needed."""
+        team_id = await self.team_id(client)
+        directory = self._directories.get(team_id)
+        if directory is not None:
+            return directory
+
+        lock = self._locks.setdefault(team_id, asyncio.Lock())
+        async with lock:
+            directory = self._directories.get(team_id)
+            if directory is not None:
+                return directory
+
+            persisted = await self._load_persisted(team_id)
+            if persisted is not None:
+                directory, ttl = persisted
+            else:
+                ttl = settings.slack_user_directory_ttl_seconds
+                try:
+                    directory = await self._fetch_all(client)
+                    logger.info("Loaded %d Slack users for workspace %s", len(directory), team_id)
+                    await self._persist(team_id, directory)
+                except Exception as e:  # noqa: BLE001 - retried after _RETRY_SECONDS
+                    # Fall back to per-user lookups and retry the bulk load soon
+                    logger.warning("Failed to list Slack users for workspace %s: %s", team_id, e)
+                    directory, ttl = {}, _RETRY_SECONDS
+            self._directories.set(team_id, directory, ttl=ttl)
+            return directory
+
+    def invalidate(self, team_id: str) -> None:
+        """Force the next lookup for a workspace to reload the directory."""
+        self._directories.invalidate(team_id)
+
+    async def team_id(self, client: AsyncWebClient) -> str:
+        """Return the workspace (team) id of the client's token."""
+        fingerprint = hashlib.sha256((client.token or "").encode()).hexdigest()
+        team_id = self._teams.get(fingerprint)
+        if team_id is None:
+            auth = await client.auth_test()
+            team_id = auth.get("team_id", "") or fingerprint
+            self._teams.set(fingerprint, team_id)
+        return team_id
+
+    @staticmethod
+    async def _fetch_all(client: AsyncWebClient) -> dict[str, str]:
+        directory: dict[str, str] = {}
+        cursor = None
+        while True:
+            resp = await client.users_list(limit=_USERS_PAGE_SIZE, cursor=cursor)
+            for member in resp.get("members", []):
+                directory[member["id"]] = _display_name(member)
+            cursor = (resp.get("response_metadata") or {}).get("next_cursor")
+            if not cursor:
+                return directory
+
+    async def _load_persisted(self, team_id: str) -> tuple[dict[str, str], float] | None:
+        if not settings.slack_user_directory_persist:
+            return None
+        try:
+            row = await self._repo.get(team_id)
+        except Exception as e:  # noqa: BLE001 - reload from Slack instead
+            logger.warning("Failed to load Slack user directory: %s", e)
+            return None
+        if not row:
+            return None
+        age = (datetime.now(UTC) - datetime.fromisoformat(row["refreshed_at"])).total_seconds()
+        remaining = settings.slack_user_directory_ttl_seconds - age
+        if remaining <= 0:
+            return None
+        return dict(row.get("users") or {}), remaining
+
+    async def _persist(self, team_id: str, directory: dict[str, str]) -> None:
+        if not settings.slack_user_directory_persist:
+            return
+        try:
+            await self._repo.upsert(team_id, directory, datetime.now(UTC).isoformat())
+        except Exception as e:  # noqa: BLE001 - kept in memory regardless
+            logger.warning("Failed to persist Slack user directory: %s", e)
+
+
+def _display_name(user: dict) -> str:
+    profile = user.get("profile") or {}
+    return (
+        user.get("real_name")
+        or profile.get("real_name")
+        or profile.get("display_name")
+        or user.get("name")
+        or user.get("id", "")
+    )
+
+
+slack_user_directory = SlackUserDirectory()
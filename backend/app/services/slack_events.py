@@ -0,0 +1,241 @@
+"""Ingestion of Slack Events API message events."""
+
+import hashlib
+import hmac
+import logging
+import math
+import time
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime
+
+from app.config import settings
+from app.db.repositories import SlackIngestRepository
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Slack rejects replays older than five minutes; so do we
+_MAX_SIGNATURE_AGE_SECONDS = 300
+_PAGE_SIZE = 1000
+# Parent ts values per reply query, keeping the request URL short
+_REPLY_BATCH = 100
+# Subtypes stored as messages: ordinary posts and the variants that carry content.
+# Channel notices (channel_join, channel_topic, ...) and hidden bookkeeping events
+# such as message_replied are what SlackNormalizer drops from history anyway.
+_STORED_SUBTYPES = frozenset({None, "bot_message", "file_share", "me_message", "thread_broadcast"})
+
+
+class SlackSignatureError(Exception):
+    """Raised when an Events API request is not signed with our signing secret."""
+
+
+def format_ts(value: float) -> str:
+    """Format an epoch timestamp the way Slack formats message ts values."""
+    return f"{value:.6f}"
+
+
+class SlackEventService:
+    """Stores public-channel message events so channel history can be read locally.
+
+    Handles new messages, thread replies, edits and deletions. The first event
+    from a channel registers it as ingested; from that point on SlackService
+    reads the channel from this store instead of calling conversations.history,
+    as long as events for the workspace keep arriving (see ``ingested_range``).
+    Only public channels are ingested, so stored messages are readable with any
+    token of the same workspace.
+    """
+
+    def __init__(self, repository: SlackIngestRepository | None = None):
+        self._repo = repository or SlackIngestRepository()
+        # (team, channel) -> ingesting_since, or "" when the channel is not ingested
+        self._channels = TTLCache(maxsize=10000, ttl=60)
+        # team -> epoch of the last event received from any of its channels
+        self._team_events = TTLCache(maxsize=1000, ttl=60)
+
+    def verify_signature(self, body: bytes, timestamp: str, signature: str) -> None:
+        """Check the X-Slack-Signature header of an Events API request.
+
+        Raises:
+            SlackSignatureError: If the timestamp is stale or the signature does not match.
+        """
+        try:
+            age = abs(time.time() - int(timestamp))
+        except ValueError as e:
+            raise SlackSignatureError("Invalid timestamp") from e
+        if age > _MAX_SIGNATURE_AGE_SECONDS:
+            raise SlackSignatureError("Stale request")
+
+        basestring = b"v0:" + timestamp.encode() + b":" + body
+        expected = "v0=" + hmac.new(settings.slack_signing_secret.encode(), basestring, hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(expected, signature):
+            raise SlackSignatureError("Signature mismatch")
+
+    async def ingest(self, payload: dict) -> bool:
+        """Store the message event in an ``event_callback`` payload.
+
+        An edit of a message that is not stored is saved as a new message when
+        it was posted after the channel started being ingested. Edits of older
+        messages are ignored: that part of the channel is still read from
+        conversations.history, which returns the edited text.
+
+        Returns:
+            True if the event was stored, False if it was ignored.
+        """
+        team_id = payload.get("team_id", "")
+        event = payload.get("event") or {}
+        if event.get("type") != "message" or event.get("channel_type") != "channel":
+            return False
+        channel_id = event.get("channel", "")
+        if not team_id or not channel_id:
+            return False
+
+        subtype = event.get("subtype")
+        if subtype == "message_changed":
+            message = event.get("message") or {}
+            edited_at = datetime.now(UTC).isoformat()
+            updated = await self._repo.update_message(team_id, channel_id, message.get("ts", ""), {
+                "text": message.get("text", ""),
+                "edited_at": edited_at,
+            })
+            if not updated and await self._is_ingested(team_id, channel_id, message.get("ts", "")):
+                if not _storable(message):
+                    return False
+                await self._repo.upsert_message({**_row(team_id, channel_id, message), "edited_at": edited_at})
+        elif subtype == "message_deleted":
+            await self._repo.update_message(team_id, channel_id, event.get("deleted_ts", ""), {"deleted": True})
+        elif _storable(event):
+            await self._repo.upsert_message(_row(team_id, channel_id, event))
+        else:
+            return False
+
+        await self._register(team_id, channel_id, event.get("event_ts") or event.get("ts", ""))
+        return True
+
+    async def ingested_since(self, team_id: str, channel_id: str) -> str | None:
+        """Return the ts from which a channel is fully ingested, or None."""
+        key = (team_id, channel_id)
+        since = self._channels.get(key)
+        if since is None:
+            try:
+                row = await self._repo.get_channel(team_id, channel_id)
+            except Exception as e:  # noqa: BLE001 - fall back to conversations.history
+                logger.warning("Failed to look up ingested Slack channel %s: %s", channel_id, e)
+                return None
+            since = row["ingesting_since"] if row else ""
+            self._channels.set(key, since)
+        return since or None
+
+    async def ingested_range(self, team_id: str, channel_id: str) -> tuple[float, float] | None:
+        """Return the ``(since, until)`` epoch range the store fully covers, or None.
+
+        Coverage is open-ended (``until`` is infinite) while the workspace keeps
+        sending events. When
+        no event has arrived for ``SLACK_EVENTS_MAX_SILENCE_SECONDS`` the
+        subscription may be broken (app disabled, subscription removed, signing
+        secret rotated), so coverage ends at the last event and later messages
+        must be read from conversations.history.
+        """
+        since = await self.ingested_since(team_id, channel_id)
+        if not since:
+            return None
+        last_event = self._team_events.get(team_id)
+        if last_event is None:
+            try:
+                value = await self._repo.get_team_last_event(team_id)
+            except Exception as e:  # noqa: BLE001 - fall back to conversations.history
+                logger.warning("Failed to look up Slack event activity for %s: %s", team_id, e)
+                return None
+            last_event = datetime.fromisoformat(value).timestamp() if value else float(since)
+            self._team_events.set(team_id, last_event)
+
+        if time.time() - last_event <= settings.slack_events_max_silence_seconds:
+            return float(since), math.inf
+        logger.warning(
+            "No Slack events from workspace %s since %s; reading newer messages from conversations.history",
+            team_id,
+            datetime.fromtimestamp(last_event, UTC).isoformat(),
+        )
+        return float(since), last_event
+
+    async def _is_ingested(self, team_id: str, channel_id: str, ts: str) -> bool:
+        since = await self.ingested_since(team_id, channel_id)
+        return bool(ts and since and float(ts) >= float(since))
+
+    async def iter_messages(
+        self,
+        team_id: str,
+        channel_id: str,
+        oldest: float,
+        latest: float,
+    ) -> AsyncIterator[list[dict]]:
+        """Yield ingested top-level messages in a range, newest first, with ``replies`` attached.
+
+        Messages use the raw Slack shape (``ts``, ``user``, ``text``) so they can be
+        formatted like conversations.history results.
+        """
+        upper = format_ts(latest)
+        exclusive = False
+        while True:
+            rows = await self._repo.list_messages(
+                team_id, channel_id, format_ts(oldest), upper, limit=_PAGE_SIZE, latest_exclusive=exclusive
+            )
+            if not rows:
+                return
+            parents = [r["ts"] for r in rows]
+            by_thread: dict[str, list[dict]] = {}
+            for i in range(0, len(parents), _REPLY_BATCH):
+                replies = await self._repo.list_replies(team_id, channel_id, parents[i:i + _REPLY_BATCH])
+                for reply in replies:
+                    by_thread.setdefault(reply["thread_ts"], []).append(_raw(reply))
+            yield [{**_raw(row), "replies": by_thread.get(row["ts"], [])} for row in rows]
+            if len(rows) < _PAGE_SIZE:
+                return
+            upper, exclusive = rows[-1]["ts"], True
+
+    async def _register(self, team_id: str, channel_id: str, event_ts: str) -> None:
+        key = (team_id, channel_id)
+        if self._channels.get(key):
+            return
+        now = datetime.now(UTC).isoformat()
+        try:
+            await self._repo.register_channel(team_id, channel_id, event_ts, now)
+            row = await self._repo.get_channel(team_id, channel_id)
+        except Exception as e:  # noqa: BLE001 - retried on the next event
+            logger.warning("Failed to register ingested Slack channel %s: %s", channel_id, e)
+            return
+        self._channels.set(key, row["ingesting_since"] if row else "")
+
+
+def _storable(event: dict) -> bool:
+    return bool(event.get("ts")) and not event.get("hidden") and event.get("subtype") in _STORED_SUBTYPES
+
+
+def _row(team_id: str, channel_id: str, event: dict) -> dict:
+    ts = event["ts"]
+    thread_ts = event.get("thread_ts")
+    return {
+        "team_id": team_id,
+        "channel_id": channel_id,
+        "ts": ts,
+        "thread_ts": thread_ts,
+        "is_reply": bool(thread_ts and thread_ts != ts),
+        "user_id": event.get("user"),
+        "text": event.get("text", ""),
+        "subtype": event.get("subtype"),
+        "bot_id": event.get("bot_id"),
+        "deleted": False,
+    }
+
+
+def _raw(row: dict) -> dict:
+    """Convert a stored row back to the shape of a conversations.history message."""
+    return {
+        "ts": row["ts"],
+        "user": row.get("user_id") or "",
+        "text": row.get("text", ""),
+        "subtype": row.get("subtype"),
+        "bot_id": row.get("bot_id"),
+    }
+
+
+slack_event_service = SlackEventService()
@@ -0,0 +1,216 @@
+"""Noise filtering and compaction of Slack messages before they reach the model."""
+
+import html
+import re
+from dataclasses import asdict, dataclass
+
+from app.services.context_builder import estimate_tokens
+
+# Channel notices and other messages that carry no handover content
+SYSTEM_SUBTYPES = frozenset({
+    "bot_add",
+    "bot_remove",
+    "channel_archive",
+    "channel_convert_to_private",
+    "channel_join",
+    "channel_leave",
+    "channel_name",
+    "channel_posting_permissions",
+    "channel_purpose",
+    "channel_topic",
+    "channel_unarchive",
+    "group_archive",
+    "group_join",
+    "group_leave",
+    "group_name",
+    "group_purpose",
+    "group_topic",
+    "group_unarchive",
+    "pinned_item",
+    "reminder_add",
+    "unpinned_item",
+})
+
+# Slack's angle-bracket markup: <@U123|name>, <#C123|name>, <!here>, <!subteam^S1|@team>, <https://…|label>
+_MARKUP_RE = re.compile(r"<(?P<kind>[@#!]?)(?P<target>[^|>]+)(?:\|(?P<label>[^>]*))?>")
+# Messages made only of :emoji: codes, emoji characters and whitespace (or nothing at all)
+_EMOJI_ONLY_RE = re.compile(
+    r"^(?:\s|:[a-z0-9_+\-']+:|[\u2600-\u27bf\u2b00-\u2bff\ufe0f\u200d]|[\U0001f000-\U0001faff])*$"
+)
+_SPACES_RE = re.compile(r"[ \t]+")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+_MAX_URL_PATH = 24
+_MAX_QUOTE_CHARS = 60
+
+
+@dataclass
+class NormalizeStats:
+    """What normalization removed from a batch of messages."""
+
+    messages_in: int = 0
+    messages_out: int = 0
+    system_dropped: int = 0
+    bot_dropped: int = 0
+    emoji_dropped: int = 0
+    duplicates_dropped: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+    tokens_before: int = 0
+    tokens_after: int = 0
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "bytes_saved": self.bytes_saved, "tokens_saved": self.tokens_saved}
+
+
+class SlackNormalizer:
+    """Reduces formatted Slack messages to the text worth sending to Gemini.
+
+    A single pass over the messages and their thread replies drops channel
+    notices, bot posts, emoji-only messages and reposts of text already seen,
+    then rewrites Slack markup: mentions become ``@name``, links keep their
+    label or a shortened host and path, and quoted lines are cut to a short
+    excerpt. A message with replies is kept even when its own text is noise.
+    """
+
+    def normalize(
+        self,
+        messages: list[dict],
+        names: dict[str, str] | None = None,
+    ) -> tuple[list[dict], NormalizeStats]:
+        """Filter and compact formatted Slack messages.
+
+        Args:
+            messages: Messages as returned by SlackService.
+            names: Extra user ID to display name mappings for mentions. Authors
+                of the messages themselves are always known.
+
+        Returns:
+            The normalized messages and what was removed.
+        """
+        names = {**self._author_names(messages), **(names or {})}
+        stats = NormalizeStats(messages_in=len(messages))
+        seen: set[str] = set()
+        result = []
+
+        for msg in messages:
+            before = _text_size(msg)
+            stats.bytes_before += before[0]
+            stats.tokens_before += before[1]
+
+            replies = []
+            for reply in msg.get("thread_replies", []):
+                text = self._keep(reply, names, stats)
+                if text is not None:
+                    replies.append({**_public(reply), "text": text})
+
+            text = self._keep(msg, names, stats)
+            if text is not None and len(text) >= 10:
+                if text in seen:
+                    stats.duplicates_dropped += 1
+                    text = None
+                else:
+                    seen.add(text)
+            if text is None and not replies:
+                continue
+
+            out = {**_public(msg), "text": text or "", "thread_replies": replies}
+            after = _text_size(out)
+            stats.bytes_after += after[0]
+            stats.tokens_after += after[1]
+            result.append(out)
+
+        stats.messages_out = len(result)
+        return result, stats
+
+    def _keep(self, msg: dict, names: dict[str, str], stats: NormalizeStats) -> str | None:
+        """Return the cleaned text of a message, or None if it should be dropped."""
+        if msg.get("subtype") in SYSTEM_SUBTYPES:
+            stats.system_dropped += 1
+            return None
+        if msg.get("is_bot") or msg.get("subtype") == "bot_message":
+            stats.bot_dropped += 1
+            return None
+        text = self.clean(msg.get("text", ""), names)
+        if _EMOJI_ONLY_RE.match(text):
+            stats.emoji_dropped += 1
+            return None
+        return text
+
+    @staticmethod
+    def clean(text: str, names: dict[str, str] | None = None) -> str:
+        """Rewrite Slack markup in ``text`` into compact plain text."""
+        names = names or {}
+
+        def markup(m: re.Match) -> str:
+            kind, target, label = m.group("kind"), m.group("target"), m.group("label")
+            if kind == "@":
+                return f"@{label or names.get(target, target)}"
+            if kind == "#":
+                return f"#{label or target}"
+            if kind == "!":
+                # <!here>, <!channel>, <!subteam^S123|@team>, <!date^…|fallback>
+                return label if label else f"@{target}"
+            if label:
+                return label
+            return _short_url(target)
+
+        lines = []
+        quoting = False
+        for line in text.split("\n"):
+            if line.startswith("&gt;"):
+                # Keep one short excerpt per quote block
+                if not quoting:
+                    quote = html.unescape(line[4:]).strip()
+                    if len(quote) > _MAX_QUOTE_CHARS:
+                        quote = quote[:_MAX_QUOTE_CHARS] + "…"
+                    lines.append(f"> {quote}")
+                quoting = True
+                continue
+            quoting = False
+            lines.append(line)
+
+        text = _MARKUP_RE.sub(markup, "\n".join(lines))
+        text = html.unescape(_SPACES_RE.sub(" ", text))
+        return _BLANK_LINES_RE.sub("\n\n", text).strip()
+
+    @staticmethod
+    def _author_names(messages: list[dict]) -> dict[str, str]:
+        names = {}
+        for msg in messages:
+            if msg.get("user") and msg.get("user_name"):
+                names[msg["user"]] = msg["user_name"]
+        return names
+
+
+def _short_url(url: str) -> str:
+    if url.startswith("mailto:"):
+        return url[7:]
+    host, _, path = url.partition("://")[2].partition("/")
+    if not host:
+        return url
+    path = path.split("?", 1)[0].split("#", 1)[0].rstrip("/")
+    if len(path) > _MAX_URL_PATH:
+        path = path[:_MAX_URL_PATH] + "…"
+    return f"{host}/{path}" if path else host
+
+
+def _public(msg: dict) -> dict:
+    """Drop the fields only used for filtering."""
+    return {k: v for k, v in msg.items() if k not in ("subtype", "is_bot")}
+
+
+def _text_size(msg: dict) -> tuple[int, int]:
+    texts = [msg.get("text", "")] + [r.get("text", "") for r in msg.get("thread_replies", [])]
+    return sum(len(t.encode("utf-8")) for t in texts), sum(estimate_tokens(t) for t in texts)
+
+
+slack_normalizer = SlackNormalizer()
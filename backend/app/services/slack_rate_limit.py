@@ -0,0 +1,161 @@
+"""Rate-limit aware scheduling of Slack Web API calls."""
+
+import asyncio
+import contextvars
+import hashlib
+import logging
+import time
+from collections import Counter, OrderedDict, deque
+
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.async_client import AsyncWebClient
+
+from app.config import settings
+from app.services.slack_directory import slack_user_directory
+
+logger = logging.getLogger(__name__)
+
+# Requests per minute for each Slack rate-limit tier
+_TIERS = {1: 1, 2: 20, 3: 50, 4: 100}
+
+# https://api.slack.com/methods — methods not listed here default to tier 3
+_METHOD_TIERS = {
+    "auth.test": 4,
+    "conversations.history": 3,
+    "conversations.replies": 3,
+    "conversations.info": 3,
+    "conversations.list": 2,
+    "users.info": 4,
+    "users.list": 2,
+}
+
+# Requests made from the same fetch (one job or one preview) share a flow;
+# the scheduler alternates between flows so one large job cannot starve others.
+current_flow: contextvars.ContextVar[str] = contextvars.ContextVar("slack_flow", default="default")
+
+
+class _Bucket:
+    """Fair, paced queue for one workspace and API method.
+
+    Permits are spaced ``interval`` seconds apart with a small burst allowance
+    (GCRA) and handed out round-robin across flows. A 429 pauses the bucket
+    for the server's Retry-After.
+    """
+
+    def __init__(self, per_minute: float, burst: int):
+        self.interval = 60.0 / per_minute
+        self.burst = burst
+        self._tat = 0.0  # theoretical arrival time of the next permit
+        self._paused_until = 0.0
+        self._flows: OrderedDict[str, deque[asyncio.Future]] = OrderedDict()
+        self._dispatcher: asyncio.Task | None = None
+        self.counters: Counter[str] = Counter()
+
+    @property
+    def depth(self) -> int:
+        return sum(len(q) for q in self._flows.values())
+
+    async def acquire(self, flow: str) -> None:
+        future = asyncio.get_running_loop().create_future()
+        self._flows.setdefault(flow, deque()).append(future)
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        queued_at = time.monotonic()
+        await future
+        self.counters["granted"] += 1
+        self.counters["wait_ms"] += int((time.monotonic() - queued_at) * 1000)
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self.counters["throttled"] += 1
+
+    async def _dispatch(self) -> None:
+        while self._flows:
+            now = time.monotonic()
+            ready_at = max(self._paused_until, self._tat - (self.burst - 1) * self.interval)
+            if ready_at > now:
+                await asyncio.sleep(ready_at - now)
+                continue
+
+            # Round-robin: serve the oldest waiter of the next flow, then requeue the flow
+            flow, queue = self._flows.popitem(last=False)
+            future = queue.popleft()
+            if queue:
+                self._flows[flow] = queue
+            if future.done():
+                continue  # caller was cancelled; the permit is not used
+            self._tat = max(self._tat, now) + self.interval
+            future.set_result(None)
+
+
+class SlackRateLimiter:
+    """Schedules Slack calls per workspace and method according to Slack's rate-limit tiers.
+
+    Slack applies its tiers per app, workspace and method, so every token of
+    one workspace shares a bucket and concurrent jobs for different users of
+    that workspace are paced and queued together. Limits are enforced per
+    process; other processes are handled through Retry-After.
+    ``SLACK_RATE_LIMIT_HEADROOM`` keeps pacing slightly below the published
+    limits.
+    """
+
+    def __init__(self):
+        self._buckets: dict[tuple[str, str], _Bucket] = {}
+
+    def bucket(self, workspace: str, method: str) -> _Bucket:
+        """Return the bucket for a workspace (team id) and API method."""
+        key = (workspace, method)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            per_minute = _TIERS[_METHOD_TIERS.get(method, 3)] * settings.slack_rate_limit_headroom
+            bucket = _Bucket(per_minute, burst=max(1, int(per_minute // 10)))
+            self._buckets[key] = bucket
+        return bucket
+
+    def metrics(self) -> dict:
+        """Queue depth and throttle counters per method, summed over workspaces."""
+        methods: dict[str, Counter] = {}
+        for (_, method), bucket in self._buckets.items():
+            stats = methods.setdefault(method, Counter())
+            stats["queue_depth"] += bucket.depth
+            stats.update(bucket.counters)
+        return {method: dict(stats) for method, stats in methods.items()}
+
+
+slack_rate_limiter = SlackRateLimiter()
+
+
+class RateLimitedAsyncWebClient(AsyncWebClient):
+    """AsyncWebClient whose calls go through the shared SlackRateLimiter.
+
+    Calls wait for a permit for their workspace and method; a 429 response
+    pauses that method for Retry-After seconds and the call is retried up to
+    ``SLACK_RATE_LIMIT_MAX_RETRIES`` times.
+    """
+
+    async def api_call(self, api_method: str, **kwargs):
+        bucket = slack_rate_limiter.bucket(await self._workspace(api_method), api_method)
+        attempt = 0
+        while True:
+            await bucket.acquire(current_flow.get())
+            try:
+                return await super().api_call(api_method, **kwargs)
+            except SlackApiError as e:
+                if e.response.status_code != 429 or attempt >= settings.slack_rate_limit_max_retries:
+                    raise
+                headers = e.response.headers or {}
+                retry_after = float(headers.get("Retry-After") or headers.get("retry-after") or 1)
+                logger.info("Slack %s rate limited; retrying in %.0fs", api_method, retry_after)
+                bucket.pause(retry_after)
+                attempt += 1
+
+    async def _workspace(self, api_method: str) -> str:
+        fingerprint = hashlib.sha256((self.token or "").encode()).hexdigest()[:16]
+        if api_method == "auth.test":
+            # auth.test is how the workspace is found, so it is paced per token
+            return f"token:{fingerprint}"
+        try:
+            return await slack_user_directory.team_id(self)
+        except SlackApiError:
+            # An invalid token fails its own call; keep it out of the workspace's queue
+            return f"token:{fingerprint}"
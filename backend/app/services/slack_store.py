@@ -0,0 +1,174 @@
+"""Incremental, per-tenant store of fetched Slack messages."""
+
+import logging
+import time
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime
+
+from app.config import settings
+from app.db.repositories import SlackMessageCacheRepository
+
+logger = logging.getLogger(__name__)
+
+_PAGE_SIZE = 1000
+# Threads with a reply this recent (relative to when they were cached) may still be active
+_ACTIVE_THREAD_SECONDS = 7 * 86400
+# Smallest gap worth a history request (Slack ts has microsecond precision)
+_EPSILON = 0.000001
+
+
+class SlackMessageStore:
+    """Remembers fetched Slack messages and which time ranges they fully cover.
+
+    Messages are keyed by tenant, workspace, channel and ts, so tenants never
+    share cached data even when they read the same workspace. Each channel
+    keeps a list of covered ``[oldest, latest, fetched_at]`` intervals; a
+    range is only trusted up to the time it was fetched, so repeated requests
+    for a range that includes today fetch just the newer messages. Coverage
+    older than ``SLACK_MESSAGE_CACHE_TTL_SECONDS`` is ignored and pruned.
+    """
+
+    def __init__(self, repository: SlackMessageCacheRepository | None = None):
+        self._repo = repository or SlackMessageCacheRepository()
+        self._writes_since_prune = 0
+
+    async def plan(
+        self,
+        tenant_id: str,
+        team_id: str,
+        channel_id: str,
+        oldest: float,
+        latest: float,
+    ) -> list[tuple[float, float, bool]]:
+        """Split ``[oldest, latest]`` into cached and missing segments.
+
+        Returns:
+            ``(oldest, latest, cached)`` segments, newest first.
+        """
+        try:
+            intervals = self._live(await self._repo.get_coverage(tenant_id, team_id, channel_id))
+        except Exception as e:  # noqa: BLE001 - treat as uncached
+            logger.warning("Slack cache coverage lookup failed: %s", e)
+            intervals = []
+
+        segments: list[tuple[float, float, bool]] = []
+        cursor = latest
+        for lo, hi, _ in sorted(intervals, key=lambda i: i[1], reverse=True):
+            if hi < oldest or lo > cursor:
+                continue
+            if hi < cursor:
+                segments.append((hi + _EPSILON, cursor, False))
+            segments.append((max(lo, oldest), min(hi, cursor), True))
+            cursor = lo - _EPSILON
+            if cursor < oldest:
+                break
+        if cursor >= oldest:
+            segments.append((oldest, cursor, False))
+        return segments
+
+    async def iter_cached(
+        self,
+        tenant_id: str,
+        team_id: str,
+        channel_id: str,
+        oldest: float,
+        latest: float,
+    ) -> AsyncIterator[list[dict]]:
+        """Yield cached rows (ts, message, latest_reply, fetched_at) in a range, newest first."""
+        while latest >= oldest:
+            rows = await self._repo.list_messages(tenant_id, team_id, channel_id, oldest, latest, limit=_PAGE_SIZE)
+            if not rows:
+                return
+            yield rows
+            if len(rows) < _PAGE_SIZE:
+                return
+            latest = float(rows[-1]["ts"]) - _EPSILON
+
+    def needs_thread_refresh(self, row: dict) -> bool:
+        """Whether a cached thread may have received replies since it was cached."""
+        if not row.get("latest_reply"):
+            return False
+        fetched_at = datetime.fromisoformat(row["fetched_at"]).timestamp()
+        return (
+            time.time() - fetched_at > settings.slack_message_cache_thread_refresh_seconds
+            and fetched_at - float(row["latest_reply"]) < _ACTIVE_THREAD_SECONDS
+        )
+
+    async def save(
+        self,
+        tenant_id: str,
+        team_id: str,
+        channel_id: str,
+        messages: list[tuple[dict, str | None]],
+    ) -> None:
+        """Store formatted messages with their ``latest_reply`` ts."""
+        now = datetime.now(UTC).isoformat()
+        rows = [
+            {
+                "tenant_id": tenant_id,
+                "team_id": team_id,
+                "channel_id": channel_id,
+                "ts": message["timestamp"],
+                "message": message,
+                "latest_reply": latest_reply,
+                "fetched_at": now,
+            }
+            for message, latest_reply in messages
+            if message.get("timestamp")
+        ]
+        try:
+            await self._repo.upsert_messages(rows)
+        except Exception as e:  # noqa: BLE001 - messages were already served
+            logger.warning("Slack cache write failed: %s", e)
+            return
+
+        self._writes_since_prune += 1
+        if self._writes_since_prune >= 50:
+            self._writes_since_prune = 0
+            try:
+                await self._repo.prune(settings.slack_message_cache_ttl_seconds)
+            except Exception as e:  # noqa: BLE001 - retried after the next writes
+                logger.warning("Slack cache prune failed: %s", e)
+
+    async def add_coverage(
+        self,
+        tenant_id: str,
+        team_id: str,
+        channel_id: str,
+        oldest: float,
+        latest: float,
+        fetched_at: float,
+    ) -> None:
+        """Record that every message in ``[oldest, latest]`` was fetched at ``fetched_at``."""
+        try:
+            intervals = self._live(await self._repo.get_coverage(tenant_id, team_id, channel_id))
+            intervals.append([oldest, min(latest, fetched_at), fetched_at])
+            await self._repo.set_coverage(
+                tenant_id,
+                team_id,
+                channel_id,
+                self._merge(intervals),
+                datetime.now(UTC).isoformat(),
+            )
+        except Exception as e:  # noqa: BLE001 - range is refetched next time
+            logger.warning("Slack cache coverage update failed: %s", e)
+
+    @staticmethod
+    def _live(intervals: list[list[float]]) -> list[list[float]]:
+        cutoff = time.time() - settings.slack_message_cache_ttl_seconds
+        return [list(i) for i in intervals if i[2] >= cutoff and i[0] <= i[1]]
+
+    @staticmethod
+    def _merge(intervals: list[list[float]]) -> list[list[float]]:
+        # Overlapping or adjacent ranges merge; the merged range keeps the older fetch time
+        merged: list[list[float]] = []
+        for lo, hi, fetched_at in sorted(intervals):
+            if merged and lo <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], hi)
+                merged[-1][2] = min(merged[-1][2], fetched_at)
+            else:
+                merged.append([lo, hi, fetched_at])
+        return merged
+
+
+slack_message_store = SlackMessageStore()
@@ -1,9 +1,8 @@
 """Google Sheets integration service."""
 
-import asyncio
+from app.services.google_api import google_services
 
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+_METADATA_FIELDS = "properties.title,sheets.properties(title,sheetType)"
 
 
 class SheetsService:
@@ -18,17 +17,14 @@ class SheetsService:
         Returns:
             List of spreadsheet summary dicts.
         """
-        credentials = Credentials(token=access_token)
-        service = build("drive", "v3", credentials=credentials)
+        service = google_services.service("drive", "v3", access_token)
 
-        results = await asyncio.to_thread(
-            lambda: service.files()
-            .list(
+        results = await google_services.execute(
+            service.files().list(
                 q="mimeType='application/vnd.google-apps.spreadsheet'",
                 fields="files(id, name, modifiedTime, webViewLink)",
                 orderBy="modifiedTime desc",
             )
-            .execute()
         )
 
         files = results.get("files", [])
@@ -58,32 +54,41 @@ class SheetsService:
         Returns:
             Spreadsheet detail dict.
         """
-        credentials = Credentials(token=access_token)
-        service = build("sheets", "v4", credentials=credentials)
-
-        metadata = await asyncio.to_thread(
-            lambda: service.spreadsheets()
-            .get(spreadsheetId=spreadsheet_id)
-            .execute()
+        service = google_services.service("sheets", "v4", access_token)
+
+        # Only tab names are needed here; the cell values come from one batchGet
+        metadata = await google_services.execute(
+            service.spreadsheets().get(
+                spreadsheetId=spreadsheet_id,
+                includeGridData=False,
+                fields=_METADATA_FIELDS,
+            )
         )
 
         title = metadata.get("properties", {}).get("title", "")
-        sheet_list = metadata.get("sheets", [])
+        names = [
+            props.get("title", "")
+            for props in (sheet.get("properties", {}) for sheet in metadata.get("sheets", []))
+            # Chart sheets have no cells and would fail the values request
+            if props.get("sheetType", "GRID") == "GRID" and (not sheet_name or props.get("title") == sheet_name)
+        ]
+        if not names:
+            return {"id": spreadsheet_id, "title": title, "sheets": []}
+
+        values_result = await google_services.execute(
+            service.spreadsheets().values().batchGet(
+                spreadsheetId=spreadsheet_id,
+                ranges=[_a1_sheet(name) for name in names],
+                majorDimension="ROWS",
+                fields="valueRanges(values)",
+            )
+        )
+        # Value ranges come back in the order they were requested
+        value_ranges = values_result.get("valueRanges", [])
 
         sheets_data = []
-        for sheet in sheet_list:
-            props = sheet.get("properties", {})
-            name = props.get("title", "")
-            if sheet_name and name != sheet_name:
-                continue
-
-            values_result = await asyncio.to_thread(
-                lambda n=name: service.spreadsheets()
-                .values()
-                .get(spreadsheetId=spreadsheet_id, range=n)
-                .execute()
-            )
-            values = values_result.get("values", [])
+        for name, value_range in zip(names, value_ranges, strict=False):
+            values = value_range.get("values", [])
 
             headers = values[0] if values else []
             rows = values[1:] if len(values) > 1 else []
@@ -97,3 +102,8 @@ class SheetsService:
             )
 
         return {"id": spreadsheet_id, "title": title, "sheets": sheets_data}
+
+
+def _a1_sheet(name: str) -> str:
+    """A1 range covering a whole sheet, quoted so names with spaces or symbols work."""
+    return "'" + name.replace("'", "''") + "'"
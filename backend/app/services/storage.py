@@ -1,6 +1,6 @@
 """Supabase Storage service for file management."""
 
-from app.db.client import get_supabase_admin_client
+from app.db.client import get_async_supabase_admin_client
 
 
 class StorageService:
@@ -20,9 +20,9 @@ class StorageService:
         Returns:
             The storage path of the uploaded file.
         """
-        client = get_supabase_admin_client()
+        client = await get_async_supabase_admin_client()
         path = file_name
-        client.storage.from_(self.TEMPLATES_BUCKET).upload(
+        await client.storage.from_(self.TEMPLATES_BUCKET).upload(
             path, file_bytes, {"content-type": content_type}
         )
         return f"{self.TEMPLATES_BUCKET}/{path}"
@@ -37,8 +37,8 @@ class StorageService:
         Returns:
             File content bytes.
         """
-        client = get_supabase_admin_client()
-        return client.storage.from_(bucket).download(path)
+        client = await get_async_supabase_admin_client()
+        return await client.storage.from_(bucket).download(path)
 
     async def delete_file(self, bucket: str, path: str) -> None:
         """Delete a file from Supabase Storage.
@@ -47,5 +47,5 @@ class StorageService:
             bucket: Storage bucket name.
             path: File path within the bucket.
         """
-        client = get_supabase_admin_client()
-        client.storage.from_(bucket).remove([path])
+        client = await get_async_supabase_admin_client()
+        await client.storage.from_(bucket).remove([path])
@@ -0,0 +1,136 @@
+"""Local verification of Supabase access tokens."""
+
+import asyncio
+import logging
+import time
+
+import httpx
+from jose import jwt
+from jose.exceptions import JWTError
+
+from app.config import settings
+from app.models.user import AuthenticatedUser
+
+logger = logging.getLogger(__name__)
+
+# Asymmetric algorithms accepted for JWKS keys, with the key type each requires
+_ASYMMETRIC_ALGORITHMS = {"RS256": "RSA", "ES256": "EC"}
+
+
+class InvalidTokenError(Exception):
+    """Raised when a token is definitely invalid (bad signature, expired, wrong audience)."""
+
+
+class TokenVerifier:
+    """Verifies Supabase JWTs locally using the project JWT secret or cached JWKS.
+
+    HS256 tokens are checked against ``SUPABASE_JWT_SECRET``. Asymmetric tokens
+    (RS256/ES256) are checked against the project's JWKS, which is cached and
+    refreshed in the background once it goes stale. ``verify`` returns None when
+    no local key is available, so callers can fall back to the Auth API.
+    """
+
+    # Minimum interval between forced refreshes triggered by an unknown key id
+    _MISS_REFRESH_INTERVAL = 30.0
+
+    def __init__(self):
+        self._keys: dict[str, dict] = {}
+        self._fetched_at = 0.0
+        self._last_forced_refresh = float("-inf")
+        self._refresh_lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task | None = None
+
+    @property
+    def _jwks_url(self) -> str:
+        return f"{settings.supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json"
+
+    @property
+    def _issuer(self) -> str:
+        return f"{settings.supabase_url.rstrip('/')}/auth/v1"
+
+    async def verify(self, token: str) -> AuthenticatedUser | None:
+        """Verify a token locally.
+
+        Returns:
+            The authenticated user, or None if the token cannot be checked locally.
+
+        Raises:
+            InvalidTokenError: If the token is malformed, expired or fails verification.
+        """
+        try:
+            header = jwt.get_unverified_header(token)
+        except JWTError as e:
+            raise InvalidTokenError(str(e)) from e
+
+        # The header only selects the key; the accepted algorithm is fixed by the key
+        alg = header.get("alg", "")
+        if alg == "HS256":
+            if not settings.supabase_jwt_secret:
+                return None
+            key: str | dict = settings.supabase_jwt_secret
+        elif alg in _ASYMMETRIC_ALGORITHMS:
+            key = await self._get_signing_key(header.get("kid", ""))
+            if key is None:
+                return None
+            if key.get("kty") != _ASYMMETRIC_ALGORITHMS[alg] or key.get("alg", alg) != alg:
+                raise InvalidTokenError(f"Token algorithm {alg} does not match its signing key")
+        else:
+            raise InvalidTokenError(f"Unsupported token algorithm: {alg or 'none'}")
+
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=[alg],
+                audience=settings.jwt_audience,
+                issuer=self._issuer if settings.supabase_url else None,
+            )
+        except JWTError as e:
+            raise InvalidTokenError(str(e)) from e
+
+        if not claims.get("sub"):
+            raise InvalidTokenError("Token has no subject")
+        return AuthenticatedUser(
+            id=claims["sub"],
+            email=claims.get("email"),
+            role=claims.get("role"),
+        )
+
+    async def _get_signing_key(self, kid: str) -> dict | None:
+        if not settings.supabase_url:
+            return None
+
+        now = time.monotonic()
+        if not self._keys:
+            if now - self._last_forced_refresh > self._MISS_REFRESH_INTERVAL:
+                self._last_forced_refresh = now
+                await self._refresh()
+        elif now - self._fetched_at > settings.jwks_cache_ttl_seconds and (
+            self._refresh_task is None or self._refresh_task.done()
+        ):
+            # Serve the cached keys and refresh without blocking this request
+            self._refresh_task = asyncio.create_task(self._refresh())
+
+        key = self._keys.get(kid)
+        if key is None and self._keys and now - self._last_forced_refresh > self._MISS_REFRESH_INTERVAL:
+            # Unknown key id: the signing key may have just been rotated
+            self._last_forced_refresh = time.monotonic()
+            await self._refresh()
+            key = self._keys.get(kid)
+        return key
+
+    async def _refresh(self) -> None:
+        async with self._refresh_lock:
+            try:
+                async with httpx.AsyncClient(timeout=10) as client:
+                    resp = await client.get(self._jwks_url, headers={"apikey": settings.supabase_key})
+                    resp.raise_for_status()
+                    jwks = resp.json()
+            except (httpx.HTTPError, ValueError) as e:
+                logger.warning("Failed to refresh JWKS: %s", e)
+                return
+            self._keys = {k["kid"]: k for k in jwks.get("keys", []) if k.get("kid")}
+            self._fetched_at = time.monotonic()
+
+
+token_verifier = TokenVerifier()
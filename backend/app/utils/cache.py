@@ -0,0 +1,49 @@
+"""Small in-process caching helpers."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after ``ttl`` seconds.
+
+    Thread-safe, so it can be shared between the event loop and worker threads.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._maxsize = max(1, maxsize)
+        self._ttl = ttl
+        self._data: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Any, value: Any, ttl: float | None = None) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + (self._ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Any) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,152 @@
+"""Standalone generation worker.
+
+Run with ``python -m app.worker``. Any number of workers can run across
+processes and hosts: jobs are leased from the generation_jobs table, kept
+alive with heartbeats, and reclaimed automatically when a worker dies.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import uuid
+
+from app.config import settings
+from app.db.client import close_supabase_clients
+from app.services.generation import GenerationService
+from app.services.job_queue import JobQueueService
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationWorker:
+    """Polls the job queue and runs generation jobs with bounded concurrency."""
+
+    def __init__(self, concurrency: int | None = None, worker_id: str | None = None):
+        self._concurrency = max(1, concurrency or settings.worker_concurrency)
+        self._worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue = JobQueueService()
+        self._generation = GenerationService()
+        self._stopping = asyncio.Event()
+        self._running: set[asyncio.Task] = set()
+
+    @property
+    def worker_id(self) -> str:
+        return self._worker_id
+
+    def stop(self) -> None:
+        """Stop claiming new jobs; in-flight jobs are allowed to finish."""
+        self._stopping.set()
+
+    async def run(self) -> None:
+        """Main loop: reclaim expired leases, claim jobs, and run them."""
+        logger.info("Worker %s started (concurrency=%d)", self._worker_id, self._concurrency)
+        reclaimer = asyncio.create_task(self._reclaim_loop())
+        try:
+            while not self._stopping.is_set():
+                claimed = False
+                if len(self._running) < self._concurrency:
+                    try:
+                        job = await self._queue.claim(self._worker_id)
+                    except Exception:
+                        logger.exception("Failed to claim job")
+                        job = None
+                    if job:
+                        claimed = True
+                        task = asyncio.create_task(self._process(job))
+                        self._running.add(task)
+                        task.add_done_callback(self._running.discard)
+
+                # Poll again immediately while there is work and free capacity
+                if not claimed or len(self._running) >= self._concurrency:
+                    try:
+                        await asyncio.wait_for(self._stopping.wait(), timeout=settings.job_poll_interval_seconds)
+                    except TimeoutError:
+                        pass
+        finally:
+            reclaimer.cancel()
+            if self._running:
+                logger.info("Waiting for %d in-flight job(s)", len(self._running))
+                await asyncio.gather(*self._running, return_exceptions=True)
+            logger.info("Worker %s stopped", self._worker_id)
+
+    async def _process(self, job: dict) -> None:
+        job_id = job["id"]
+        logger.info("Job %s claimed (attempt %s/%s)", job_id, job.get("attempts"), job.get("max_attempts"))
+        generation = asyncio.create_task(self._generation.start_generation(job["document_id"], job_id))
+        lease_lost = asyncio.Event()
+        heartbeat = asyncio.create_task(self._heartbeat_loop(job_id, generation, lease_lost))
+        try:
+            sections = await generation
+        except asyncio.CancelledError:
+            if not lease_lost.is_set():
+                # Shutdown or another outer cancellation; let it propagate
+                generation.cancel()
+                raise
+            # Lease was lost; another worker owns the job now
+            logger.warning("Job %s abandoned after losing its lease", job_id)
+            return
+        except Exception as e:
+            logger.exception("Job %s failed", job_id)
+            if not await self._queue.fail(job, self._worker_id, str(e)):
+                logger.warning("Job %s failure not recorded; its lease was lost", job_id)
+            return
+        finally:
+            heartbeat.cancel()
+
+        if not await self._queue.complete(job, self._worker_id, sections):
+            logger.warning("Job %s result discarded; its lease was lost", job_id)
+            return
+        logger.info("Job %s completed", job_id)
+
+    async def _heartbeat_loop(self, job_id: str, generation: asyncio.Task, lease_lost: asyncio.Event) -> None:
+        while True:
+            await asyncio.sleep(settings.job_heartbeat_seconds)
+            try:
+                owned = await self._queue.heartbeat(job_id, self._worker_id)
+            except Exception:
+                logger.exception("Heartbeat failed for job %s", job_id)
+                continue
+            if not owned:
+                lease_lost.set()
+                generation.cancel()
+                return
+
+    async def _reclaim_loop(self) -> None:
+        while True:
+            try:
+                reclaimed = await self._queue.reclaim_expired()
+                if reclaimed:
+                    logger.info("Reclaimed %d expired job(s)", reclaimed)
+            except Exception:
+                logger.exception("Failed to reclaim expired jobs")
+            await asyncio.sleep(settings.job_reclaim_interval_seconds)
+
+
+async def _main(concurrency: int | None) -> None:
+    worker = GenerationWorker(concurrency=concurrency)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, worker.stop)
+        except NotImplementedError:
+            pass
+    try:
+        await worker.run()
+    finally:
+        await close_supabase_clients()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="hikitugu generation worker")
+    parser.add_argument("--concurrency", type=int, default=None, help="Jobs to run in parallel")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(_main(args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
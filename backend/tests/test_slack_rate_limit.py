@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+from slack_sdk.web.async_client import AsyncWebClient
+
+from app.services import slack_rate_limit
+from app.services.slack_rate_limit import (
+    RateLimitedAsyncWebClient,
+    SlackRateLimiter,
+    _Bucket,
+)
+
+TEAMS = {"xoxp-alice": "T1", "xoxp-bob": "T1", "xoxp-carol": "T2"}
+
+
+def _setup(monkeypatch) -> tuple[SlackRateLimiter, list[tuple[str, float]]]:
+    limiter = SlackRateLimiter()
+    calls: list[tuple[str, float]] = []
+
+    async def team_id(client):
+        return TEAMS[client.token]
+
+    async def api_call(self, api_method, **kwargs):
+        calls.append((self.token, time.monotonic()))
+        return {"ok": True}
+
+    monkeypatch.setattr(slack_rate_limit, "slack_rate_limiter", limiter)
+    monkeypatch.setattr(slack_rate_limit.slack_user_directory, "team_id", team_id)
+    monkeypatch.setattr(AsyncWebClient, "api_call", api_call)
+    return limiter, calls
+
+
+def test_tokens_of_one_workspace_share_a_bucket(monkeypatch):
+    limiter, calls = _setup(monkeypatch)
+    # One permit every 0.2s and no burst, so pacing is visible between two calls
+    limiter._buckets[("T1", "users.info")] = _Bucket(per_minute=300, burst=1)
+
+    async def run():
+        await asyncio.gather(
+            RateLimitedAsyncWebClient(token="xoxp-alice").api_call("users.info"),
+            RateLimitedAsyncWebClient(token="xoxp-bob").api_call("users.info"),
+        )
+
+    asyncio.run(run())
+
+    assert list(limiter._buckets) == [("T1", "users.info")]
+    assert limiter.metrics()["users.info"]["granted"] == 2
+    assert abs(calls[1][1] - calls[0][1]) >= 0.15
+
+
+def test_workspaces_are_paced_separately(monkeypatch):
+    limiter, _ = _setup(monkeypatch)
+
+    async def run():
+        await asyncio.gather(
+            RateLimitedAsyncWebClient(token="xoxp-alice").api_call("users.info"),
+            RateLimitedAsyncWebClient(token="xoxp-carol").api_call("users.info"),
+        )
+
+    asyncio.run(run())
+
+    assert set(limiter._buckets) == {("T1", "users.info"), ("T2", "users.info")}
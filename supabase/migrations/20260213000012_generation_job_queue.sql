@@ -0,0 +1,81 @@
+-- Durable job queue columns: workers lease jobs, heartbeat, and retry with backoff
+ALTER TABLE public.generation_jobs
+    ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN max_attempts INTEGER NOT NULL DEFAULT 3,
+    ADD COLUMN run_after TIMESTAMPTZ NOT NULL DEFAULT now(),
+    ADD COLUMN locked_by TEXT,
+    ADD COLUMN lease_expires_at TIMESTAMPTZ,
+    ADD COLUMN heartbeat_at TIMESTAMPTZ;
+
+CREATE INDEX idx_generation_jobs_queue ON public.generation_jobs(status, run_after);
+CREATE INDEX idx_generation_jobs_lease ON public.generation_jobs(lease_expires_at)
+    WHERE status = 'processing';
+
+-- Atomically lease the next runnable job. SKIP LOCKED lets any number of
+-- workers poll concurrently without claiming the same row.
+CREATE OR REPLACE FUNCTION public.claim_generation_job(p_worker_id TEXT, p_lease_seconds INTEGER)
+RETURNS SETOF public.generation_jobs AS $$
+    UPDATE public.generation_jobs j
+    SET status = 'processing',
+        attempts = j.attempts + 1,
+        progress = 0,
+        locked_by = p_worker_id,
+        lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+        heartbeat_at = now(),
+        started_at = now(),
+        completed_at = NULL
+    WHERE j.id = (
+        SELECT id FROM public.generation_jobs
+        WHERE status = 'pending' AND run_after <= now()
+        ORDER BY run_after, created_at
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING j.*
+$$ LANGUAGE SQL VOLATILE;
+
+-- Extend a lease. Returns false when the worker no longer owns the job.
+CREATE OR REPLACE FUNCTION public.heartbeat_generation_job(p_job_id UUID, p_worker_id TEXT, p_lease_seconds INTEGER)
+RETURNS BOOLEAN AS $$
+    WITH updated AS (
+        UPDATE public.generation_jobs
+        SET lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+            heartbeat_at = now()
+        WHERE id = p_job_id AND locked_by = p_worker_id AND status = 'processing'
+        RETURNING id
+    )
+    SELECT EXISTS (SELECT 1 FROM updated)
+$$ LANGUAGE SQL VOLATILE;
+
+-- Return jobs whose worker stopped heartbeating to the queue, or fail them
+-- once they have used up their attempts.
+CREATE OR REPLACE FUNCTION public.reclaim_generation_jobs()
+RETURNS INTEGER AS $$
+DECLARE
+    reclaimed INTEGER;
+BEGIN
+    UPDATE public.documents d
+    SET status = 'error'
+    FROM public.generation_jobs j
+    WHERE j.document_id = d.id
+      AND j.status = 'processing'
+      AND j.lease_expires_at < now()
+      AND j.attempts >= j.max_attempts;
+
+    UPDATE public.generation_jobs
+    SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'pending' END,
+        error_message = 'Worker lease expired',
+        completed_at = CASE WHEN attempts >= max_attempts THEN now() ELSE NULL END,
+        run_after = now(),
+        locked_by = NULL,
+        lease_expires_at = NULL
+    WHERE status = 'processing' AND lease_expires_at < now();
+
+    GET DIAGNOSTICS reclaimed = ROW_COUNT;
+    RETURN reclaimed;
+END;
+$$ LANGUAGE plpgsql VOLATILE;
+
+REVOKE EXECUTE ON FUNCTION public.claim_generation_job(TEXT, INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.heartbeat_generation_job(UUID, TEXT, INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.reclaim_generation_jobs() FROM PUBLIC, anon, authenticated;
@@ -0,0 +1,52 @@
+-- Persistent tier of the LLM response cache, keyed by a hash of model, prompt
+-- and generation parameters. Only the service role reads or writes it.
+CREATE TABLE public.llm_cache (
+    cache_key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL DEFAULT 0,
+    hit_count INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    last_accessed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX idx_llm_cache_expires_at ON public.llm_cache(expires_at);
+CREATE INDEX idx_llm_cache_last_accessed ON public.llm_cache(last_accessed_at);
+
+ALTER TABLE public.llm_cache ENABLE ROW LEVEL SECURITY;
+
+-- Record a cache hit
+CREATE OR REPLACE FUNCTION public.touch_llm_cache(p_cache_key TEXT)
+RETURNS VOID AS $$
+    UPDATE public.llm_cache
+    SET hit_count = hit_count + 1,
+        last_accessed_at = now()
+    WHERE cache_key = p_cache_key
+$$ LANGUAGE SQL VOLATILE;
+
+-- Drop expired entries, then evict least recently used entries beyond the
+-- row limit. Returns the number of rows removed.
+CREATE OR REPLACE FUNCTION public.prune_llm_cache(p_max_rows INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    expired INTEGER;
+    evicted INTEGER;
+BEGIN
+    DELETE FROM public.llm_cache WHERE expires_at < now();
+    GET DIAGNOSTICS expired = ROW_COUNT;
+
+    DELETE FROM public.llm_cache
+    WHERE cache_key IN (
+        SELECT cache_key FROM public.llm_cache
+        ORDER BY last_accessed_at DESC
+        OFFSET p_max_rows
+    );
+    GET DIAGNOSTICS evicted = ROW_COUNT;
+
+    RETURN expired + evicted;
+END;
+$$ LANGUAGE plpgsql VOLATILE;
+
+REVOKE EXECUTE ON FUNCTION public.touch_llm_cache(TEXT) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.prune_llm_cache(INTEGER) FROM PUBLIC, anon, authenticated;
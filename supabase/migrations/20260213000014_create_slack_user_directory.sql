@@ -0,0 +1,10 @@
+-- Cached Slack user directory (user id -> display name) per workspace, shared
+-- by API servers and workers. Only the service role reads or writes it.
+CREATE TABLE public.slack_user_directory (
+    team_id TEXT PRIMARY KEY,
+    users JSONB NOT NULL DEFAULT '{}'::jsonb,
+    user_count INTEGER NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+ALTER TABLE public.slack_user_directory ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,49 @@
+-- Incremental Slack message store. Messages are cached per tenant, workspace
+-- and channel; slack_channel_coverage records which time ranges are complete
+-- so later fetches only request the missing gaps. Service role only.
+CREATE TABLE public.slack_message_cache (
+    tenant_id UUID NOT NULL REFERENCES public.tenants(id) ON DELETE CASCADE,
+    team_id TEXT NOT NULL,
+    channel_id TEXT NOT NULL,
+    ts NUMERIC(20, 6) NOT NULL,
+    message JSONB NOT NULL,
+    latest_reply NUMERIC(20, 6),
+    fetched_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (tenant_id, team_id, channel_id, ts)
+);
+
+CREATE INDEX idx_slack_message_cache_fetched_at ON public.slack_message_cache(fetched_at);
+
+CREATE TABLE public.slack_channel_coverage (
+    tenant_id UUID NOT NULL REFERENCES public.tenants(id) ON DELETE CASCADE,
+    team_id TEXT NOT NULL,
+    channel_id TEXT NOT NULL,
+    -- [[oldest, latest, fetched_at_epoch], ...] in Slack ts seconds
+    intervals JSONB NOT NULL DEFAULT '[]'::jsonb,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (tenant_id, team_id, channel_id)
+);
+
+CREATE INDEX idx_slack_channel_coverage_updated_at ON public.slack_channel_coverage(updated_at);
+
+ALTER TABLE public.slack_message_cache ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.slack_channel_coverage ENABLE ROW LEVEL SECURITY;
+
+-- Drop cached channels that have not been refreshed within p_max_age_seconds
+CREATE OR REPLACE FUNCTION public.prune_slack_message_cache(p_max_age_seconds INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    removed INTEGER;
+BEGIN
+    DELETE FROM public.slack_channel_coverage
+    WHERE updated_at < now() - make_interval(secs => p_max_age_seconds);
+
+    DELETE FROM public.slack_message_cache
+    WHERE fetched_at < now() - make_interval(secs => p_max_age_seconds);
+    GET DIAGNOSTICS removed = ROW_COUNT;
+
+    RETURN removed;
+END;
+$$ LANGUAGE plpgsql VOLATILE;
+
+REVOKE EXECUTE ON FUNCTION public.prune_slack_message_cache(INTEGER) FROM PUBLIC, anon, authenticated;
@@ -0,0 +1,32 @@
+-- Messages received through the Slack Events API. Only public channels are
+-- ingested, so rows are keyed by workspace rather than tenant and may be read
+-- with any token of that workspace. Service role only.
+CREATE TABLE public.slack_ingested_channels (
+    team_id TEXT NOT NULL,
+    channel_id TEXT NOT NULL,
+    ingesting_since TEXT NOT NULL,
+    last_event_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (team_id, channel_id)
+);
+
+-- ts is kept as Slack's fixed-width "seconds.micros" string, which sorts correctly
+CREATE TABLE public.slack_ingested_messages (
+    team_id TEXT NOT NULL,
+    channel_id TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    thread_ts TEXT,
+    is_reply BOOLEAN NOT NULL DEFAULT false,
+    user_id TEXT,
+    text TEXT NOT NULL DEFAULT '',
+    deleted BOOLEAN NOT NULL DEFAULT false,
+    edited_at TIMESTAMPTZ,
+    received_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (team_id, channel_id, ts)
+);
+
+CREATE INDEX idx_slack_ingested_messages_thread
+    ON public.slack_ingested_messages(team_id, channel_id, thread_ts)
+    WHERE is_reply;
+
+ALTER TABLE public.slack_ingested_channels ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.slack_ingested_messages ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,5 @@
+-- Keep the message subtype and bot id so system notices and bot posts can be
+-- filtered before the messages are sent to the model
+ALTER TABLE public.slack_ingested_messages
+    ADD COLUMN subtype TEXT,
+    ADD COLUMN bot_id TEXT;
@@ -0,0 +1,30 @@
+-- Per-user copy of Google Calendar events kept current with Calendar's
+-- incremental sync (syncToken). calendar_sync_state records the sync token and
+-- which time windows are fully present in calendar_event_cache, so date-range
+-- queries inside them are answered locally. Service role only.
+CREATE TABLE public.calendar_sync_state (
+    user_id UUID NOT NULL REFERENCES public.users(id) ON DELETE CASCADE,
+    calendar_id TEXT NOT NULL,
+    sync_token TEXT,
+    -- [[time_min_epoch, time_max_epoch], ...]
+    windows JSONB NOT NULL DEFAULT '[]'::jsonb,
+    synced_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (user_id, calendar_id)
+);
+
+CREATE TABLE public.calendar_event_cache (
+    user_id UUID NOT NULL REFERENCES public.users(id) ON DELETE CASCADE,
+    calendar_id TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    start_at TIMESTAMPTZ NOT NULL,
+    end_at TIMESTAMPTZ NOT NULL,
+    event JSONB NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (user_id, calendar_id, event_id)
+);
+
+CREATE INDEX idx_calendar_event_cache_range
+    ON public.calendar_event_cache(user_id, calendar_id, start_at);
+
+ALTER TABLE public.calendar_sync_state ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.calendar_event_cache ENABLE ROW LEVEL SECURITY;
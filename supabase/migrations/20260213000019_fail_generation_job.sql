@@ -0,0 +1,46 @@
+-- Settle a failed attempt only while the caller still holds its lease, so a
+-- stale worker cannot requeue a job or mark its document as errored after a
+-- newer lease holder has taken over (or completed) it.
+CREATE OR REPLACE FUNCTION public.fail_generation_job(
+    p_job_id UUID,
+    p_worker_id TEXT,
+    p_attempts INTEGER,
+    p_error TEXT,
+    p_retry_delay_seconds INTEGER
+)
+RETURNS BOOLEAN AS $$
+DECLARE
+    job public.generation_jobs;
+BEGIN
+    UPDATE public.generation_jobs
+    SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'pending' END,
+        current_step = CASE
+            WHEN attempts >= max_attempts THEN current_step
+            ELSE format('再試行待ち (%s/%s)', attempts, max_attempts)
+        END,
+        error_message = p_error,
+        run_after = CASE
+            WHEN attempts >= max_attempts THEN run_after
+            ELSE now() + make_interval(secs => p_retry_delay_seconds)
+        END,
+        completed_at = CASE WHEN attempts >= max_attempts THEN now() ELSE NULL END,
+        locked_by = NULL,
+        lease_expires_at = NULL
+    WHERE id = p_job_id
+      AND locked_by = p_worker_id
+      AND attempts = p_attempts
+      AND status = 'processing'
+    RETURNING * INTO job;
+
+    IF NOT FOUND THEN
+        RETURN FALSE;
+    END IF;
+
+    IF job.status = 'failed' THEN
+        UPDATE public.documents SET status = 'error' WHERE id = job.document_id;
+    END IF;
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql VOLATILE;
+
+REVOKE EXECUTE ON FUNCTION public.fail_generation_job(UUID, TEXT, INTEGER, TEXT, INTEGER) FROM PUBLIC, anon, authenticated;
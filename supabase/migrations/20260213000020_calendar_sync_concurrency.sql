@@ -0,0 +1,67 @@
+-- Save a calendar's sync state only if nobody else advanced it since the
+-- caller read p_expected_token, so two processes syncing the same calendar
+-- cannot interleave their event writes unnoticed. Returns FALSE when the
+-- state changed in between; the caller then discards its copy of the calendar.
+CREATE OR REPLACE FUNCTION public.save_calendar_sync_state(
+    p_user_id UUID,
+    p_calendar_id TEXT,
+    p_expected_token TEXT,
+    p_sync_token TEXT,
+    p_windows JSONB
+)
+RETURNS BOOLEAN AS $$
+BEGIN
+    INSERT INTO public.calendar_sync_state (user_id, calendar_id, sync_token, windows, synced_at)
+    VALUES (p_user_id, p_calendar_id, p_sync_token, p_windows, now())
+    ON CONFLICT (user_id, calendar_id) DO UPDATE
+    SET sync_token = EXCLUDED.sync_token,
+        windows = EXCLUDED.windows,
+        synced_at = EXCLUDED.synced_at
+    WHERE public.calendar_sync_state.sync_token IS NOT DISTINCT FROM p_expected_token;
+    RETURN FOUND;
+END;
+$$ LANGUAGE plpgsql VOLATILE;
+
+-- Drop calendars that have not been synced within p_max_age_seconds, drop
+-- events that ended before then, and trim the covered windows to match.
+-- Returns the number of events removed.
+CREATE OR REPLACE FUNCTION public.prune_calendar_event_cache(p_max_age_seconds INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    cutoff TIMESTAMPTZ := now() - make_interval(secs => p_max_age_seconds);
+    cutoff_epoch DOUBLE PRECISION := extract(epoch FROM cutoff);
+    stale INTEGER;
+    ended INTEGER;
+BEGIN
+    WITH dropped AS (
+        DELETE FROM public.calendar_sync_state
+        WHERE synced_at < cutoff
+        RETURNING user_id, calendar_id
+    )
+    DELETE FROM public.calendar_event_cache e
+    USING dropped d
+    WHERE e.user_id = d.user_id AND e.calendar_id = d.calendar_id;
+    GET DIAGNOSTICS stale = ROW_COUNT;
+
+    DELETE FROM public.calendar_event_cache WHERE end_at < cutoff;
+    GET DIAGNOSTICS ended = ROW_COUNT;
+
+    UPDATE public.calendar_sync_state s
+    SET windows = (
+        SELECT coalesce(jsonb_agg(jsonb_build_array(greatest((w->>0)::float8, cutoff_epoch), (w->>1)::float8)), '[]'::jsonb)
+        FROM jsonb_array_elements(s.windows) w
+        WHERE (w->>1)::float8 > cutoff_epoch
+    )
+    WHERE EXISTS (
+        SELECT 1 FROM jsonb_array_elements(s.windows) w WHERE (w->>0)::float8 < cutoff_epoch
+    );
+
+    RETURN stale + ended;
+END;
+$$ LANGUAGE plpgsql VOLATILE;
+
+CREATE INDEX idx_calendar_event_cache_end
+    ON public.calendar_event_cache(end_at);
+
+REVOKE EXECUTE ON FUNCTION public.save_calendar_sync_state(UUID, TEXT, TEXT, TEXT, JSONB) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.prune_calendar_event_cache(INTEGER) FROM PUBLIC, anon, authenticated;
@@ -0,0 +1,52 @@
+-- Publish a finished attempt only while the caller still holds its lease: the
+-- generated sections replace the document's sections, the document is marked
+-- completed and the job is settled in one transaction, so a worker that lost
+-- its lease cannot overwrite the output of the newer lease holder.
+CREATE OR REPLACE FUNCTION public.complete_generation_job(
+    p_job_id UUID,
+    p_worker_id TEXT,
+    p_attempts INTEGER,
+    p_sections JSONB
+)
+RETURNS BOOLEAN AS $$
+DECLARE
+    job public.generation_jobs;
+BEGIN
+    UPDATE public.generation_jobs
+    SET status = 'completed',
+        progress = 100,
+        current_step = '完了',
+        error_message = NULL,
+        completed_at = now(),
+        locked_by = NULL,
+        lease_expires_at = NULL
+    WHERE id = p_job_id
+      AND locked_by = p_worker_id
+      AND attempts = p_attempts
+      AND status = 'processing'
+    RETURNING * INTO job;
+
+    IF NOT FOUND THEN
+        RETURN FALSE;
+    END IF;
+
+    DELETE FROM public.document_sections WHERE document_id = job.document_id;
+    INSERT INTO public.document_sections (
+        document_id, section_order, title, content, source_tags, source_references, is_ai_generated
+    )
+    SELECT job.document_id, s.section_order, s.title, s.content, s.source_tags, s.source_references, s.is_ai_generated
+    FROM jsonb_to_recordset(p_sections) AS s(
+        section_order INTEGER,
+        title TEXT,
+        content TEXT,
+        source_tags TEXT[],
+        source_references JSONB,
+        is_ai_generated BOOLEAN
+    );
+
+    UPDATE public.documents SET status = 'completed' WHERE id = job.document_id;
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql VOLATILE;
+
+REVOKE EXECUTE ON FUNCTION public.complete_generation_job(UUID, TEXT, INTEGER, JSONB) FROM PUBLIC, anon, authenticated;